@@ -16,6 +16,7 @@ from .CommandCreatedEventHandler import CommandCreatedEventHandler
 from .CommandExecuteHandler import CommandExecuteHandler
 from .CommandInputChangedHandler import CommandInputChangedHandler
 from .LogUtils import LogUtils
+from .CacheUtils import CacheUtils
 
 handlers = []
 batch_exporter = BatchParametricExportCommand()
@@ -59,8 +60,14 @@ def stop(context):
         cmdDef = ui.commandDefinitions.itemById('BatchParametricExport')
         if cmdDef:
             cmdDef.deleteMe()
+        # 注销ParametricText握手事件
+        batch_exporter.parameter_manager.dispose()
         # 清理事件处理器
         handlers.clear()
     except:
         if ui:
-            LogUtils.error('Failed to stop add-in: {}'.format(traceback.format_exc())) 
\ No newline at end of file
+            LogUtils.error('Failed to stop add-in: {}'.format(traceback.format_exc()))
+    finally:
+        # 保存尚未写入的设置，写完队列中的日志并停止日志线程
+        CacheUtils.flush()
+        LogUtils.shutdown() 
\ No newline at end of file
@@ -1,6 +1,7 @@
 import adsk.core, adsk.fusion, adsk.cam, traceback
 import os
 import json
+import time
 import csv
 from typing import List, Dict, Any
 import tempfile
@@ -8,9 +9,25 @@ from .ConfigUtils import ConfigUtils
 from . import ExportUtils
 from .LogUtils import LogUtils
 from .CacheUtils import CacheUtils
+from .OptionUtils import OptionUtils
+from .ScheduleUtils import ScheduleUtils, BatchPlan
+from .ExportCacheUtils import ExportCache
+from .PostProcessUtils import PostExportPipeline, PostProcessStages, ExportManifest, ConfigArchiver
+from .MeshUtils import MeshConverter
+from .TraceUtils import TraceUtils
+from .JournalUtils import ExportJournal
+from .TimingUtils import TimingDatabase, BatchEstimator, ProgressThrottle
+from .QueueUtils import ExportQueue, QueueLease
 
 
 class BatchParametricExportCommand:
+    # 批次结果消息的标题 {状态: 标题}
+    RESULT_TITLES = {
+        'completed': '✅ 批量导出完成！',
+        'incomplete': '⚠️ 批量导出结束，部分配置导出失败',
+        'cancelled': '⏹️ 批量导出已取消',
+        'failed': '❌ 批量导出失败',
+    }
     def __init__(self):
         self.parameters = []
         self.export_settings = []
@@ -59,44 +76,238 @@ class BatchParametricExportCommand:
             if ui:
                 LogUtils.error('创建对话框时发生错误: {}'.format(traceback.format_exc()))
 
-    def execute_batch_export(self, export_configs, export_path, ignore_version=False):
+    def schedule_configs(self, design, export_configs):
+        """规划配置执行顺序并在导出前展示给用户，用户取消时返回None"""
+        current_state = {}
+        for config in export_configs:
+            for param_name in config['parameters']:
+                if param_name not in current_state:
+                    param = self.parameter_manager.find_parameter(design, param_name)
+                    current_state[param_name] = param.expression if param else None
+        ordered, original_changes, planned_changes = ScheduleUtils.plan_order(export_configs, current_state)
+        plan_msg = ScheduleUtils.format_plan(ordered, original_changes, planned_changes)
+        LogUtils.info(f'配置调度计划:\n{plan_msg}')
+        ui = adsk.core.Application.get().userInterface
+        result = ui.messageBox(
+            f'{plan_msg}\n\n是否按此顺序开始导出？',
+            '配置调度计划',
+            adsk.core.MessageBoxButtonTypes.OKCancelButtonType,
+            adsk.core.MessageBoxIconTypes.InformationIconType
+        )
+        if result != adsk.core.DialogResults.DialogOK:
+            return None
+        return ordered
+
+    def resolve_doc_name(self, app, ignore_version=False):
+        """获取当前文档名（用于导出目录），ignore_version 为True时去除文档名中的版本号"""
+        doc_name = app.activeDocument.name if app.activeDocument else 'Unnamed'
+        
+        # 如果勾选了忽略版本号，则去除文档名中的版本号
+        if ignore_version and doc_name:
+            import re
+            # 去除常见的版本号格式，如 " xxx v13"、" xxx_v13"、" xxx-v13"、" [xxx v13]"
+            # 支持多种分隔符和方括号格式
+            original_name = doc_name
+            # 先去除方括号
+            doc_name = re.sub(r'^\[(.*)\]$', r'\1', doc_name)
+            # 再去除版本号
+            doc_name = re.sub(r'([ _\-]?v\d+)$', '', doc_name, flags=re.IGNORECASE).strip()
+            # 如果处理后的名称为空，则使用原名称
+            if not doc_name:
+                doc_name = original_name
+            LogUtils.info(f'文档名处理: "{original_name}" -> "{doc_name}"')
+        return doc_name
+
+    def restore_from_journal(self, export_path, ignore_version=False):
+        """按导出日志恢复批次开始前的参数和可见性（用于Fusion崩溃或插件异常退出后）"""
+        try:
+            app = adsk.core.Application.get()
+            ui = app.userInterface
+            design = adsk.fusion.Design.cast(app.activeProduct)
+            if not design:
+                LogUtils.error('无法获取当前设计')
+                return False
+            doc_dir = os.path.join(export_path, self.resolve_doc_name(app, ignore_version))
+            state = ExportJournal.load_state(doc_dir)
+            if not state:
+                ui.messageBox(f'❌ 没有找到导出日志: {ExportJournal.journal_path(doc_dir)}')
+                return False
+            message = f'将恢复上次批量导出开始前的 {len(state["parameters"])} 个参数和 {len(state["visibility"])} 个实例的可见性。'
+            if state['restored']:
+                message += '\n\n上次批量导出结束时已经恢复过参数，当前参数可能已是原始值。'
+            result = ui.messageBox(
+                f'{message}\n\n是否继续？',
+                '从导出日志恢复',
+                adsk.core.MessageBoxButtonTypes.OKCancelButtonType,
+                adsk.core.MessageBoxIconTypes.QuestionIconType
+            )
+            if result != adsk.core.DialogResults.DialogOK:
+                return False
+            self.parameter_manager.begin_batch()
+            restored = self.parameter_manager.restore_parameters(design, state['parameters'])
+            changed = ExportUtils.VisibilityController.apply_snapshot(design.rootComponent, state['visibility'])
+            LogUtils.info(f'已从导出日志恢复参数（{"成功" if restored else "失败"}）和 {changed} 个实例的可见性')
+            if restored:
+                ExportJournal.mark_restored(doc_dir)
+            return restored
+        except Exception as e:
+            LogUtils.error(f'从导出日志恢复时发生错误: {str(e)}')
+            return False
+
+    def record_part_timings(self, timing_db, timing_document):
+        """把上一个配置的零件导出耗时和文件大小写入耗时数据库"""
+        for comp_name, export_format, seconds, filepath in self.export_manager.part_timings:
+            try:
+                size = os.path.getsize(filepath)
+            except OSError:
+                size = None
+            timing_db.record_part(timing_document, comp_name, export_format, seconds, size)
+        self.export_manager.part_timings = []
+        timing_db.commit()
+
+    def estimate_batch(self, export_configs):
+        """按历史耗时预估批次的总耗时和输出大小（不修改设计），并显示给用户"""
         try:
+            app = adsk.core.Application.get()
+            ui = app.userInterface
+            design = adsk.fusion.Design.cast(app.activeProduct)
+            if not design:
+                LogUtils.error('无法获取当前设计')
+                return None
+            part_names = self.export_manager.export_part_names(design)
+            timing_db = TimingDatabase()
+            try:
+                estimator = BatchEstimator(timing_db, TimingDatabase.document_key(ExportCache.get_document_key(app.activeDocument)),
+                                           part_names)
+            finally:
+                timing_db.close()
+            plan = BatchPlan.build(export_configs, part_names, estimator)
+            message = (f'配置数: {plan.config_count}\n'
+                       f'零件数: {plan.parts_per_config}（共 {plan.total_files} 个文件）\n'
+                       f'预计耗时: {BatchEstimator.format_duration(plan.estimated_seconds)}\n'
+                       f'预计输出大小: {BatchEstimator.format_size(plan.estimated_bytes)}')
+            if not estimator.has_history:
+                message += '\n\n当前文档还没有导出耗时记录，以上按默认值估算，完成一次导出后会更准确。'
+            elif plan.unknown_units:
+                message += f'\n\n其中 {plan.unknown_units} 个零件格式没有历史记录，按同格式的平均值估算；导出缓存命中的配置实际耗时更短。'
+            LogUtils.info(f'导出预估:\n{message}')
+            ui.messageBox(message, '导出预估')
+            return plan.estimated_seconds, plan.estimated_bytes
+        except Exception as e:
+            LogUtils.error(f'预估导出耗时时发生错误: {str(e)}')
+            return None
+
+    def execute_batch_export(self, export_configs, export_path, ignore_version=False, options=None, resume=False, lease=None,
+                            base_parameters=None):
+        """
+        执行批量导出
+        resume 为True时继续上次未完成的批次：合并导出日志中已完成的文件和配置，已完成的工作直接跳过
+        lease 为共享导出队列中领取的工作单元（QueueLease）：缓存索引、导出日志和清单使用本实例/本单元的文件
+        base_parameters 为调用方已备份的批次开始前参数：以它为基准应用配置，结束后不恢复参数（由调用方统一恢复）
+        :return: {'status', 'exported', 'failed', 'post_failures', 'message'}，status 为 completed / incomplete / cancelled / failed；
+            未开始导出（用户取消、已提示的前置条件不满足）时返回None
+        """
+        try:
+            # 合并高级选项（未指定的使用默认值）
+            export_options = OptionUtils.defaults()
+            if options:
+                export_options.update(options)
+            LogUtils.configure(min_level=export_options['log_level'], jsonl=export_options['log_jsonl'])
             app = adsk.core.Application.get()
             product = app.activeProduct
             design = adsk.fusion.Design.cast(product)
             ui = app.userInterface
             if not design:
                 LogUtils.error('无法获取当前设计')
+                ui.messageBox('❌ 无法获取当前设计，请先打开一个 Fusion360 设计文件')
                 return
             # 获取当前文档名（用于目录）
-            doc_name = app.activeDocument.name if app.activeDocument else 'Unnamed'
-            
-            # 使用传入的ignore_version参数
-            
-            # 如果勾选了忽略版本号，则去除文档名中的版本号
-            if ignore_version and doc_name:
-                import re
-                # 去除常见的版本号格式，如 " xxx v13"、" xxx_v13"、" xxx-v13"、" [xxx v13]"
-                # 支持多种分隔符和方括号格式
-                original_name = doc_name
-                # 先去除方括号
-                doc_name = re.sub(r'^\[(.*)\]$', r'\1', doc_name)
-                # 再去除版本号
-                doc_name = re.sub(r'([ _\-]?v\d+)$', '', doc_name, flags=re.IGNORECASE).strip()
-                # 如果处理后的名称为空，则使用原名称
-                if not doc_name:
-                    doc_name = original_name
-                LogUtils.info(f'文档名处理: "{original_name}" -> "{doc_name}"')
-            original_params = self.parameter_manager.backup_parameters(design)
-            # 统计所有要导出的零件总数
-            total_parts = 0
-            for config in export_configs:
-                root_component = design.rootComponent
-                child_count = len(list(root_component.occurrences))
-                if child_count == 0 and root_component.bRepBodies.count > 0:
-                    total_parts += 1
-                else:
-                    total_parts += child_count
+            doc_name = self.resolve_doc_name(app, ignore_version)
+            if base_parameters is None:
+                original_params = self.parameter_manager.backup_parameters(design)
+            else:
+                original_params = base_parameters
+            self.parameter_manager.begin_batch(export_options['parametric_text_timeout'])
+            self.export_manager.begin_batch()
+            # 按参数变化最少的顺序重新排列配置
+            if export_options['reorder_configs']:
+                export_configs = self.schedule_configs(design, export_configs)
+                if export_configs is None:
+                    LogUtils.info('用户取消了批量导出')
+                    return
+            # 导出缓存索引和导出日志保存在 导出路径/文档名 目录下
+            doc_dir = os.path.join(export_path, doc_name)
+            document_key = ExportCache.get_document_key(app.activeDocument)
+            original_visibility = ExportUtils.VisibilityController.snapshot(design.rootComponent)
+            journal_state = None
+            if resume:
+                journal_state = ExportJournal.load_state(doc_dir)
+                if not journal_state:
+                    ui.messageBox('❌ 没有找到可继续的导出日志，请使用批量导出')
+                    return
+                if journal_state['finished']:
+                    ui.messageBox('✅ 上次批量导出已经全部完成，无需继续')
+                    return
+                if journal_state['document'] != document_key:
+                    ui.messageBox('❌ 导出日志记录的文档版本与当前文档不同，无法继续，请使用批量导出重新导出')
+                    return
+                # 使用上次批次开始前的参数和可见性，保证缓存键一致，结束后恢复到最初状态
+                original_params = journal_state['parameters']
+                original_visibility = journal_state['visibility']
+            elif not lease and ExportJournal.needs_restore(ExportJournal.load_state(doc_dir)):
+                # 重新开始会覆盖导出日志，上次批次开始前的参数和可见性也会一起丢失
+                result = ui.messageBox(
+                    '上次批量导出没有完成，参数和实例可见性也尚未恢复。\n'
+                    '重新开始批量导出会覆盖导出日志，之后无法再继续上次的导出或恢复上次批次开始前的参数。\n\n'
+                    '建议先使用“继续上次导出”或“从导出日志恢复参数”。是否仍然重新开始？',
+                    '批量导出',
+                    adsk.core.MessageBoxButtonTypes.OKCancelButtonType,
+                    adsk.core.MessageBoxIconTypes.WarningIconType
+                )
+                if result != adsk.core.DialogResults.DialogOK:
+                    LogUtils.info('上次批量导出尚未恢复，用户取消了重新开始')
+                    return
+            TraceUtils.begin_batch(export_options['enable_trace'])
+            export_cache = ExportCache(doc_dir, document_key,
+                                       force_refresh=export_options['force_refresh'] and not resume,
+                                       index_path=lease.cache_path if lease else None)
+            if journal_state:
+                export_cache.merge(journal_state['entries'], journal_state['configs'])
+                LogUtils.info(f'继续上次导出: 日志中已完成 {len(journal_state["configs"])} 个配置、{len(journal_state["entries"])} 个文件，'
+                              f'文件大小未变的已完成配置直接跳过')
+            journal = ExportJournal(doc_dir, lease.journal_path if lease else None)
+            journal.begin(document_key, len(export_configs), original_params, original_visibility, resume=resume)
+            try:
+                if app.activeDocument and app.activeDocument.isModified:
+                    LogUtils.warn('当前文档有未保存的修改，导出缓存无法识别参数以外的模型改动；如修改过模型请勾选强制重新导出')
+            except:
+                pass
+            # 后台后处理：校验、哈希、复制到共享目录、写入清单，与下一个配置的重新计算重叠进行
+            manifest = ExportManifest(doc_dir, lease.manifest_path if lease else None)
+            pipeline = PostExportPipeline(export_options['post_process_workers'], wait_callback=adsk.doEvents)
+            # 单次网格化的转换任务在最前面执行，生成的OBJ/3MF继续经过后续阶段
+            pipeline.add_stage('mesh', MeshConverter.derive_stage)
+            pipeline.add_stage('validate', PostProcessStages.validate)
+            pipeline.add_stage('hash', PostProcessStages.hash_file(export_cache))
+            pipeline.add_stage('journal', journal.stage)
+            if export_options['share_path']:
+                pipeline.add_stage('copy', PostProcessStages.copy_to(export_options['share_path'], export_path))
+            pipeline.add_stage('manifest', manifest.add)
+            # 按配置流式打包ZIP，在单独的后台线程中按顺序写入
+            archiver = None
+            if export_options['zip_per_config']:
+                archiver = ConfigArchiver(export_options['zip_compress_level'], export_options['zip_delete_loose'],
+                                          wait_callback=adsk.doEvents)
+                pipeline.add_stage('zip', archiver.add)
+            # 导出前一次性生成批次计划：零件总数和按历史耗时估算的总耗时，导出过程中据此计算剩余时间
+            part_names = self.export_manager.export_part_names(design)
+            timing_db = TimingDatabase()
+            timing_document = TimingDatabase.document_key(document_key)
+            estimator = BatchEstimator(timing_db, timing_document, part_names)
+            plan = BatchPlan.build(export_configs, part_names, estimator)
+            total_parts = plan.total_parts
+            estimated_total = plan.estimated_seconds
+            throttle = ProgressThrottle(max(0, export_options['progress_interval_ms']) / 1000.0)
             progress_dialog = ui.createProgressDialog()
             progress_dialog.cancelButtonText = '取消'
             progress_dialog.isBackgroundTranslucent = False
@@ -104,38 +315,97 @@ class BatchParametricExportCommand:
             progress_dialog.show('批量导出 - Fusion360BatchParametricExport', '准备导出，请稍候...\n', 0, total_parts)
             adsk.doEvents()
             exported_count = 0
+            # 本批次实际导出（未命中缓存）且成功的配置名，后台网格转换失败时从成功数中扣除
+            exported_names = set()
             part_progress = 0
-            def update_progress(doc_name, part_name):
-                nonlocal part_progress
-                progress_dialog.progressValue = part_progress
-                progress_dialog.message = f'正在导出文档: {doc_name}\n当前零件: {part_name}'
-                adsk.doEvents()
+            batch_status = 'failed'
+            # 当前零件的估算耗时，零件完成（下一个零件开始）时计入已完成的工作量
+            current_part_estimate = 0.0
+            def finish_part():
+                nonlocal current_part_estimate
+                if current_part_estimate:
+                    estimator.advance(current_part_estimate, parts=1)
+                    current_part_estimate = 0.0
+            def update_progress(doc_name, part_name, export_formats):
+                nonlocal part_progress, current_part_estimate
+                finish_part()
+                current_part_estimate = sum(estimator.part_estimate(part_name, f)[0] for f in export_formats)
+                # 进度框按间隔刷新，零件很多时避免界面刷新占用导出时间
+                if throttle.ready():
+                    elapsed, remaining, rate = estimator.progress(estimated_total, total_parts)
+                    progress_dialog.progressValue = part_progress
+                    progress_dialog.message = (f'正在导出文档: {doc_name}\n当前零件: {part_name}\n'
+                                               f'已用 {BatchEstimator.format_duration(elapsed)}，'
+                                               f'预计剩余 {BatchEstimator.format_duration(remaining)}，{rate:.1f} 个零件/分钟')
+                    adsk.doEvents()
                 part_progress += 1
+            estimator.start()
             try:
-                for config in export_configs:
+                for config_index, config in enumerate(export_configs):
                     if progress_dialog.wasCancelled:
+                        batch_status = 'cancelled'
                         break
-                    progress_dialog.message = f'正在导出文档: {config["custom_name"]}\n准备导出...'
-                    param_applied = self.parameter_manager.apply_parameters(design, config['parameters'])
+                    if throttle.ready():
+                        progress_dialog.progressValue = part_progress
+                        progress_dialog.message = f'正在导出文档: {config["custom_name"]}\n准备导出...'
+                        adsk.doEvents()
+                    # 完整参数集：标星参数的当前值叠加本配置的参数
+                    resolved_params = dict(original_params)
+                    resolved_params.update(config['parameters'])
+                    # 网格精度：Excel中的网格精度列优先，否则使用默认设置
+                    mesh_refinement = config.get('mesh_refinement') or {'mode': export_options['mesh_refinement']}
+                    config_key = export_cache.make_config_key(
+                        resolved_params, config['custom_name'], config['formats'],
+                        self.export_manager.mesh_cache_settings(export_options['single_tessellation'], mesh_refinement,
+                                                                export_options['mesh_triangle_budget'])
+                    )
+                    sub_dir = os.path.join(doc_dir, config['custom_name'])
+                    if ExportJournal.config_intact(journal_state, doc_dir, config_key):
+                        # 上次导出中已完成的配置（按配置缓存键匹配，调整过执行顺序也能识别），只核对文件大小
+                        LogUtils.info(f'配置 {config["custom_name"]} 在上次导出中已完成，跳过')
+                        config_cached = True
+                    else:
+                        with TraceUtils.span('cache.lookup_config'):
+                            config_cached = export_cache.lookup_config(config_key)
+                        if config_cached:
+                            LogUtils.info(f'配置 {config["custom_name"]} 全部命中导出缓存，跳过')
+                    if config_cached:
+                        # 整个配置都已导出且文件未变化，无需应用参数
+                        if archiver and not os.path.exists(ConfigArchiver.archive_path(sub_dir)):
+                            archiver.close_config(sub_dir)
+                        exported_count += 1
+                        part_progress += len(part_names)
+                        # 命中缓存的配置几乎不耗时，不计入剩余工作量
+                        estimated_total -= estimator.config_estimate(config['formats'])[0]
+                        continue
+                    apply_started = time.perf_counter()
+                    with TraceUtils.span('apply_parameters', config=config['custom_name']):
+                        param_applied, changed_count = self.parameter_manager.apply_parameters(
+                            design, config['parameters'], diff_only=export_options['diff_apply']
+                        )
+                    if changed_count:
+                        # 参数无变化时没有重新计算，不计入重新计算耗时
+                        timing_db.record_config(timing_document, time.perf_counter() - apply_started)
+                    estimator.advance(estimator.recompute_estimate)
                     
                     # 验证参数应用结果
                     if param_applied:
                         # 记录当前参数状态用于调试
                         LogUtils.info(f'配置 {config["custom_name"]} 参数应用成功')
-                        for param_name, param_value in config['parameters'].items():
-                            try:
-                                user_param = design.userParameters.itemByName(param_name)
-                                if user_param:
-                                    LogUtils.info(f'参数验证: {param_name} = {user_param.expression} (期望: {param_value})')
-                            except:
-                                pass
+                        # 读取参数表达式需要调用Fusion API，只在DEBUG级别下执行
+                        if LogUtils.enabled('DEBUG'):
+                            for param_name, param_value in config['parameters'].items():
+                                try:
+                                    param = self.parameter_manager.find_parameter(design, param_name)
+                                    if param:
+                                        LogUtils.debug(f'参数验证: {param_name} = {param.expression} (期望: {param_value})')
+                                except:
+                                    pass
                     else:
                         LogUtils.error(f'配置 {config["custom_name"]} 参数应用失败')
                     
                     if param_applied:
                         # 创建目录结构：导出路径/文档名/配置名
-                        doc_dir = os.path.join(export_path, doc_name)
-                        sub_dir = os.path.join(doc_dir, config['custom_name'])
                         try:
                             if not os.path.exists(doc_dir):
                                 os.makedirs(doc_dir)
@@ -144,18 +414,69 @@ class BatchParametricExportCommand:
                         except Exception as e:
                             LogUtils.error(f'创建目录失败: {sub_dir} {str(e)}')
                             continue
-                        export_success = self.export_manager.export_design(
-                            design, sub_dir, config['format'], config['custom_name'],
-                            lambda part_name: update_progress(config['custom_name'], part_name)
-                        )
+                        export_cache.begin_config()
+                        config_futures = []
+                        with TraceUtils.span('export_design', config=config['custom_name']):
+                            export_success = self.export_manager.export_design(
+                                design, sub_dir, config['formats'], config['custom_name'],
+                                lambda part_name: update_progress(config['custom_name'], part_name, config['formats']),
+                                export_strategy=export_options['export_strategy'],
+                                export_cache=export_cache, cache_parameters=resolved_params,
+                                reuse_identical_parts=export_options['reuse_identical_parts'],
+                                on_file_exported=lambda result: config_futures.append(pipeline.submit(result)),
+                                single_tessellation=export_options['single_tessellation'],
+                                mesh_refinement=mesh_refinement,
+                                triangle_budget=export_options['mesh_triangle_budget']
+                            )
+                        finish_part()
+                        self.record_part_timings(timing_db, timing_document)
+                        config_units = export_cache.end_config(config_key)
+                        journal.config_done(config_index, config['custom_name'], config_key, config_units, config_futures)
+                        if archiver:
+                            archiver.close_config(sub_dir, config_futures)
                         if export_success:
                             exported_count += 1
-                    adsk.doEvents()
+                            exported_names.add(config['custom_name'])
+                        # 定期保存缓存索引，中途取消或出错时已完成的部分仍然有效
+                        if exported_count % 20 == 0:
+                            export_cache.save()
+                else:
+                    if progress_dialog.wasCancelled:
+                        batch_status = 'cancelled'
+                    else:
+                        # 有配置失败时可以继续导出重试这些配置
+                        batch_status = 'completed' if exported_count == len(export_configs) else 'incomplete'
             finally:
                 progress_dialog.hide()
-                self.parameter_manager.restore_parameters(design, original_params)
+                timing_db.close()
+                if base_parameters is None:
+                    with TraceUtils.span('restore_parameters'):
+                        if self.parameter_manager.restore_parameters(design, original_params):
+                            journal.restored()
+                # 等待后处理完成后再保存缓存索引和清单
+                with TraceUtils.span('post_process.drain'):
+                    pipeline.drain()
+                    if archiver:
+                        archiver.finish()
+                # 由STL生成OBJ/3MF失败（包括后处理线程中的转换）的配置不算导出成功
+                derive_failed = self.export_manager.derive_failed_configs() & exported_names
+                if derive_failed:
+                    exported_count -= len(derive_failed)
+                    LogUtils.warn(f'以下配置由STL生成网格失败: {", ".join(sorted(derive_failed))}')
+                    if batch_status == 'completed':
+                        batch_status = 'incomplete'
+                with TraceUtils.span('cache.save'):
+                    export_cache.save()
+                journal.end(batch_status)
+                if os.path.isdir(doc_dir):
+                    manifest.save()
+                trace_path, trace_table = TraceUtils.end_batch(os.path.join(LogUtils.LOG_DIR, 'traces'), doc_name)
             failed_count = len(export_configs) - exported_count
-            result_msg = f'批量导出完成！\n\n'
+            post_failures = len(pipeline.failures) + (len(archiver.failures) if archiver else 0)
+            if batch_status == 'completed' and post_failures:
+                result_msg = '⚠️ 批量导出完成，但有文件后处理失败\n\n'
+            else:
+                result_msg = BatchParametricExportCommand.RESULT_TITLES.get(batch_status, '批量导出结束') + '\n\n'
             result_msg += f'总配置数: {len(export_configs)}\n'
             result_msg += f'成功导出: {exported_count}\n'
             if failed_count > 0:
@@ -165,6 +486,23 @@ class BatchParametricExportCommand:
                 result_msg += '- 参数值无效\n'
                 result_msg += '- 导出路径权限不足\n'
                 result_msg += '- 模型中没有可导出的实体\n\n'
+            strategy_counts = self.export_manager.strategy_counts
+            result_msg += f'导出策略: 几何体 {strategy_counts.get("geometry", 0)} 个, 可见性控制 {strategy_counts.get("visibility", 0)} 个, 复用相同零件 {strategy_counts.get("reuse", 0)} 个, 由STL转换 {strategy_counts.get("mesh", 0)} 个\n'
+            derive_failures = self.export_manager.derive_failures
+            if derive_failures:
+                result_msg += f'由STL生成网格失败: {len(derive_failures)} 个零件\n'
+                result_msg += '\n'.join(f'- {f["config"]} / {f["component"]}: {"/".join(f["formats"]).upper()}'
+                                         for f in derive_failures[:5]) + '\n'
+            result_msg += f'后处理: 完成 {pipeline.processed_count} 个, 失败 {len(pipeline.failures)} 个\n'
+            if pipeline.failures:
+                result_msg += pipeline.format_failures() + '\n'
+            if archiver:
+                result_msg += f'ZIP打包: 完成 {archiver.archive_count} 个, 失败 {len(archiver.failures)} 个\n'
+            result_msg += f'导出缓存: 命中 {export_cache.hits} 个, 未命中 {export_cache.misses} 个\n'
+            result_msg += f'ParametricText等待总时间: {self.parameter_manager.parametric_text_wait_total:.2f}s\n'
+            if trace_path:
+                LogUtils.info(f'各阶段耗时:\n{trace_table}')
+                result_msg += f'性能追踪: {trace_path}（可在 chrome://tracing 或 ui.perfetto.dev 中打开）\n'
             result_msg += f'导出路径: {export_path}\n'
             result_msg += f'文档目录: {doc_name}\n\n'
             if exported_count > 0:
@@ -172,5 +510,123 @@ class BatchParametricExportCommand:
             else:
                 result_msg += '没有文件被成功导出，请检查配置和模型。'
             LogUtils.info(result_msg)
+            return {'status': batch_status, 'exported': exported_count, 'failed': failed_count,
+                    'post_failures': post_failures, 'message': result_msg}
         except Exception as e:
             LogUtils.error(f'批量导出时发生错误: {str(e)}')
+            return {'status': 'failed', 'exported': 0, 'failed': 0, 'post_failures': 0,
+                    'message': f'❌ 批量导出时发生错误:\n{str(e)}'}
+        finally:
+            LogUtils.flush()
+
+    def show_batch_result(self, result):
+        """在消息框中显示批次的实际结果，未开始导出时（已提示过原因）不显示"""
+        if not result:
+            return
+        adsk.core.Application.get().userInterface.messageBox(result['message'], '批量导出')
+
+    def queue_is_active(self, export_path, ignore_version=False):
+        """当前文档在导出路径下是否有未结束的共享导出队列（可以直接加入，无需读取Excel）"""
+        app = adsk.core.Application.get()
+        return ExportQueue(os.path.join(export_path, self.resolve_doc_name(app, ignore_version))).is_active()
+
+    @staticmethod
+    def merge_queue_caches(doc_dir, document_key, cache_paths):
+        """把共享导出队列中各实例的缓存索引合并到文档目录的导出缓存"""
+        export_cache = ExportCache(doc_dir, document_key)
+        for cache_path in cache_paths:
+            export_cache.merge_index(cache_path)
+        export_cache.save()
+
+    def run_queue_worker(self, export_configs, export_path, ignore_version=False, options=None):
+        """
+        共享导出队列：没有未结束的队列时按 export_configs 创建队列，然后循环领取工作单元、导出并确认，直到没有可领取的单元
+        其他电脑或 Fusion 实例打开同一文档（相同版本）、选择同一共享导出路径后即可加入
+        :return: 队列汇总（ExportQueue.summary），未能加入队列时返回None
+        """
+        try:
+            export_options = OptionUtils.defaults()
+            if options:
+                export_options.update(options)
+            app = adsk.core.Application.get()
+            ui = app.userInterface
+            design = adsk.fusion.Design.cast(app.activeProduct)
+            if not design:
+                LogUtils.error('无法获取当前设计')
+                return None
+            doc_dir = os.path.join(export_path, self.resolve_doc_name(app, ignore_version))
+            document_key = ExportCache.get_document_key(app.activeDocument)
+            queue = ExportQueue(doc_dir)
+            if not queue.is_active():
+                if not export_configs:
+                    ui.messageBox('❌ 没有可加入的共享导出队列，请先选择Excel配置创建队列')
+                    return None
+                # 配置顺序在整个批次上规划一次，各工作单元不再单独重排
+                if export_options['reorder_configs']:
+                    export_configs = self.schedule_configs(design, export_configs)
+                    if export_configs is None:
+                        LogUtils.info('用户取消了共享导出队列')
+                        return None
+                created = queue.create(document_key, export_configs, dict(export_options, reorder_configs=False),
+                                       export_options['queue_unit_size'], max(1, export_options['queue_lease_minutes']) * 60)
+                if created is None:
+                    LogUtils.info('其他实例已创建共享导出队列，直接加入')
+            plan = queue.load_plan()
+            if not plan:
+                ui.messageBox(f'❌ 无法读取共享导出队列: {queue.queue_dir}')
+                return None
+            if plan['document'] != document_key:
+                ui.messageBox('❌ 共享导出队列对应的文档版本与当前文档不同，请打开相同版本的文档后再加入')
+                return None
+
+            worker = ExportQueue.worker_id()
+            completed_units = 0
+            # 参数只在本实例开始和结束时备份、恢复一次，工作单元之间直接从上一个单元的参数差量应用
+            original_params = self.parameter_manager.backup_parameters(design)
+            try:
+                while True:
+                    claimed = queue.claim(worker)
+                    if not claimed:
+                        break
+                    unit_id, unit_configs = claimed
+                    # 后台线程续约，单个配置导出时间超过租约时长也不会被其他实例重新领取
+                    lease = QueueLease(queue, unit_id, worker)
+                    lease.start()
+                    try:
+                        result = self.execute_batch_export(unit_configs, export_path, ignore_version, plan['options'],
+                                                           lease=lease, base_parameters=original_params)
+                    finally:
+                        lease.stop()
+                    if result and result['status'] == 'cancelled':
+                        # 取消的单元放回队列（不计入重试次数），由其他实例或下次加入时继续
+                        queue.release(unit_id, worker, count_attempt=False)
+                        LogUtils.info(f'用户取消了工作单元 {unit_id}，已放回队列')
+                        break
+                    if not result or result['status'] == 'failed':
+                        queue.release(unit_id, worker)
+                        LogUtils.error(f'工作单元 {unit_id} 导出失败，已放回队列')
+                        break
+                    queue.ack(unit_id, worker, result)
+                    completed_units += 1
+            finally:
+                self.parameter_manager.restore_parameters(design, original_params)
+
+            # 所有单元都已结束时由本实例合并导出清单和缓存（其他实例仍在处理时由最后完成的实例合并）
+            queue.finalize(lambda cache_paths: self.merge_queue_caches(doc_dir, document_key, cache_paths))
+            summary = queue.summary()
+            message = (f'本机完成工作单元: {completed_units}\n'
+                       f'队列进度: 完成 {summary["done"]}/{summary["units"]}，处理中 {summary["leased"]}，'
+                       f'待处理 {summary["pending"]}，失败 {summary["failed"]}\n'
+                       f'已导出配置: {summary["exported"]}/{plan["configs"]}，失败配置: {summary["failed_configs"]}')
+            if summary['finished']:
+                message += f'\n\n队列已结束，导出清单已合并到 {os.path.join(doc_dir, ExportManifest.FILENAME)}'
+            elif summary['leased']:
+                message += '\n\n其他实例仍在处理剩余的工作单元，最后完成的实例会合并导出清单'
+            LogUtils.info(f'共享导出队列:\n{message}')
+            ui.messageBox(message, '共享导出队列')
+            return summary
+        except Exception as e:
+            LogUtils.error(f'处理共享导出队列时发生错误: {str(e)}')
+            return None
+        finally:
+            LogUtils.flush()
@@ -1,8 +1,38 @@
 import os
 import json
 import tempfile
+import threading
+import atexit
+from .LockUtils import FileLock
+from .LogUtils import LogUtils
 
 class CacheUtils:
+    """插件设置缓存
+
+    设置只从磁盘读取一次并保存在内存中（文件被其他 Fusion 实例修改时重新读取）。
+    保存操作只修改内存并在 WRITE_DELAY 秒内合并为一次写入：写入时持有锁文件，
+    重新读取磁盘上的最新内容并只覆盖本实例修改过的项，先写临时文件再重命名，
+    避免多个 Fusion 实例共用临时目录时互相覆盖或读到写了一半的文件。
+    """
+    # 连续修改时合并写入的等待时间（秒）
+    WRITE_DELAY = 1.0
+    # 等待锁文件的最长时间（秒）
+    LOCK_TIMEOUT = 5.0
+    # 锁文件持续该时间没有刷新时视为异常退出后遗留的锁（秒，跨多次写入重试累计观察）
+    STALE_LOCK_SECONDS = 10.0
+    # 写入失败后按 WRITE_DELAY * 2^n 秒重试，连续失败该次数后不再自动重试，修改保留到下一次保存设置时再写入
+    MAX_WRITE_ATTEMPTS = 5
+
+    _data = None
+    _mtime = None
+    # 本实例尚未写入磁盘的修改 {(键, 子键...): 值}
+    _pending = {}
+    _timer = None
+    # 连续写入失败的次数
+    _failed_writes = 0
+    _lock = threading.RLock()
+    _file_lock = None
+
     @staticmethod
     def get_cache_file_path():
         try:
@@ -13,83 +43,166 @@ class CacheUtils:
             return None
 
     @staticmethod
-    def save_cached_export_path(path):
+    def _read_file(cache_file):
         try:
-            if not path:
-                return
-            cache_file = CacheUtils.get_cache_file_path()
-            cache_data = {}
             if cache_file and os.path.exists(cache_file):
                 with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-            cache_data['export_path'] = path
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-        except:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    return data
+        except Exception:
             pass
+        return {}
 
     @staticmethod
-    def load_cached_export_path():
+    def _get_mtime(cache_file):
         try:
+            return os.path.getmtime(cache_file)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _apply(data, path, value):
+        target = data
+        for key in path[:-1]:
+            if not isinstance(target.get(key), dict):
+                target[key] = {}
+            target = target[key]
+        target[path[-1]] = value
+
+    @staticmethod
+    def _get_data():
+        """获取内存中的设置，磁盘文件被修改过时重新读取并叠加本实例未写入的修改"""
+        with CacheUtils._lock:
             cache_file = CacheUtils.get_cache_file_path()
-            if cache_file and os.path.exists(cache_file):
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    return cache_data.get('export_path', '')
-        except:
-            pass
-        return ''
+            mtime = CacheUtils._get_mtime(cache_file)
+            if CacheUtils._data is None or mtime != CacheUtils._mtime:
+                data = CacheUtils._read_file(cache_file)
+                for path, value in CacheUtils._pending.items():
+                    CacheUtils._apply(data, path, value)
+                CacheUtils._data = data
+                CacheUtils._mtime = mtime
+            return CacheUtils._data
 
     @staticmethod
-    def save_cached_excel_path(path):
+    def _get(path, default=None):
         try:
-            if not path:
+            value = CacheUtils._get_data()
+            for key in path:
+                value = value[key]
+            return value
+        except Exception:
+            return default
+
+    @staticmethod
+    def _set(path, value):
+        with CacheUtils._lock:
+            data = CacheUtils._get_data()
+            CacheUtils._apply(data, path, value)
+            CacheUtils._pending[path] = value
+            # 新的保存重新开始计算写入失败次数
+            CacheUtils._failed_writes = 0
+            CacheUtils._schedule_write()
+
+    @staticmethod
+    def _schedule_write(delay=None):
+        if CacheUtils._timer is not None:
+            CacheUtils._timer.cancel()
+        CacheUtils._timer = threading.Timer(CacheUtils.WRITE_DELAY if delay is None else delay, CacheUtils.flush)
+        CacheUtils._timer.daemon = True
+        CacheUtils._timer.start()
+
+    @staticmethod
+    def _get_file_lock(lock_path):
+        # 复用同一个锁对象，写入重试时继续累计对遗留锁文件的观察时间
+        if CacheUtils._file_lock is None or CacheUtils._file_lock.path != lock_path:
+            CacheUtils._file_lock = FileLock(lock_path, CacheUtils.LOCK_TIMEOUT, CacheUtils.STALE_LOCK_SECONDS)
+        return CacheUtils._file_lock
+
+    @staticmethod
+    def flush():
+        """立即把未写入的修改保存到磁盘"""
+        with CacheUtils._lock:
+            if CacheUtils._timer is not None:
+                CacheUtils._timer.cancel()
+                CacheUtils._timer = None
+            if not CacheUtils._pending:
                 return
-            cache_file = CacheUtils.get_cache_file_path()
-            cache_data = {}
-            if cache_file and os.path.exists(cache_file):
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-            cache_data['excel_path'] = path
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-        except:
-            pass
+            pending = dict(CacheUtils._pending)
+            CacheUtils._pending.clear()
+        cache_file = CacheUtils.get_cache_file_path()
+        file_lock = CacheUtils._get_file_lock(cache_file + '.lock')
+        written = False
+        try:
+            locked = file_lock.acquire()
+        except OSError:
+            locked = False
+        if locked:
+            try:
+                # 以磁盘上的最新内容为基础，只覆盖本实例修改过的项
+                data = CacheUtils._read_file(cache_file)
+                for path, value in pending.items():
+                    CacheUtils._apply(data, path, value)
+                temp_path = f'{cache_file}.{os.getpid()}.tmp'
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(temp_path, cache_file)
+                written = True
+            except Exception:
+                pass
+            finally:
+                file_lock.release()
+        with CacheUtils._lock:
+            if written:
+                CacheUtils._failed_writes = 0
+                CacheUtils._data = None
+                CacheUtils._get_data()
+                return
+            # 写入失败时保留修改（期间的新修改优先），按指数退避重试
+            for path, value in pending.items():
+                CacheUtils._pending.setdefault(path, value)
+            CacheUtils._failed_writes += 1
+            if CacheUtils._failed_writes < CacheUtils.MAX_WRITE_ATTEMPTS:
+                CacheUtils._schedule_write(CacheUtils.WRITE_DELAY * 2 ** CacheUtils._failed_writes)
+                return
+        LogUtils.warn(f'保存设置缓存连续失败 {CacheUtils.MAX_WRITE_ATTEMPTS} 次，暂停自动重试，下次修改设置时再保存: {cache_file}')
+
+    @staticmethod
+    def save_cached_export_path(path):
+        if not path:
+            return
+        CacheUtils._set(('export_path',), path)
+
+    @staticmethod
+    def load_cached_export_path():
+        return CacheUtils._get(('export_path',), '')
+
+    @staticmethod
+    def save_cached_excel_path(path):
+        if not path:
+            return
+        CacheUtils._set(('excel_path',), path)
 
     @staticmethod
     def load_cached_excel_path():
-        try:
-            cache_file = CacheUtils.get_cache_file_path()
-            if cache_file and os.path.exists(cache_file):
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    return cache_data.get('excel_path', '')
-        except:
-            pass
-        return ''
+        return CacheUtils._get(('excel_path',), '')
 
     @staticmethod
     def save_cached_ignore_version(ignore_version):
-        try:
-            cache_file = CacheUtils.get_cache_file_path()
-            cache_data = {}
-            if cache_file and os.path.exists(cache_file):
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-            cache_data['ignore_version'] = ignore_version
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(cache_data, f, ensure_ascii=False, indent=2)
-        except:
-            pass
+        CacheUtils._set(('ignore_version',), ignore_version)
 
     @staticmethod
     def load_cached_ignore_version():
-        try:
-            cache_file = CacheUtils.get_cache_file_path()
-            if cache_file and os.path.exists(cache_file):
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-                    return cache_data.get('ignore_version', True)  # 默认值为True
-        except:
-            pass
-        return True  # 默认值为True 
\ No newline at end of file
+        return CacheUtils._get(('ignore_version',), True)  # 默认值为True
+
+    @staticmethod
+    def save_cached_option(key, value):
+        CacheUtils._set(('options', key), value)
+
+    @staticmethod
+    def load_cached_option(key, default=None):
+        return CacheUtils._get(('options', key), default)
+
+
+# Fusion 退出时写入尚未保存的设置
+atexit.register(CacheUtils.flush)
@@ -2,6 +2,7 @@ import adsk.core, adsk.fusion, traceback
 import json
 from .LogUtils import LogUtils
 from .CacheUtils import CacheUtils
+from .OptionUtils import OptionUtils
 
 class CommandCreatedEventHandler(adsk.core.CommandCreatedEventHandler):
     def __init__(self, batch_exporter, handlers):
@@ -64,11 +65,21 @@ class CommandCreatedEventHandler(adsk.core.CommandCreatedEventHandler):
             # Excel操作按钮
             excelInputs.addBoolValueInput('exportTemplate', '📤 导出模板', False)
             excelInputs.addBoolValueInput('openExcelFile', '📂 打开Excel文件', False)
+            # 按历史耗时预估批次耗时和输出大小（不修改设计）
+            excelInputs.addBoolValueInput('estimateExport', '⏱️ 预估导出耗时', False)
             # 添加自定义批量导出按钮
             excelInputs.addBoolValueInput('batchExport', '🚀 批量导出', False)
+            # 按导出日志继续上次中断的批次，或恢复中断前的参数和可见性
+            excelInputs.addBoolValueInput('resumeExport', '⏯️ 继续上次导出', False)
+            excelInputs.addBoolValueInput('restoreFromJournal', '↩️ 从导出日志恢复参数', False)
+            # 多个 Fusion 实例通过共享目录中的队列分担同一批次
+            excelInputs.addBoolValueInput('queueExport', '🤝 共享队列导出', False)
             # 移除excelTip相关的addTextBoxCommandInput，不再添加Excel操作提示文本
             # 不再添加备用配置管理按钮和分组
 
+            # 高级选项组（默认折叠）
+            OptionUtils.add_option_inputs(inputs)
+
             # 将参数信息移动到面板最末尾，并设置最大高度为300像素，超出时显示滚动条
             param_count = len(self.batch_exporter.parameters)
             param_info = f"当前标星参数 (共{param_count}个):\n"
@@ -3,6 +3,8 @@ import os
 from .LogUtils import LogUtils
 from .ConfigUtils import ConfigUtils
 from .CacheUtils import CacheUtils
+from .OptionUtils import OptionUtils
+from .SweepUtils import ConfigSweep
 
 class CommandExecuteHandler(adsk.core.CommandEventHandler):
     def __init__(self, batch_exporter, handlers):
@@ -54,18 +56,25 @@ class CommandExecuteHandler(adsk.core.CommandEventHandler):
             except Exception as e:
                 LogUtils.warn(f'保存忽略版本号设置失败: {str(e)}')
             
+            # 获取高级选项
+            options = OptionUtils.collect_options(inputs)
+            # 日志设置在读取Excel之前生效
+            LogUtils.configure(min_level=options['log_level'], jsonl=options['log_jsonl'])
+            
             # 从Excel文件读取配置
-            export_configs = self.collect_export_configs_from_excel(inputs)
+            export_configs = self.collect_export_configs_from_excel(inputs, options)
             if export_configs is None:  # 读取失败
                 return
             if not export_configs:
                 ui.messageBox('❌ 请先创建Excel配置文件并添加至少一组导出配置')
                 return
+            if not self.confirm_expanded_configs(export_configs):
+                LogUtils.info('用户取消了批量导出')
+                return
                 
             # 执行批量导出
-            self.batch_exporter.execute_batch_export(export_configs, export_path, ignore_version)
-            
-            ui.messageBox('✅ 导出完成！\n\n💡 提示：\n• 所有配置已成功导出\n• 每个零件已保存到对应子目录\n• 您可以继续编辑Excel文件进行新的导出')
+            result = self.batch_exporter.execute_batch_export(export_configs, export_path, ignore_version, options)
+            self.batch_exporter.show_batch_result(result)
             
         except Exception as e:
             LogUtils.error(f'执行导出时发生错误: {str(e)}')
@@ -73,7 +82,7 @@ class CommandExecuteHandler(adsk.core.CommandEventHandler):
             if ui:
                 ui.messageBox(f'❌ 执行导出时发生错误:\n{str(e)}')
 
-    def collect_export_configs_from_excel(self, inputs):
+    def collect_export_configs_from_excel(self, inputs, options=None):
         """从Excel文件收集导出配置"""
         try:
             # 获取Excel文件路径
@@ -94,7 +103,10 @@ class CommandExecuteHandler(adsk.core.CommandEventHandler):
                 return []
             
             # 从Excel文件读取配置
-            configs = ConfigUtils.read_configs_from_excel(excel_path, self.batch_exporter.parameters)
+            configs = ConfigUtils.read_configs_from_excel(
+                excel_path, self.batch_exporter.parameters,
+                persist_cache=bool(options and options.get('persist_config_cache'))
+            )
             
             if configs is None:  # 读取失败，错误信息已在read_configs_from_excel中显示
                 return None
@@ -107,20 +119,49 @@ class CommandExecuteHandler(adsk.core.CommandEventHandler):
             export_configs = []
             for config in configs:
                 export_config = {
-                    'format': config.get('format', 'step').lower(),
+                    'formats': ConfigUtils.parse_formats(config.get('format', 'step')),
                     'custom_name': config.get('name', ''),
-                    'parameters': config.get('parameters', {})
+                    'parameters': config.get('parameters', {}),
+                    'mesh_refinement': ConfigUtils.parse_mesh_refinement(config.get('mesh')),
+                    'sweep_mode': config.get('sweep_mode')
                 }
                 # 验证必要字段，去除空格
                 if not export_config['custom_name'] or not export_config['custom_name'].strip():
                     LogUtils.error('配置中自定义名称不能为空')
                     continue
+                if not export_config['formats']:
+                    LogUtils.error(f'配置 {export_config["custom_name"].strip()} 的导出格式无效: {config.get("format")}，已跳过')
+                    continue
                 export_config['custom_name'] = export_config['custom_name'].strip()
                 export_configs.append(export_config)
             
-            LogUtils.info(f'从Excel文件读取了 {len(export_configs)} 个有效配置')
+            # 参数扫描：含范围/列表写法的行在导出时才逐个展开
+            export_configs = ConfigSweep.from_configs(export_configs)
+            if export_configs.is_expanded:
+                LogUtils.info(f'从Excel文件读取了 {export_configs.row_count} 行有效配置，展开为 {len(export_configs)} 个配置')
+            else:
+                LogUtils.info(f'从Excel文件读取了 {len(export_configs)} 个有效配置')
             return export_configs
             
         except Exception as e:
             LogUtils.error(f'从Excel文件收集配置时发生错误: {str(e)}')
-            return []
\ No newline at end of file
+            return []
+
+    def confirm_expanded_configs(self, export_configs):
+        """有参数扫描时在导出前显示展开后的配置数量，用户取消时返回False"""
+        if not getattr(export_configs, 'is_expanded', False):
+            return True
+        names = export_configs.preview_names(10)
+        message = f'Excel中的 {export_configs.row_count} 行配置展开为 {len(export_configs)} 个配置：\n'
+        message += '\n'.join(f'• {name}' for name in names)
+        if len(export_configs) > len(names):
+            message += '\n...'
+        LogUtils.info(message)
+        ui = adsk.core.Application.get().userInterface
+        result = ui.messageBox(
+            f'{message}\n\n是否开始导出？',
+            '参数扫描',
+            adsk.core.MessageBoxButtonTypes.OKCancelButtonType,
+            adsk.core.MessageBoxIconTypes.InformationIconType
+        )
+        return result == adsk.core.DialogResults.DialogOK
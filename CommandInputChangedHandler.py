@@ -7,6 +7,7 @@ from .ConfigUtils import ConfigUtils
 import datetime
 from .LogUtils import LogUtils
 from .CacheUtils import CacheUtils
+from .OptionUtils import OptionUtils
 
 class CommandInputChangedHandler(adsk.core.InputChangedEventHandler):
     def __init__(self, batch_exporter, handlers):
@@ -110,7 +111,27 @@ class CommandInputChangedHandler(adsk.core.InputChangedEventHandler):
                     LogUtils.info('忽略版本号设置已保存到缓存')
                 except Exception as e:
                     LogUtils.warn(f'保存忽略版本号设置失败: {str(e)}')
-            elif changedInput.id == 'batchExport':
+            elif OptionUtils.is_option_input(changedInput.id):
+                try:
+                    OptionUtils.save_option(changedInput)
+                except Exception as e:
+                    LogUtils.warn(f'保存高级选项失败: {str(e)}')
+            elif changedInput.id == 'estimateExport':
+                if changedInput.value:
+                    try:
+                        options = OptionUtils.collect_options(cmd_inputs)
+                        LogUtils.configure(min_level=options['log_level'], jsonl=options['log_jsonl'])
+                        from .CommandExecuteHandler import CommandExecuteHandler
+                        handler = CommandExecuteHandler(self.batch_exporter, self.handlers)
+                        export_configs = handler.collect_export_configs_from_excel(cmd_inputs, options)
+                        if not export_configs:
+                            ui.messageBox('❌ 请先创建Excel配置文件并添加至少一组导出配置')
+                        else:
+                            self.batch_exporter.estimate_batch(export_configs)
+                    except Exception as e:
+                        LogUtils.error(f'预估导出耗时时发生错误: {str(e)}')
+                    changedInput.value = False
+            elif changedInput.id in ('batchExport', 'resumeExport', 'restoreFromJournal', 'queueExport'):
                 if changedInput.value:
                     try:
                         # 获取导出路径
@@ -145,16 +166,41 @@ class CommandInputChangedHandler(adsk.core.InputChangedEventHandler):
                         except Exception as e:
                             LogUtils.warn(f'获取忽略版本号设置失败: {str(e)}')
                         
+                        if changedInput.id == 'restoreFromJournal':
+                            if self.batch_exporter.restore_from_journal(export_path, ignore_version):
+                                ui.messageBox('✅ 已按导出日志恢复参数和可见性')
+                            changedInput.value = False
+                            return
+                        
+                        # 获取高级选项（日志设置在读取Excel之前生效）
+                        options = OptionUtils.collect_options(cmd_inputs)
+                        LogUtils.configure(min_level=options['log_level'], jsonl=options['log_jsonl'])
+                        
+                        # 已有未结束的共享导出队列时直接加入，无需读取Excel
+                        if changedInput.id == 'queueExport' and self.batch_exporter.queue_is_active(export_path, ignore_version):
+                            self.batch_exporter.run_queue_worker(None, export_path, ignore_version, options)
+                            changedInput.value = False
+                            return
+                        
                         # 获取导出配置
                         from .CommandExecuteHandler import CommandExecuteHandler
                         handler = CommandExecuteHandler(self.batch_exporter, self.handlers)
-                        export_configs = handler.collect_export_configs_from_excel(cmd_inputs)
+                        export_configs = handler.collect_export_configs_from_excel(cmd_inputs, options)
                         if not export_configs:
                             ui.messageBox('❌ 请先创建Excel配置文件并添加至少一组导出配置')
                             changedInput.value = False
                             return
-                        self.batch_exporter.execute_batch_export(export_configs, export_path, ignore_version)
-                        ui.messageBox('✅ 导出完成！\n\n💡 提示：\n• 所有配置已成功导出\n• 每个零件已保存到对应子目录\n• 您可以继续编辑Excel文件进行新的导出')
+                        if not handler.confirm_expanded_configs(export_configs):
+                            LogUtils.info('用户取消了批量导出')
+                            changedInput.value = False
+                            return
+                        if changedInput.id == 'queueExport':
+                            self.batch_exporter.run_queue_worker(export_configs, export_path, ignore_version, options)
+                            changedInput.value = False
+                            return
+                        result = self.batch_exporter.execute_batch_export(export_configs, export_path, ignore_version, options,
+                                                                          resume=changedInput.id == 'resumeExport')
+                        self.batch_exporter.show_batch_result(result)
                     except Exception as e:
                         LogUtils.error(f'执行导出时发生错误: {str(e)}')
                         ui.messageBox(f'❌ 执行导出时发生错误:\n{str(e)}')
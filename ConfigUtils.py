@@ -1,5 +1,7 @@
 import sys
 import os
+import hashlib
+import tempfile
 import adsk.core, adsk.fusion, json
 from .LogUtils import LogUtils
 
@@ -8,6 +10,69 @@ if plugin_dir not in sys.path:
     sys.path.insert(0, plugin_dir)
 
 class ConfigUtils:
+    # 支持的导出格式
+    SUPPORTED_FORMATS = ['step', 'iges', 'stl', 'obj', '3mf']
+
+    @staticmethod
+    def parse_formats(format_value):
+        """
+        解析导出格式单元格，支持用逗号、分号或空格分隔的多个格式，如 "step,stl,3mf"
+        :param format_value: 单元格内容
+        :return: 去重后的格式列表（保持原顺序）；单元格为空时返回 ['step']，只有不支持的格式时返回空列表
+        """
+        import re
+        items = [item for item in re.split(r'[,;，；/\s]+', str(format_value or '').strip().lower()) if item]
+        if not items:
+            return ['step']
+        formats = []
+        for item in items:
+            if item not in ConfigUtils.SUPPORTED_FORMATS:
+                LogUtils.warn(f'不支持的导出格式: {item}，已忽略')
+                continue
+            if item not in formats:
+                formats.append(item)
+        return formats
+
+    # 可选的网格精度列
+    MESH_HEADER = '网格精度'
+    # 可选的展开方式列（参数扫描时 cartesian 组合或 zip 按位置对应）
+    SWEEP_MODE_HEADER = '展开方式'
+    # 网格精度预设及中文别名
+    MESH_PRESETS = {
+        'coarse': 'coarse', 'low': 'coarse', '粗糙': 'coarse', '低': 'coarse',
+        'medium': 'medium', '中等': 'medium', '中': 'medium',
+        'fine': 'fine', 'high': 'fine', '精细': 'fine', '高': 'fine',
+        'adaptive': 'adaptive', 'auto': 'adaptive', '自适应': 'adaptive',
+    }
+
+    @staticmethod
+    def parse_mesh_refinement(mesh_value):
+        """
+        解析网格精度单元格
+        支持 coarse / medium / fine / adaptive（及中文别名），
+        或用逗号分隔的 "弦高误差mm,法向偏差度[,最大边长mm]"，如 "0.05,15,2"
+        :param mesh_value: 单元格内容
+        :return: 网格精度设置字典，单元格为空或无效时返回None
+        """
+        import re
+        text = str(mesh_value or '').strip().lower()
+        if not text:
+            return None
+        if text in ConfigUtils.MESH_PRESETS:
+            return {'mode': ConfigUtils.MESH_PRESETS[text]}
+        try:
+            values = [float(item) for item in re.split(r'[,;，；/\s]+', text) if item]
+            if len(values) in (2, 3) and values[0] > 0 and values[1] > 0:
+                return {
+                    'mode': 'custom',
+                    'surface_deviation': values[0],
+                    'normal_deviation': values[1],
+                    'max_edge_length': values[2] if len(values) == 3 and values[2] > 0 else None,
+                }
+        except ValueError:
+            pass
+        LogUtils.warn(f'无效的网格精度: {mesh_value}，使用默认设置')
+        return None
 
     @staticmethod
     def write_configs_to_excel(file_path: str, configs: list, parameters: list):
@@ -71,11 +136,15 @@ class ConfigUtils:
             return False
 
     @staticmethod
-    def read_configs_from_excel(file_path: str, parameters: list):
+    def read_configs_from_excel(file_path: str, parameters: list, persist_cache=False):
         """
         从Excel文件读取配置
+        以只读模式流式读取：表头只解析一次，数据行按值元组逐行读取，不创建单元格对象。
+        解析结果按文件路径、修改时间、大小和内容哈希缓存，文件未变化时直接返回缓存；
+        文件变化时只重新解析内容发生变化的行
         :param file_path: Excel文件路径
         :param parameters: 参数列表
+        :param persist_cache: 是否把解析结果同时保存到磁盘（Fusion重启后仍可复用）
         :return: 配置列表或None
         """
         try:
@@ -85,61 +154,115 @@ class ConfigUtils:
                 LogUtils.error(f'Excel文件不存在: {file_path}')
                 return None
             
-            wb = load_workbook(file_path)
-            ws = wb.active
+            ParsedConfigCache.persist = bool(persist_cache)
+            fingerprint = ParsedConfigCache.fingerprint(file_path)
+            entry = ParsedConfigCache.get(file_path)
+            if ParsedConfigCache.is_unchanged(entry, fingerprint, file_path):
+                if not ConfigUtils._check_header(entry['header'], parameters):
+                    return None
+                configs = ParsedConfigCache.copy_configs(entry)
+                LogUtils.info(f'Excel文件未变化，使用已解析的 {len(configs)} 个配置: {file_path}')
+                return configs
             
-            # 验证表头
-            header_validation = ConfigUtils._validate_excel_headers(ws, parameters)
-            if not header_validation['valid']:
-                error_msg = f"Excel文件表头验证失败:\n{header_validation['error_msg']}"
-                LogUtils.error(error_msg)
-                # 显示错误信息给用户
-                import adsk.core
-                ui = adsk.core.Application.get().userInterface
-                if ui:
-                    ui.messageBox(error_msg)
-                return None
-            
-            configs = []
-            
-            # 从第二行开始读取数据（第一行是表头）
-            for row in range(2, ws.max_row + 1):
-                format_val = ws.cell(row=row, column=1).value
-                name_val = ws.cell(row=row, column=2).value
-                
-                if not format_val and not name_val:
-                    continue  # 跳过空行
-                
-                config = {
-                    'format': format_val or 'step',
-                    'name': name_val or '',
-                    'parameters': {}
-                }
-                
-                # 读取参数值 - 按参数名匹配，而不是按位置
-                # 获取Excel表头中的参数名
-                excel_param_headers = []
-                for col in range(3, ws.max_column + 1):  # 从第3列开始（跳过导出格式和自定义名称）
-                    header_value = ws.cell(row=1, column=col).value
-                    if header_value:
-                        param_name = ConfigUtils._extract_param_name_from_header(str(header_value).strip())
-                        excel_param_headers.append((col, param_name))
+            wb = load_workbook(file_path, read_only=True)
+            try:
+                ws = wb.active
+                rows = ws.iter_rows(values_only=True)
+                header_row = next(rows, ())
                 
-                # 按参数名匹配读取值
-                for col, excel_param_name in excel_param_headers:
-                    param_value = ws.cell(row=row, column=col).value
-                    if param_value is not None:
-                        config['parameters'][excel_param_name] = str(param_value)
-                        LogUtils.info(f'读取参数: {excel_param_name} = {param_value}')
+                # 验证表头
+                if not ConfigUtils._check_header(header_row, parameters):
+                    return None
                 
-                configs.append(config)
+                # 按参数名匹配读取值：表头只解析一次，得到 列序号 -> 参数名
+                column_map = ConfigUtils._build_column_map(header_row)
+                # 表头未变时，内容相同的行直接复用上次的解析结果
+                previous = ParsedConfigCache.rows_by_key(entry, header_row)
+                row_entries = []
+                reused = 0
+                for row in rows:
+                    row_key = ParsedConfigCache.row_key(row)
+                    config = previous.get(row_key)
+                    if config is None:
+                        config = ConfigUtils._parse_config_row(row, column_map)
+                        if config is None:
+                            continue
+                    else:
+                        reused += 1
+                    row_entries.append((row_key, config))
+            finally:
+                wb.close()
             
-            LogUtils.info(f'从Excel文件读取了 {len(configs)} 个配置: {file_path}')
+            entry = ParsedConfigCache.store(file_path, fingerprint, header_row, row_entries)
+            configs = ParsedConfigCache.copy_configs(entry)
+            if reused:
+                LogUtils.info(f'从Excel文件读取了 {len(configs)} 个配置（{len(configs) - reused} 行有变化）: {file_path}')
+            else:
+                LogUtils.info(f'从Excel文件读取了 {len(configs)} 个配置: {file_path}')
             return configs
         except Exception as e:
             LogUtils.error(f'读取Excel文件失败: {str(e)}')
             return None
 
+    @staticmethod
+    def _check_header(header_row, parameters):
+        """验证表头，失败时提示用户并返回False"""
+        header_validation = ConfigUtils._validate_header_values(header_row, parameters)
+        if header_validation['valid']:
+            return True
+        error_msg = f"Excel文件表头验证失败:\n{header_validation['error_msg']}"
+        LogUtils.error(error_msg)
+        # 显示错误信息给用户
+        ui = adsk.core.Application.get().userInterface
+        if ui:
+            ui.messageBox(error_msg)
+        return False
+
+    @staticmethod
+    def _build_column_map(header_row):
+        """解析表头行，返回 [(列序号, 参数名)]（从第3列开始，跳过导出格式和自定义名称）"""
+        column_map = []
+        for index, header_value in enumerate(header_row):
+            if index < 2 or not header_value:
+                continue
+            param_name = ConfigUtils._extract_param_name_from_header(str(header_value).strip())
+            if param_name:
+                column_map.append((index, param_name))
+        return column_map
+
+    @staticmethod
+    def _parse_config_row(row, column_map):
+        """把一行数据（值元组）转换为配置，空行返回None"""
+        if not row:
+            return None
+        format_val = row[0]
+        name_val = row[1] if len(row) > 1 else None
+        
+        if not format_val and not name_val:
+            return None  # 跳过空行
+        
+        config = {
+            'format': format_val or 'step',
+            'name': name_val or '',
+            'parameters': {}
+        }
+        row_length = len(row)
+        for index, excel_param_name in column_map:
+            if index >= row_length:
+                break
+            param_value = row[index]
+            if excel_param_name == ConfigUtils.MESH_HEADER:
+                # 网格精度列不是设计参数
+                config['mesh'] = param_value
+                continue
+            if excel_param_name == ConfigUtils.SWEEP_MODE_HEADER:
+                config['sweep_mode'] = param_value
+                continue
+            if param_value is not None:
+                config['parameters'][excel_param_name] = str(param_value)
+                LogUtils.debug(f'读取参数: {excel_param_name} = {param_value}')
+        return config
+
     @staticmethod
     def _extract_param_name_from_header(header):
         """从表头中提取参数名"""
@@ -158,15 +281,11 @@ class ConfigUtils:
         return header.strip()
 
     @staticmethod
-    def _validate_excel_headers(ws, parameters):
-        """验证Excel表头是否与当前参数匹配"""
+    def _validate_header_values(header_row, parameters):
+        """验证表头行（值元组）是否与当前参数匹配"""
         try:
             # 获取Excel表头
-            excel_headers = []
-            for col in range(1, ws.max_column + 1):
-                cell_value = ws.cell(row=1, column=col).value
-                if cell_value:
-                    excel_headers.append(str(cell_value).strip())
+            excel_headers = [str(value).strip() for value in header_row if value]
             
             # 检查基本表头
             if len(excel_headers) < 2:
@@ -185,7 +304,7 @@ class ConfigUtils:
             excel_param_names = []
             for header in excel_headers[2:]:  # 跳过前两列
                 param_name = ConfigUtils._extract_param_name_from_header(header)
-                if param_name:
+                if param_name and param_name not in (ConfigUtils.MESH_HEADER, ConfigUtils.SWEEP_MODE_HEADER):
                     excel_param_names.append(param_name)
             
             # 获取当前设计中的参数名
@@ -327,4 +446,139 @@ class ConfigUtils:
             return True
         except Exception as e:
             LogUtils.error(f'创建Excel模板失败: {str(e)}')
-            return False 
\ No newline at end of file
+            return False 
+
+class ParsedConfigCache:
+    """已解析的Excel配置缓存
+
+    以文件路径为键，记录文件修改时间、大小、内容哈希、表头和每一行的解析结果。
+    修改时间和大小不变，或内容哈希不变时视为未变化，不再打开工作簿；
+    文件变化时按行内容哈希复用未变化行的解析结果。
+    缓存保存在内存中，persist 为True时同时写入临时目录，Fusion重启后仍可复用。
+    """
+    CACHE_VERSION = 2
+    # 内存中最多保留的Excel文件数量
+    MAX_ENTRIES = 4
+
+    persist = False
+    _entries = {}
+    _disk_loaded = False
+
+    @staticmethod
+    def get_cache_file_path():
+        return os.path.join(tempfile.gettempdir(), 'Fusion360BatchParametricExport_configs.json')
+
+    @staticmethod
+    def _path_key(file_path):
+        return os.path.normcase(os.path.abspath(file_path))
+
+    @staticmethod
+    def fingerprint(file_path):
+        stat = os.stat(file_path)
+        return {'mtime': stat.st_mtime, 'size': stat.st_size}
+
+    @staticmethod
+    def content_hash(file_path):
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def row_key(row):
+        """行内容的哈希，用于判断行是否变化（忽略行尾空单元格，工作簿另存后行长度可能不同）"""
+        row = tuple(row or ())
+        end = len(row)
+        while end and row[end - 1] is None:
+            end -= 1
+        return hashlib.blake2b(repr(row[:end]).encode('utf-8'), digest_size=12).hexdigest()
+
+    @staticmethod
+    def get(file_path):
+        if ParsedConfigCache.persist and not ParsedConfigCache._disk_loaded:
+            ParsedConfigCache._load_disk()
+        return ParsedConfigCache._entries.get(ParsedConfigCache._path_key(file_path))
+
+    @staticmethod
+    def is_unchanged(entry, fingerprint, file_path):
+        """判断文件是否与缓存时一致；仅修改时间变化时比较内容哈希"""
+        if not entry:
+            return False
+        if entry['mtime'] == fingerprint['mtime'] and entry['size'] == fingerprint['size']:
+            return True
+        if entry['size'] != fingerprint['size']:
+            return False
+        if ParsedConfigCache.content_hash(file_path) != entry['hash']:
+            return False
+        entry['mtime'] = fingerprint['mtime']
+        return True
+
+    @staticmethod
+    def rows_by_key(entry, header_row):
+        """表头与缓存一致时返回 {行哈希: 配置}，否则返回空字典"""
+        if not entry or entry['header'] != ParsedConfigCache._header_list(header_row):
+            return {}
+        return dict(entry['rows'])
+
+    @staticmethod
+    def _header_list(header_row):
+        return [None if value is None else str(value) for value in header_row]
+
+    @staticmethod
+    def store(file_path, fingerprint, header_row, row_entries):
+        entry = {
+            'mtime': fingerprint['mtime'],
+            'size': fingerprint['size'],
+            'hash': ParsedConfigCache.content_hash(file_path),
+            'header': ParsedConfigCache._header_list(header_row),
+            'rows': row_entries,
+        }
+        entries = ParsedConfigCache._entries
+        key = ParsedConfigCache._path_key(file_path)
+        entries.pop(key, None)
+        entries[key] = entry
+        while len(entries) > ParsedConfigCache.MAX_ENTRIES:
+            entries.pop(next(iter(entries)))
+        if ParsedConfigCache.persist:
+            ParsedConfigCache._save_disk()
+        return entry
+
+    @staticmethod
+    def copy_configs(entry):
+        """返回配置副本，调用方修改配置不会影响缓存"""
+        return [dict(config, parameters=dict(config['parameters'])) for _, config in entry['rows']]
+
+    @staticmethod
+    def clear():
+        ParsedConfigCache._entries = {}
+
+    @staticmethod
+    def _load_disk():
+        ParsedConfigCache._disk_loaded = True
+        try:
+            cache_file = ParsedConfigCache.get_cache_file_path()
+            if not os.path.exists(cache_file):
+                return
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != ParsedConfigCache.CACHE_VERSION:
+                return
+            for key, entry in data.get('entries', {}).items():
+                entry['rows'] = [tuple(item) for item in entry['rows']]
+                ParsedConfigCache._entries.setdefault(key, entry)
+        except Exception as e:
+            LogUtils.warn(f'读取配置缓存失败: {str(e)}')
+
+    @staticmethod
+    def _save_disk():
+        """写入磁盘缓存（先写临时文件再替换）"""
+        try:
+            cache_file = ParsedConfigCache.get_cache_file_path()
+            temp_path = f'{cache_file}.{os.getpid()}.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': ParsedConfigCache.CACHE_VERSION, 'entries': ParsedConfigCache._entries},
+                          f, ensure_ascii=False, default=str)
+            os.replace(temp_path, cache_file)
+        except Exception as e:
+            LogUtils.warn(f'保存配置缓存失败: {str(e)}')
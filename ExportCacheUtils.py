@@ -0,0 +1,232 @@
+"""
+导出缓存模块
+按文档版本、参数、零件、格式和网格设置记录已导出的文件，重新运行批次时跳过未变化的导出
+"""
+
+import hashlib
+import json
+import os
+import threading
+from .LogUtils import LogUtils
+
+
+class ExportCache:
+    """持久化的导出缓存
+
+    索引保存在导出目录（导出路径/文档名）下的 .export_cache.json 中。
+    缓存键由文档标识与版本、完整参数集、配置名、零件名、格式和网格设置计算得出；
+    只有当记录的文件仍然存在且大小和哈希都一致时才视为命中。
+    """
+
+    INDEX_FILENAME = '.export_cache.json'
+    INDEX_VERSION = 1
+
+    def __init__(self, cache_dir, document_key, force_refresh=False, index_path=None):
+        """
+        :param index_path: 索引文件路径，默认为 cache_dir/.export_cache.json；
+            指定的索引不存在时从默认索引读取（共享队列中各实例使用自己的索引）
+        """
+        self.cache_dir = cache_dir
+        self.document_key = document_key
+        self.force_refresh = force_refresh
+        self.index_path = index_path or os.path.join(cache_dir, ExportCache.INDEX_FILENAME)
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._configs = {}
+        self._config_units = []
+        self._config_failed = False
+        self._dirty = False
+        # 后处理线程会补全文件哈希
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def get_document_key(document):
+        """获取文档标识（云端文件ID和版本号，未保存的文档使用文档名）"""
+        try:
+            data_file = document.dataFile
+            if data_file:
+                return f'{data_file.id}@v{data_file.versionNumber}'
+        except:
+            pass
+        try:
+            return f'unsaved:{document.name}'
+        except:
+            return 'unsaved'
+
+    @staticmethod
+    def file_hash(filepath):
+        """计算文件的SHA-256"""
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _load(self):
+        try:
+            load_path = self.index_path
+            if not os.path.exists(load_path):
+                load_path = os.path.join(self.cache_dir, ExportCache.INDEX_FILENAME)
+            if os.path.exists(load_path):
+                with open(load_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == ExportCache.INDEX_VERSION:
+                    self._entries = data.get('entries', {})
+                    self._configs = data.get('configs', {})
+        except Exception as e:
+            LogUtils.warn(f'读取导出缓存索引失败，将重新建立: {str(e)}')
+            self._entries = {}
+            self._configs = {}
+
+    def save(self):
+        """保存缓存索引（先写临时文件再替换，避免索引损坏）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            # 哈希尚未计算完成的记录不保存
+            entries = {key: dict(entry) for key, entry in self._entries.items() if entry.get('hash')}
+            configs = dict(self._configs)
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            temp_path = self.index_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': ExportCache.INDEX_VERSION,
+                    'entries': entries,
+                    'configs': configs,
+                }, f, ensure_ascii=False)
+            os.replace(temp_path, self.index_path)
+        except Exception as e:
+            LogUtils.warn(f'保存导出缓存索引失败: {str(e)}')
+
+    def _hash_key(self, *parts):
+        payload = json.dumps([self.document_key] + list(parts), ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def make_key(self, parameters, custom_name, comp_name, export_format, mesh_settings='medium'):
+        """计算单个零件导出的缓存键"""
+        return self._hash_key(parameters, custom_name, comp_name, export_format.lower(), mesh_settings)
+
+    def make_config_key(self, parameters, custom_name, export_formats, mesh_settings='medium'):
+        """计算整个配置的缓存键"""
+        return self._hash_key(parameters, custom_name, sorted(f.lower() for f in export_formats), mesh_settings)
+
+    def _relative(self, filepath):
+        return os.path.relpath(os.path.normpath(filepath), self.cache_dir)
+
+    def _is_valid(self, entry, filepath=None):
+        """检查缓存记录对应的文件是否仍然存在且未被修改"""
+        try:
+            if filepath is not None and entry.get('file') != self._relative(filepath):
+                return False
+            path = os.path.join(self.cache_dir, entry['file'])
+            if not os.path.isfile(path) or os.path.getsize(path) != entry.get('size'):
+                return False
+            return ExportCache.file_hash(path) == entry.get('hash')
+        except Exception:
+            return False
+
+    def lookup(self, key, filepath):
+        """查找零件导出缓存，命中时返回True"""
+        with self._lock:
+            entry = None if self.force_refresh else self._entries.get(key)
+        if entry and self._is_valid(entry, filepath):
+            self.hits += 1
+            self._config_units.append(key)
+            return True
+        self.misses += 1
+        return False
+
+    def record(self, key, filepath, defer_hash=False):
+        """记录一次成功的导出
+
+        defer_hash为True时暂不计算大小和哈希（文件可能仍在后台生成），由后处理线程调用update_hash补全。
+        """
+        try:
+            entry = {
+                'file': self._relative(filepath),
+                'size': None if defer_hash else os.path.getsize(filepath),
+                'hash': None if defer_hash else ExportCache.file_hash(filepath),
+            }
+            with self._lock:
+                self._entries[key] = entry
+                self._dirty = True
+            self._config_units.append(key)
+        except Exception as e:
+            LogUtils.warn(f'记录导出缓存失败: {filepath} {str(e)}')
+
+    def update_hash(self, key, filepath, file_hash):
+        """补全缓存记录的文件大小和哈希"""
+        size = os.path.getsize(filepath)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry.get('file') == self._relative(filepath):
+                entry['size'] = size
+                entry['hash'] = file_hash
+                self._dirty = True
+
+    def discard(self, key):
+        """删除一条缓存记录（如后台转换失败的文件）"""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._dirty = True
+
+    def record_failure(self):
+        """记录当前配置中有零件导出失败"""
+        self._config_failed = True
+
+    def begin_config(self):
+        self._config_units = []
+        self._config_failed = False
+
+    def end_config(self, config_key):
+        """配置中所有零件都成功时记录配置级缓存，返回该配置的缓存键列表（有失败时返回None）"""
+        units = None
+        if not self._config_failed and self._config_units:
+            units = list(self._config_units)
+            with self._lock:
+                self._configs[config_key] = units
+                self._dirty = True
+        self._config_units = []
+        return units
+
+    def merge(self, entries, configs, overwrite=False):
+        """合并其他来源（如导出日志、共享队列中其他实例的索引）中的记录，overwrite 为False时已有的记录不覆盖"""
+        with self._lock:
+            for key, entry in entries.items():
+                if (overwrite or key not in self._entries) and entry.get('hash'):
+                    self._entries[key] = dict(entry)
+                    self._dirty = True
+            for key, units in configs.items():
+                if overwrite or key not in self._configs:
+                    self._configs[key] = list(units)
+                    self._dirty = True
+
+    def merge_index(self, index_path):
+        """合并另一个索引文件（共享导出队列中其他实例的索引）中的记录，以该文件中的记录为准"""
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            LogUtils.warn(f'读取导出缓存索引失败 {index_path}: {str(e)}')
+            return
+        if data.get('version') == ExportCache.INDEX_VERSION:
+            self.merge(data.get('entries', {}), data.get('configs', {}), overwrite=True)
+
+    def lookup_config(self, config_key):
+        """检查整个配置是否都能从缓存中获得，命中时无需应用参数"""
+        if self.force_refresh:
+            return False
+        with self._lock:
+            units = self._configs.get(config_key)
+            entries = [self._entries.get(key) for key in units] if units else []
+        if not units:
+            return False
+        for entry in entries:
+            if not entry or not self._is_valid(entry):
+                return False
+        self.hits += len(units)
+        return True
@@ -5,18 +5,208 @@
 
 import adsk.core
 import adsk.fusion
+import json
+import math
 import os
+import shutil
+import threading
+import time
 from .LogUtils import LogUtils
+from .MeshUtils import MeshConverter
+from .TraceUtils import TraceUtils
+
+# ParametricText插件监听的更新事件
+PARAMETRIC_TEXT_UPDATE_EVENT = 'thomasa88_ParametricText_Ext_Update'
+# 本插件用于确认ParametricText更新完成的握手事件
+PARAMETRIC_TEXT_ACK_EVENT = 'BatchParametricExport_ParametricText_Ack'
+
+class VisibilityController:
+    """零件可见性控制器
+
+    首次隔离零件时记录原始可见性并隐藏所有实例，
+    之后切换零件只修改上一个和下一个零件的灯泡状态。
+    """
+    
+    def __init__(self, root_component):
+        self.root_component = root_component
+        self._all_occurrences = None
+        self._original_visibility = None
+        self._lit_occurrence = None
+        self._lit_token = None
+    
+    def all_occurrences(self):
+        """获取所有实例（每个控制器只枚举一次）"""
+        if self._all_occurrences is None:
+            self._all_occurrences = list(self.root_component.allOccurrences)
+        return self._all_occurrences
+    
+    def isolate(self, occurrence):
+        """只显示指定实例"""
+        with TraceUtils.span('visibility.isolate'):
+            self._isolate(occurrence)
+    
+    def _isolate(self, occurrence):
+        token = occurrence.entityToken
+        if self._original_visibility is None:
+            # 记录原始可见性并隐藏所有实例（使用lightBulb状态）
+            self._original_visibility = {}
+            for occ in self.all_occurrences():
+                is_on = occ.isLightBulbOn
+                self._original_visibility[occ.entityToken] = is_on
+                if is_on:
+                    occ.isLightBulbOn = False
+        elif self._lit_token == token:
+            return
+        elif self._lit_occurrence is not None:
+            self._lit_occurrence.isLightBulbOn = False
+        occurrence.isLightBulbOn = True
+        self._lit_occurrence = occurrence
+        self._lit_token = token
+    
+    def restore(self):
+        """恢复原始可见性"""
+        if self._original_visibility is None:
+            return
+        with TraceUtils.span('visibility.restore'):
+            self._restore()
+    
+    def _restore(self):
+        for occ in self.all_occurrences():
+            token = occ.entityToken
+            original = self._original_visibility.get(token)
+            if original is None:
+                continue
+            # 当前状态：只有最后隔离的实例是显示的
+            if original != (token == self._lit_token):
+                occ.isLightBulbOn = original
+        self._original_visibility = None
+        self._lit_occurrence = None
+        self._lit_token = None
+
+    @staticmethod
+    def snapshot(root_component):
+        """记录所有实例的可见性 {entityToken: 是否显示}"""
+        return {occ.entityToken: occ.isLightBulbOn for occ in root_component.allOccurrences}
+
+    @staticmethod
+    def apply_snapshot(root_component, snapshot):
+        """按记录恢复实例可见性，返回修改的实例数"""
+        changed = 0
+        for occ in root_component.allOccurrences:
+            original = snapshot.get(occ.entityToken)
+            if original is not None and occ.isLightBulbOn != original:
+                occ.isLightBulbOn = original
+                changed += 1
+        return changed
+
 
 class ExportManager:
     """导出管理器"""
     
+    # 受网格精度影响的格式
+    MESH_FORMATS = ('stl', 'obj', '3mf')
+    
     def __init__(self):
         self.app = adsk.core.Application.get()
         self.ui = self.app.userInterface
+        # 本批次各导出策略的成功次数（由STL转换的网格在后处理线程中完成转换后才计入）
+        self.strategy_counts = {}
+        self._counts_lock = threading.Lock()
+        # 本批次中按几何体导出失败的格式
+        self._geometry_failed_formats = set()
+        # 本批次已导出文件的几何指纹 {(零件名, 指纹, 格式[, 网格设置]): 文件路径}
+        self._fingerprint_files = {}
+        # 尚未写入耗时数据库的导出耗时 [(零件名, 格式, 秒, 文件路径)]
+        self.part_timings = []
+        # 本批次由STL生成网格失败的零件 [{'config', 'component', 'formats'}]（包括后处理线程中的转换失败）
+        self.derive_failures = []
+    
+    def begin_batch(self):
+        """批次开始时重置导出策略统计"""
+        self.strategy_counts = {}
+        self._geometry_failed_formats = set()
+        self.part_timings = []
+        self._fingerprint_files = {}
+        self.derive_failures = []
+    
+    def derive_failed_configs(self):
+        """由STL生成网格失败的配置名（需在后处理流水线 drain 之后调用）"""
+        with self._counts_lock:
+            return {failure['config'] for failure in self.derive_failures}
+    
+    @staticmethod
+    def _component_fingerprint(geometry):
+        """计算零件的几何指纹（体积、面积、包围盒、实体数和面数）
+
+        geometry为实例时使用实例的包围盒和变换矩阵，使位置不同的相同零件得到不同指纹。
+        无法计算时返回None。
+        """
+        try:
+            component = getattr(geometry, 'component', None) or geometry
+            bodies = component.bRepBodies
+            face_count = 0
+            for body in bodies:
+                face_count += body.faces.count
+            props = component.getPhysicalProperties(adsk.fusion.CalculationAccuracy.LowCalculationAccuracy)
+            box = geometry.boundingBox
+            values = [
+                props.volume, props.area,
+                box.minPoint.x, box.minPoint.y, box.minPoint.z,
+                box.maxPoint.x, box.maxPoint.y, box.maxPoint.z,
+            ]
+            transform = getattr(geometry, 'transform2', None)
+            if transform:
+                values.extend(transform.asArray())
+            return (bodies.count, face_count) + tuple(f'{value:.6g}' for value in values)
+        except Exception:
+            return None
+    
+    @staticmethod
+    def _reuse_key(comp_name, fingerprint, export_format, part_options):
+        """相同零件复用的键；网格格式还要求网格设置相同（各行的网格精度可以不同）"""
+        if export_format in ExportManager.MESH_FORMATS:
+            return comp_name, fingerprint, export_format, part_options['mesh_settings']
+        return comp_name, fingerprint, export_format
     
-    def export_design(self, design, export_path, export_format, custom_name, progress_callback=None):
-        """使用可见性控制导出设计中的所有子组件（每个零件单独导出）"""
+    def _reuse_identical_export(self, reuse_key, filepath):
+        """复用本批次中同一零件几何指纹相同的已导出文件（优先硬链接，失败时复制）
+
+        导出文件中包含零件名称，因此只在同名零件之间复用。
+        """
+        source = self._fingerprint_files.get(reuse_key)
+        if not source or source == filepath or not os.path.exists(source):
+            return False
+        try:
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            try:
+                os.link(source, filepath)
+            except OSError:
+                shutil.copy2(source, filepath)
+            return os.path.exists(filepath)
+        except Exception as e:
+            LogUtils.warn(f'复用已导出文件失败: {source} -> {filepath} {str(e)}')
+            return False
+    
+    def export_design(self, design, export_path, export_formats, custom_name, progress_callback=None, export_strategy='visibility',
+                      export_cache=None, cache_parameters=None, reuse_identical_parts=False, on_file_exported=None,
+                      single_tessellation=False, mesh_refinement=None, triangle_budget=20000):
+        """导出设计中的所有子组件（每个零件单独导出）
+
+        export_formats 可以是单个格式或格式列表；设计只计算一次，每个零件依次导出所有格式。
+
+        export_strategy:
+            visibility - 控制可见性后导出当前可见内容
+            geometry   - 直接指定零件实例导出，不修改可见性
+            auto       - 优先按几何体导出，某种格式失败后该格式改用可见性控制
+        export_cache 不为空时，缓存命中的零件跳过导出（cache_parameters为该配置的完整参数集）
+        reuse_identical_parts 为True时，几何指纹与本批次已导出零件相同的零件直接复用该文件
+        on_file_exported(result) 在每个文件写入后调用，用于后台后处理
+        single_tessellation 为True时 OBJ/3MF 不再由 Fusion 导出，而是由该零件的二进制STL转换生成
+        （有后处理流水线时在后台线程中转换），每个零件只网格化一次
+        mesh_refinement 为网格精度设置（见 ConfigUtils.parse_mesh_refinement），为空时使用中等精度；
+        自适应模式按每个零件的包围盒计算精度，使三角形数量不超过 triangle_budget
+        """
         try:
             if not design:
                 LogUtils.error('设计对象无效')
@@ -30,75 +220,104 @@ class ExportManager:
                 LogUtils.error('自定义名称不能为空')
                 return False
             
+            if isinstance(export_formats, str):
+                export_formats = [export_formats]
+            if not export_formats:
+                LogUtils.error('未指定导出格式')
+                return False
+            
             export_mgr = design.exportManager
             root_component = design.rootComponent
+            # 本配置中每个零件共用的导出选项
+            part_options = {
+                'export_strategy': export_strategy,
+                'export_cache': export_cache,
+                'cache_parameters': cache_parameters,
+                'on_file_exported': on_file_exported,
+                'mesh_refinement': mesh_refinement,
+                'triangle_budget': triangle_budget,
+                'mesh_settings': ExportManager.mesh_cache_settings(single_tessellation, mesh_refinement, triangle_budget),
+            }
+            # 单次网格化时由STL转换生成的格式
+            derived_formats = [f for f in export_formats if f.lower() in MeshConverter.DERIVED_FORMATS] if single_tessellation else []
             
             if not export_mgr or not root_component:
                 LogUtils.error('无法获取导出管理器或根组件')
                 return False
             
-            # 获取所有子组件（这是正确的方法）
-            child_components = []
-            for occurrence in root_component.occurrences:
-                child_components.append({
-                    'occurrence': occurrence,
-                    'component': occurrence.component,
-                    'name': occurrence.component.name
-                })
+            # 获取所有子组件，多个实例引用同一组件时只导出一次
+            child_components = self.group_child_components(root_component)
             
             if not child_components:
                 # 如果没有子组件，检查根组件是否有实体
                 if root_component.bRepBodies.count > 0:
                     if progress_callback:
                         progress_callback(root_component.name)
-                        adsk.doEvents()
                     # 直接导出根组件
-                    return self._export_single_format(export_mgr, export_path, export_format, custom_name, root_component.name, None)
+                    root_success = False
+                    fingerprint = None
+                    if reuse_identical_parts:
+                        with TraceUtils.span('fingerprint'):
+                            fingerprint = self._component_fingerprint(root_component)
+                    for export_format in export_formats:
+                        if export_format in derived_formats:
+                            continue
+                        if self._export_part(export_mgr, export_path, export_format, custom_name,
+                                             root_component.name, None, root_component, None, fingerprint, part_options):
+                            root_success = True
+                    if derived_formats and self._export_derived_meshes(export_mgr, export_path, export_formats, derived_formats, custom_name,
+                                                                       root_component.name, None, root_component, None, fingerprint, part_options):
+                        root_success = True
+                    return root_success
                 else:
                     LogUtils.warn('设计中没有找到可导出的零件')
                     return False
             
-            # 记录原始可见性（使用lightBulb状态）
-            original_visibility = {}
-            for occurrence in root_component.allOccurrences:
-                original_visibility[occurrence.entityToken] = occurrence.isLightBulbOn
+            # 可见性控制器：每个配置只枚举一次所有实例，切换零件时只修改前后两个零件
+            # 使用几何体导出时不会触碰可见性
+            visibility = VisibilityController(root_component)
             
             export_success_count = 0
             
-            # 为每个子组件单独导出
-            for comp_info in child_components:
-                try:
-                    occurrence = comp_info['occurrence']
-                    component = comp_info['component']
-                    comp_name = comp_info['name']
-                    
-                    # 隐藏所有组件（使用lightBulb属性）
-                    for occ in root_component.allOccurrences:
-                        occ.isLightBulbOn = False
-                    
-                    # 只显示目标组件
-                    occurrence.isLightBulbOn = True
-                    
-                    # 导出当前可见的组件
-                    if progress_callback:
-                        progress_callback(comp_name)
-                        adsk.doEvents()
-                    result = self._export_single_format(export_mgr, export_path, export_format, custom_name, comp_name, occurrence)
-                    
-                    if result:
-                        export_success_count += 1
+            try:
+                # 为每个子组件单独导出（使用该组件的第一个实例）
+                for comp_info in child_components:
+                    try:
+                        occurrence = comp_info['occurrences'][0]
+                        comp_name = comp_info['name']
                         
-                except Exception as comp_e:
-                    # 继续处理下一个组件
-                    continue
+                        if progress_callback:
+                            progress_callback(comp_name)
+                        # 重新计算后的几何指纹，每个零件只计算一次
+                        fingerprint = None
+                        if reuse_identical_parts:
+                            with TraceUtils.span('fingerprint'):
+                                fingerprint = self._component_fingerprint(occurrence)
+                        
+                        # 零件保持隔离状态，依次导出所有格式
+                        for export_format in export_formats:
+                            if export_format in derived_formats:
+                                continue
+                            if self._export_part(export_mgr, export_path, export_format, custom_name,
+                                                 comp_name, occurrence, occurrence, visibility, fingerprint, part_options):
+                                export_success_count += 1
+                        if derived_formats:
+                            export_success_count += self._export_derived_meshes(export_mgr, export_path, export_formats, derived_formats,
+                                                                                custom_name, comp_name, occurrence, occurrence,
+                                                                                visibility, fingerprint, part_options)
+                            
+                    except Exception as comp_e:
+                        # 继续处理下一个组件
+                        continue
+            finally:
+                # 恢复原始可见性
+                try:
+                    visibility.restore()
+                except Exception as restore_e:
+                    pass
             
-            # 恢复原始可见性
-            try:
-                for occurrence in root_component.allOccurrences:
-                    if occurrence.entityToken in original_visibility:
-                        occurrence.isLightBulbOn = original_visibility[occurrence.entityToken]
-            except Exception as restore_e:
-                pass
+            # 记录每个组件的实例数量，代替重复导出的文件
+            self._write_instance_manifest(export_path, custom_name, child_components)
             
             # 返回是否至少成功导出了一个组件
             return export_success_count > 0
@@ -107,7 +326,313 @@ class ExportManager:
             LogUtils.error(f'导出时发生错误: {str(e)}')
             return False
     
-    def _export_single_format(self, export_mgr, export_path, export_format, custom_name, comp_name, occurrence):
+    @staticmethod
+    def group_child_components(root_component):
+        """按引用的组件对根组件下的实例分组
+
+        :return: [{'component': 组件, 'name': 组件名, 'occurrences': [实例, ...]}]，保持实例的原始顺序
+        """
+        groups = {}
+        child_components = []
+        for occurrence in root_component.occurrences:
+            component = occurrence.component
+            key = getattr(component, 'id', None) or component.name
+            if key not in groups:
+                groups[key] = {
+                    'component': component,
+                    'name': component.name,
+                    'occurrences': []
+                }
+                child_components.append(groups[key])
+            groups[key]['occurrences'].append(occurrence)
+        return child_components
+    
+    def export_part_names(self, design):
+        """一个配置需要导出的零件名（每个组件只计一次；没有子组件时为根组件）"""
+        root_component = design.rootComponent
+        names = [comp_info['name'] for comp_info in self.group_child_components(root_component)]
+        if not names and root_component.bRepBodies.count > 0:
+            return [root_component.name]
+        return names
+    
+    def _write_instance_manifest(self, export_path, custom_name, child_components):
+        """写入组件实例数量清单 instances.json"""
+        try:
+            manifest = {
+                'config': custom_name,
+                'components': []
+            }
+            for comp_info in child_components:
+                occurrence_names = []
+                for occurrence in comp_info['occurrences']:
+                    try:
+                        occurrence_names.append(occurrence.name)
+                    except:
+                        pass
+                manifest['components'].append({
+                    'name': comp_info['name'],
+                    'file_prefix': f"{self._sanitize_filename(comp_info['name'])}-{self._sanitize_filename(custom_name)}",
+                    'instances': len(comp_info['occurrences']),
+                    'occurrences': occurrence_names
+                })
+            manifest_path = os.path.join(export_path, 'instances.json')
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            LogUtils.warn(f'写入实例清单失败: {str(e)}')
+    
+    @staticmethod
+    def mesh_cache_settings(single_tessellation=False, mesh_refinement=None, triangle_budget=20000):
+        """网格设置在缓存键中的表示，由STL转换的网格与Fusion直接导出的网格分开缓存"""
+        mode = (mesh_refinement or {}).get('mode', 'medium')
+        if mode == 'custom':
+            settings = 'custom:{surface_deviation:g}/{normal_deviation:g}/{max_edge_length}'.format(**mesh_refinement)
+        elif mode == 'adaptive':
+            settings = f'adaptive:{triangle_budget}'
+        else:
+            settings = mode
+        return settings + ':stl' if single_tessellation else settings
+    
+    @staticmethod
+    def _adaptive_mesh_settings(geometry, triangle_budget):
+        """按零件包围盒估算网格精度，使三角形数量大致不超过预算（长度单位mm，角度单位度）
+
+        以包围盒表面积估算三角形平均边长 L（面积 / 单个等边三角形面积 ≈ 预算），
+        再按半径为包围盒半对角线的曲面计算弦高误差 L² / (8r)。小零件得到较粗的网格，大零件得到较细的网格。
+        """
+        bbox = geometry.boundingBox
+        # Fusion内部长度单位为cm
+        dx = (bbox.maxPoint.x - bbox.minPoint.x) * 10
+        dy = (bbox.maxPoint.y - bbox.minPoint.y) * 10
+        dz = (bbox.maxPoint.z - bbox.minPoint.z) * 10
+        diagonal = math.sqrt(dx * dx + dy * dy + dz * dz)
+        area = 2 * (dx * dy + dy * dz + dz * dx)
+        if diagonal <= 0:
+            return None
+        budget = max(100, int(triangle_budget or 0))
+        edge = math.sqrt(max(area, diagonal * diagonal * 1e-4) / (budget * math.sqrt(3) / 4))
+        surface_deviation = edge * edge / (4 * diagonal)
+        surface_deviation = min(max(surface_deviation, 0.001), diagonal * 0.01)
+        return {
+            'mode': 'custom',
+            'surface_deviation': surface_deviation,
+            'normal_deviation': 15.0,
+            'max_edge_length': None,
+        }
+    
+    def _resolve_mesh_settings(self, mesh_refinement, geometry, triangle_budget):
+        """自适应模式下按零件计算具体的网格精度，其他模式原样返回"""
+        if not mesh_refinement or mesh_refinement.get('mode') != 'adaptive':
+            return mesh_refinement
+        try:
+            settings = self._adaptive_mesh_settings(geometry, triangle_budget)
+            if settings:
+                LogUtils.info(f'自适应网格精度: 弦高误差 {settings["surface_deviation"]:.4g}mm, 法向偏差 {settings["normal_deviation"]:g}°')
+            return settings
+        except Exception as e:
+            LogUtils.warn(f'计算自适应网格精度失败，使用中等精度: {str(e)}')
+            return None
+    
+    @staticmethod
+    def _apply_mesh_refinement(mesh_options, mesh_settings):
+        """把网格精度设置应用到 STL/OBJ/3MF 导出选项，为空时使用中等精度"""
+        mode = (mesh_settings or {}).get('mode', 'medium')
+        if mode == 'coarse':
+            mesh_options.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementLow
+        elif mode == 'fine':
+            mesh_options.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementHigh
+        elif mode == 'custom':
+            # API 使用 cm 和弧度
+            mesh_options.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementCustom
+            mesh_options.surfaceDeviation = mesh_settings['surface_deviation'] / 10
+            mesh_options.normalDeviation = math.radians(mesh_settings['normal_deviation'])
+            if mesh_settings.get('max_edge_length'):
+                mesh_options.maximumEdgeLength = mesh_settings['max_edge_length'] / 10
+        else:
+            mesh_options.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementMedium
+    
+    def _export_part(self, export_mgr, export_path, export_format, custom_name, comp_name, occurrence, geometry, visibility, fingerprint, part_options):
+        """按导出策略导出单个零件，并记录实际使用的策略"""
+        export_cache = part_options['export_cache']
+        on_file_exported = part_options['on_file_exported']
+        export_format = export_format.lower()
+        
+        # 缓存命中时直接复用已有文件
+        cache_key = None
+        filepath = self._build_filepath(export_path, custom_name, comp_name, export_format)
+        if export_cache:
+            if export_format in ExportManager.MESH_FORMATS:
+                cache_key = export_cache.make_key(part_options['cache_parameters'], custom_name, comp_name, export_format,
+                                                  part_options['mesh_settings'])
+            else:
+                cache_key = export_cache.make_key(part_options['cache_parameters'], custom_name, comp_name, export_format)
+            with TraceUtils.span('cache.lookup'):
+                cached = export_cache.lookup(cache_key, filepath)
+            if cached:
+                LogUtils.info(f'零件 {comp_name} 的 {export_format.upper()} 命中导出缓存，跳过导出')
+                return True
+        
+        started = time.perf_counter()
+        with TraceUtils.span('export_part', component=comp_name, format=export_format):
+            result, strategy_used = self._export_with_strategy(export_mgr, export_path, export_format, custom_name, comp_name,
+                                                               occurrence, geometry, visibility, fingerprint, part_options)
+        if result and strategy_used != 'reuse':
+            self.part_timings.append((comp_name, export_format, time.perf_counter() - started, filepath))
+        
+        strategy_label = {'geometry': '几何体', 'reuse': '复用相同零件'}.get(strategy_used, '可见性控制')
+        if result:
+            self.strategy_counts[strategy_used] = self.strategy_counts.get(strategy_used, 0) + 1
+            if fingerprint and strategy_used != 'reuse':
+                self._fingerprint_files[self._reuse_key(comp_name, fingerprint, export_format, part_options)] = filepath
+            LogUtils.info(f'零件 {comp_name} 导出 {export_format.upper()} 成功（策略: {strategy_label}）')
+            if export_cache:
+                # 有后处理流水线时由后台线程计算哈希
+                export_cache.record(cache_key, filepath, defer_hash=on_file_exported is not None)
+            if on_file_exported:
+                on_file_exported({
+                    'file': filepath,
+                    'config': custom_name,
+                    'component': comp_name,
+                    'format': export_format,
+                    'strategy': strategy_used,
+                    'cache_key': cache_key,
+                })
+        else:
+            LogUtils.warn(f'零件 {comp_name} 导出 {export_format.upper()} 失败（策略: {strategy_label}）')
+            if export_cache:
+                export_cache.record_failure()
+        return result
+    
+    def _export_with_strategy(self, export_mgr, export_path, export_format, custom_name, comp_name, occurrence, geometry, visibility, fingerprint, part_options):
+        """按导出策略导出单个格式，返回 (是否成功, 实际使用的策略)"""
+        export_strategy = part_options['export_strategy']
+        result = False
+        strategy_used = None
+        filepath = self._build_filepath(export_path, custom_name, comp_name, export_format)
+        mesh_settings = None
+        if export_format in ExportManager.MESH_FORMATS:
+            mesh_settings = self._resolve_mesh_settings(part_options['mesh_refinement'], geometry, part_options['triangle_budget'])
+        
+        # 本批次已导出过几何完全相同的零件时直接复用文件
+        if fingerprint and self._reuse_identical_export(self._reuse_key(comp_name, fingerprint, export_format, part_options), filepath):
+            result = True
+            strategy_used = 'reuse'
+        
+        if not result and export_strategy in ('geometry', 'auto') and export_format not in self._geometry_failed_formats:
+            result = self._export_single_format_geometry(export_mgr, export_path, export_format, custom_name, comp_name, geometry, mesh_settings)
+            strategy_used = 'geometry'
+            if not result and export_strategy == 'auto' and self._target_component(geometry).bRepBodies.count > 0:
+                # 该格式不支持按几何体导出，本批次后续零件直接使用可见性控制
+                self._geometry_failed_formats.add(export_format)
+                LogUtils.warn(f'{export_format.upper()} 按几何体导出失败，改用可见性控制')
+        
+        if not result and (export_strategy == 'visibility' or export_strategy == 'auto'):
+            # 只显示目标组件后导出当前可见内容
+            if visibility and occurrence:
+                visibility.isolate(occurrence)
+            result = self._export_single_format(export_mgr, export_path, export_format, custom_name, comp_name, occurrence, mesh_settings)
+            strategy_used = 'visibility'
+        
+        return result, strategy_used
+    
+    def _export_derived_meshes(self, export_mgr, export_path, export_formats, derived_formats, custom_name, comp_name,
+                               occurrence, geometry, visibility, fingerprint, part_options):
+        """单次网格化：由零件的二进制STL转换生成 OBJ/3MF，返回成功（或已提交转换）的格式数
+
+        本配置同时导出STL时直接使用该文件，否则先导出一个中间STL，转换后删除。
+        """
+        export_cache = part_options['export_cache']
+        on_file_exported = part_options['on_file_exported']
+        success_count = 0
+        targets = []
+        for export_format in derived_formats:
+            export_format = export_format.lower()
+            filepath = self._build_filepath(export_path, custom_name, comp_name, export_format)
+            cache_key = None
+            if export_cache:
+                cache_key = export_cache.make_key(part_options['cache_parameters'], custom_name, comp_name, export_format,
+                                                  part_options['mesh_settings'])
+                if export_cache.lookup(cache_key, filepath):
+                    LogUtils.info(f'零件 {comp_name} 的 {export_format.upper()} 命中导出缓存，跳过导出')
+                    success_count += 1
+                    continue
+            targets.append({
+                'file': filepath,
+                'config': custom_name,
+                'component': comp_name,
+                'format': export_format,
+                'strategy': 'mesh',
+                'cache_key': cache_key,
+            })
+        if not targets:
+            return success_count
+        
+        stl_requested = 'stl' in [f.lower() for f in export_formats]
+        stl_path = self._build_filepath(export_path, custom_name, comp_name, 'stl')
+        if stl_requested:
+            stl_ready = os.path.exists(stl_path)
+        else:
+            stl_ready, _ = self._export_with_strategy(export_mgr, export_path, 'stl', custom_name, comp_name,
+                                                      occurrence, geometry, visibility, fingerprint, part_options)
+        if not stl_ready:
+            LogUtils.warn(f'零件 {comp_name} 没有可用的STL，无法生成 {"/".join(t["format"].upper() for t in targets)}')
+            if export_cache:
+                export_cache.record_failure()
+            self._record_derive_failure(custom_name, comp_name, targets)
+            return success_count
+        
+        for target in targets:
+            # 删除旧文件，转换失败时不会留下上一次的结果
+            if os.path.exists(target['file']):
+                try:
+                    os.remove(target['file'])
+                except Exception:
+                    pass
+            if export_cache:
+                # 缓存记录在哈希补全前无效；转换失败时由 _derived_meshes_done 删除
+                export_cache.record(target['cache_key'], target['file'], defer_hash=True)
+        job = {
+            'file': stl_path,
+            'config': custom_name,
+            'component': comp_name,
+            'derive': targets,
+            'delete_source': not stl_requested,
+            'on_derived': lambda converted: self._derived_meshes_done(custom_name, comp_name, targets, export_cache, converted),
+        }
+        if on_file_exported:
+            # 在后处理线程中转换，生成的文件继续经过校验、哈希等阶段
+            on_file_exported(job)
+        else:
+            try:
+                MeshConverter.derive_stage(job)
+                for target in targets:
+                    if export_cache:
+                        export_cache.update_hash(target['cache_key'], target['file'], export_cache.file_hash(target['file']))
+            except Exception as e:
+                LogUtils.warn(f'零件 {comp_name} 由STL生成网格失败: {str(e)}')
+                return success_count
+        return success_count + len(targets)
+    
+    def _derived_meshes_done(self, custom_name, comp_name, targets, export_cache, converted):
+        """网格转换结束时调用（可能在后处理线程中）：成功时计入导出策略统计，失败时记录失败并删除对应的缓存记录"""
+        if converted:
+            with self._counts_lock:
+                self.strategy_counts['mesh'] = self.strategy_counts.get('mesh', 0) + len(targets)
+            return
+        self._record_derive_failure(custom_name, comp_name, targets)
+        if export_cache:
+            for target in targets:
+                export_cache.discard(target['cache_key'])
+    
+    def _record_derive_failure(self, custom_name, comp_name, targets):
+        with self._counts_lock:
+            self.derive_failures.append({
+                'config': custom_name,
+                'component': comp_name,
+                'formats': [target['format'] for target in targets],
+            })
+    
+    def _export_single_format(self, export_mgr, export_path, export_format, custom_name, comp_name, occurrence, mesh_settings=None):
         """导出单个格式的文件"""
         try:
             # 根据格式选择导出方法
@@ -116,11 +641,11 @@ class ExportManager:
             elif export_format.lower() == 'iges':
                 return self._export_iges_visibility(export_mgr, export_path, custom_name, comp_name)
             elif export_format.lower() == 'stl':
-                return self._export_stl_visibility(export_mgr, export_path, custom_name, comp_name, occurrence)
+                return self._export_stl_visibility(export_mgr, export_path, custom_name, comp_name, occurrence, mesh_settings)
             elif export_format.lower() == 'obj':
-                return self._export_obj_visibility(export_mgr, export_path, custom_name, comp_name, occurrence)
+                return self._export_obj_visibility(export_mgr, export_path, custom_name, comp_name, occurrence, mesh_settings)
             elif export_format.lower() == '3mf':
-                return self._export_3mf_visibility(export_mgr, export_path, custom_name, comp_name, occurrence)
+                return self._export_3mf_visibility(export_mgr, export_path, custom_name, comp_name, occurrence, mesh_settings)
             else:
                 return False
                 
@@ -166,7 +691,7 @@ class ExportManager:
             # 导出当前可见的内容
             step_options = export_mgr.createSTEPExportOptions(filepath)
             step_options.sendToPrintUtility = False
-            result = export_mgr.execute(step_options)
+            result = self._execute_export(export_mgr, step_options)
             
             return result and os.path.exists(filepath)
             
@@ -194,14 +719,14 @@ class ExportManager:
             iges_options = export_mgr.createIGESExportOptions('')
             iges_options.filename = filepath
             iges_options.sendToPrintUtility = False
-            result = export_mgr.execute(iges_options)
+            result = self._execute_export(export_mgr, iges_options)
             
             return result and os.path.exists(filepath)
             
         except Exception as e:
             return False
     
-    def _export_stl_visibility(self, export_mgr, export_path, custom_name, comp_name, occurrence):
+    def _export_stl_visibility(self, export_mgr, export_path, custom_name, comp_name, occurrence, mesh_settings=None):
         """基于可见性导出STL格式"""
         try:
             if not occurrence:
@@ -229,16 +754,16 @@ class ExportManager:
             stl_options = export_mgr.createSTLExportOptions(component)
             stl_options.filename = filepath
             stl_options.sendToPrintUtility = False
-            stl_options.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementMedium
+            self._apply_mesh_refinement(stl_options, mesh_settings)
             stl_options.isBinaryFormat = True
             
-            result = export_mgr.execute(stl_options)
+            result = self._execute_export(export_mgr, stl_options)
             return result and os.path.exists(filepath)
             
         except Exception as e:
             return False
     
-    def _export_obj_visibility(self, export_mgr, export_path, custom_name, comp_name, occurrence):
+    def _export_obj_visibility(self, export_mgr, export_path, custom_name, comp_name, occurrence, mesh_settings=None):
         """基于可见性导出OBJ格式"""
         try:
             if not occurrence:
@@ -266,15 +791,15 @@ class ExportManager:
             obj_options = export_mgr.createOBJExportOptions(component)
             obj_options.filename = filepath
             obj_options.sendToPrintUtility = False
-            obj_options.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementMedium
+            self._apply_mesh_refinement(obj_options, mesh_settings)
             
-            result = export_mgr.execute(obj_options)
+            result = self._execute_export(export_mgr, obj_options)
             return result and os.path.exists(filepath)
             
         except Exception as e:
             return False
     
-    def _export_3mf_visibility(self, export_mgr, export_path, custom_name, comp_name, occurrence):
+    def _export_3mf_visibility(self, export_mgr, export_path, custom_name, comp_name, occurrence, mesh_settings=None):
         """基于可见性导出3MF格式"""
         try:
             if not occurrence:
@@ -299,369 +824,384 @@ class ExportManager:
             if component.bRepBodies.count == 0:
                 return False
             
-            threemf_options = export_mgr.create3MFExportOptions(component)
+            threemf_options = self._create_3mf_options(export_mgr, component)
             threemf_options.filename = filepath
             threemf_options.sendToPrintUtility = False
-            threemf_options.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementMedium
+            self._apply_mesh_refinement(threemf_options, mesh_settings)
             
-            result = export_mgr.execute(threemf_options)
+            result = self._execute_export(export_mgr, threemf_options)
             return result and os.path.exists(filepath)
             
         except Exception as e:
             return False
     
-    def _export_step(self, export_mgr, export_path, custom_name, component):
-        """导出 STEP 格式 - 只导出指定组件"""
-        try:
-            # 获取组件名称，如果为空则使用默认名称
-            component_name = component.name
-            if not component_name or component_name.strip() == '':
-                component_name = f'Component_{id(component)}'  # 使用唯一ID
-            
-            # 清理文件名中的非法字符
-            safe_component_name = self._sanitize_filename(component_name)
-            safe_custom_name = self._sanitize_filename(custom_name)
-            
-            # 构建文件名
-            filename = f'{safe_component_name}-{safe_custom_name}.step'
-            
-            # 确保路径格式正确
-            filepath = os.path.normpath(os.path.join(export_path, filename))
-            
-            # 验证路径
-            if not filepath or not os.path.exists(export_path):
-                return False
-            
-            # 如果文件已存在，先删除
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except Exception as e:
-                    return False
-            
-            # 创建STEP导出选项 - 关键：指定要导出的组件
+    @staticmethod
+    def _execute_export(export_mgr, export_options):
+        """执行Fusion导出（单独计时）"""
+        with TraceUtils.span('exportManager.execute', file=os.path.basename(export_options.filename)):
+            return export_mgr.execute(export_options)
+    
+    def _build_filepath(self, export_path, custom_name, comp_name, extension):
+        """构建导出文件路径"""
+        safe_comp_name = self._sanitize_filename(comp_name)
+        safe_custom_name = self._sanitize_filename(custom_name)
+        filename = f'{safe_comp_name}-{safe_custom_name}.{extension}'
+        return os.path.normpath(os.path.join(export_path, filename))
+    
+    def _prepare_filepath(self, export_path, custom_name, comp_name, extension):
+        """构建导出文件路径并删除旧文件，旧文件无法删除时返回None"""
+        filepath = self._build_filepath(export_path, custom_name, comp_name, extension)
+        if os.path.exists(filepath):
             try:
-                # 创建一个临时的ObjectCollection，只包含要导出的组件的实体
-                object_collection = adsk.core.ObjectCollection.create()
-                
-                # 添加该组件的所有实体
-                for body in component.bRepBodies:
-                    object_collection.add(body)
-                
-                # 如果没有实体，跳过这个组件
-                if object_collection.count == 0:
-                    return False
-                
-                # 使用createSTEPExportOptions的重载版本，传入要导出的对象集合
-                step_options = export_mgr.createSTEPExportOptions(object_collection, filepath)
-                step_options.sendToPrintUtility = False
-                result = export_mgr.execute(step_options)
-                
-                if not result:
-                    # 尝试备用方法：创建空选项然后设置文件名和对象
-                    step_options = export_mgr.createSTEPExportOptions(object_collection, '')
-                    step_options.filename = filepath
-                    step_options.sendToPrintUtility = False
-                    result = export_mgr.execute(step_options)
-                    
+                os.remove(filepath)
             except Exception as e:
-                # 如果上面的方法失败，尝试传统方法但临时隐藏其他组件
-                return self._export_step_with_visibility(export_mgr, export_path, custom_name, component)
-            
-            # 验证文件是否真的被创建
-            return result and os.path.exists(filepath)
-            
-        except Exception as e:
+                return None
+        return filepath
+    
+    @staticmethod
+    def _target_component(geometry):
+        """获取导出目标（实例或组件）对应的组件"""
+        component = getattr(geometry, 'component', None)
+        return component if component else geometry
+    
+    @staticmethod
+    def _has_bodies(geometry):
+        """导出目标或其子组件中是否有实体（子装配体的实体在子组件中）"""
+        component = ExportManager._target_component(geometry)
+        if component.bRepBodies.count > 0:
+            return True
+        try:
+            return any(occurrence.component.bRepBodies.count > 0 for occurrence in component.allOccurrences)
+        except Exception:
             return False
     
-    def _export_step_with_visibility(self, export_mgr, export_path, custom_name, target_component):
-        """通过控制可见性来导出单个组件的STEP"""
+    @staticmethod
+    def _create_3mf_options(export_mgr, geometry):
+        """创建3MF导出选项（Fusion API中名为createC3MFExportOptions）"""
+        create = getattr(export_mgr, 'createC3MFExportOptions', None) or getattr(export_mgr, 'create3MFExportOptions')
+        return create(geometry)
+    
+    def _export_single_format_geometry(self, export_mgr, export_path, export_format, custom_name, comp_name, geometry, mesh_settings=None):
+        """直接指定导出目标几何体导出单个格式，不依赖可见性"""
         try:
-            # 获取设计
-            design = self.app.activeProduct
-            root_component = design.rootComponent
-            
-            # 记录原始可见性状态
-            original_visibility = {}
-            
-            # 隐藏所有其他组件
-            for occurrence in root_component.allOccurrences:
-                original_visibility[occurrence.entityToken] = occurrence.isVisible
-                if occurrence.component != target_component:
-                    occurrence.isVisible = False
-            
-            # 确保目标组件可见
-            for occurrence in root_component.allOccurrences:
-                if occurrence.component == target_component:
-                    occurrence.isVisible = True
-            
-            # 如果目标组件是根组件，隐藏其他根级实体
-            if target_component == root_component:
-                # 隐藏子组件，只保留根组件的实体
-                for occurrence in root_component.occurrences:
-                    original_visibility[occurrence.entityToken] = occurrence.isVisible
-                    occurrence.isVisible = False
-            
-            # 构建文件路径
-            component_name = target_component.name or f'Component_{id(target_component)}'
-            safe_component_name = self._sanitize_filename(component_name)
-            safe_custom_name = self._sanitize_filename(custom_name)
-            filename = f'{safe_component_name}-{safe_custom_name}.step'
-            filepath = os.path.normpath(os.path.join(export_path, filename))
-            
-            # 执行导出
-            step_options = export_mgr.createSTEPExportOptions(filepath)
-            step_options.sendToPrintUtility = False
-            result = export_mgr.execute(step_options)
-            
-            # 恢复原始可见性
-            for occurrence in root_component.allOccurrences:
-                if occurrence.entityToken in original_visibility:
-                    occurrence.isVisible = original_visibility[occurrence.entityToken]
-            
-            # 恢复根组件的子组件可见性
-            if target_component == root_component:
-                for occurrence in root_component.occurrences:
-                    if occurrence.entityToken in original_visibility:
-                        occurrence.isVisible = original_visibility[occurrence.entityToken]
-            
-            return result and os.path.exists(filepath)
-            
+            if not geometry:
+                return False
+            export_format = export_format.lower()
+            if export_format == 'step':
+                return self._export_step(export_mgr, export_path, custom_name, comp_name, geometry)
+            elif export_format == 'iges':
+                return self._export_iges(export_mgr, export_path, custom_name, comp_name, geometry)
+            elif export_format == 'stl':
+                return self._export_stl(export_mgr, export_path, custom_name, comp_name, geometry, mesh_settings)
+            elif export_format == 'obj':
+                return self._export_obj(export_mgr, export_path, custom_name, comp_name, geometry, mesh_settings)
+            elif export_format == '3mf':
+                return self._export_3mf(export_mgr, export_path, custom_name, comp_name, geometry, mesh_settings)
+            else:
+                return False
+                
         except Exception as e:
-            # 确保恢复可见性
-            try:
-                design = self.app.activeProduct
-                root_component = design.rootComponent
-                for occurrence in root_component.allOccurrences:
-                    if occurrence.entityToken in original_visibility:
-                        occurrence.isVisible = original_visibility[occurrence.entityToken]
-            except:
-                pass
             return False
     
-    def _export_iges(self, export_mgr, export_path, custom_name, component):
-        """导出 IGES 格式 - 只导出指定组件"""
+    def _export_step(self, export_mgr, export_path, custom_name, comp_name, geometry):
+        """导出 STEP 格式 - 只导出指定实例或组件"""
         try:
-            # 获取和清理文件名
-            component_name = component.name or f'Component_{id(component)}'
-            safe_component_name = self._sanitize_filename(component_name)
-            safe_custom_name = self._sanitize_filename(custom_name)
-            
-            filename = f'{safe_component_name}-{safe_custom_name}.iges'
-            filepath = os.path.normpath(os.path.join(export_path, filename))
+            # 没有实体（包括子组件中也没有实体）的组件跳过
+            if not self._has_bodies(geometry):
+                LogUtils.warn(f'零件 {comp_name} 及其子组件中没有实体，跳过 STEP 导出')
+                return False
             
-            # 如果文件已存在，先删除
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except Exception as e:
-                    return False
+            filepath = self._prepare_filepath(export_path, custom_name, comp_name, 'step')
+            if not filepath:
+                return False
             
-            try:
-                # 创建一个临时的ObjectCollection，只包含要导出的组件的实体
-                object_collection = adsk.core.ObjectCollection.create()
-                
-                # 添加该组件的所有实体
-                for body in component.bRepBodies:
-                    object_collection.add(body)
-                
-                # 如果没有实体，跳过这个组件
-                if object_collection.count == 0:
-                    return False
-                
-                # 使用createIGESExportOptions的重载版本
-                iges_options = export_mgr.createIGESExportOptions(object_collection, filepath)
-                iges_options.sendToPrintUtility = False
-                result = export_mgr.execute(iges_options)
-                
-                if not result:
-                    iges_options = export_mgr.createIGESExportOptions(object_collection, '')
-                    iges_options.filename = filepath
-                    iges_options.sendToPrintUtility = False
-                    result = export_mgr.execute(iges_options)
-                    
-            except Exception as e:
-                # 如果失败，使用可见性方法
-                return self._export_iges_with_visibility(export_mgr, export_path, custom_name, component)
+            # geometry参数指定要导出的实例或组件
+            step_options = export_mgr.createSTEPExportOptions(filepath, geometry)
+            step_options.sendToPrintUtility = False
+            result = self._execute_export(export_mgr, step_options)
             
             return result and os.path.exists(filepath)
             
         except Exception as e:
             return False
     
-    def _export_iges_with_visibility(self, export_mgr, export_path, custom_name, target_component):
-        """通过控制可见性来导出单个组件的IGES"""
+    def _export_iges(self, export_mgr, export_path, custom_name, comp_name, geometry):
+        """导出 IGES 格式 - 只导出指定实例或组件"""
         try:
-            # 获取设计
-            design = self.app.activeProduct
-            root_component = design.rootComponent
-            
-            # 记录原始可见性状态
-            original_visibility = {}
-            
-            # 隐藏所有其他组件
-            for occurrence in root_component.allOccurrences:
-                original_visibility[occurrence] = occurrence.isVisible
-                if occurrence.component != target_component:
-                    occurrence.isVisible = False
-            
-            # 确保目标组件可见
-            for occurrence in root_component.allOccurrences:
-                if occurrence.component == target_component:
-                    occurrence.isVisible = True
-            
-            # 如果目标组件是根组件，隐藏其他子组件
-            if target_component == root_component:
-                for occurrence in root_component.occurrences:
-                    occurrence.isVisible = False
+            # 没有实体（包括子组件中也没有实体）的组件跳过
+            if not self._has_bodies(geometry):
+                LogUtils.warn(f'零件 {comp_name} 及其子组件中没有实体，跳过 IGES 导出')
+                return False
             
-            # 构建文件路径
-            component_name = target_component.name or f'Component_{id(target_component)}'
-            safe_component_name = self._sanitize_filename(component_name)
-            safe_custom_name = self._sanitize_filename(custom_name)
-            filename = f'{safe_component_name}-{safe_custom_name}.iges'
-            filepath = os.path.normpath(os.path.join(export_path, filename))
+            filepath = self._prepare_filepath(export_path, custom_name, comp_name, 'iges')
+            if not filepath:
+                return False
             
-            # 执行导出
-            iges_options = export_mgr.createIGESExportOptions('')
-            iges_options.filename = filepath
+            # geometry参数指定要导出的实例或组件
+            iges_options = export_mgr.createIGESExportOptions(filepath, geometry)
             iges_options.sendToPrintUtility = False
-            result = export_mgr.execute(iges_options)
-            
-            # 恢复原始可见性
-            for occurrence in root_component.allOccurrences:
-                if occurrence.entityToken in original_visibility:
-                    occurrence.isVisible = original_visibility[occurrence.entityToken]
-            
-            # 恢复根组件的子组件可见性
-            if target_component == root_component:
-                for occurrence in root_component.occurrences:
-                    if occurrence.entityToken in original_visibility:
-                        occurrence.isVisible = original_visibility[occurrence.entityToken]
+            result = self._execute_export(export_mgr, iges_options)
             
             return result and os.path.exists(filepath)
             
         except Exception as e:
-            # 确保恢复可见性
-            try:
-                design = self.app.activeProduct
-                root_component = design.rootComponent
-                for occurrence in root_component.allOccurrences:
-                    if occurrence.entityToken in original_visibility:
-                        occurrence.isVisible = original_visibility[occurrence.entityToken]
-            except:
-                pass
             return False
     
-    def _export_stl(self, export_mgr, export_path, custom_name, component):
-        """导出 STL 格式 - 只导出指定组件"""
+    def _export_stl(self, export_mgr, export_path, custom_name, comp_name, geometry, mesh_settings=None):
+        """导出 STL 格式 - 只导出指定实例或组件"""
         try:
-            # 获取和清理文件名
-            component_name = component.name or f'Component_{id(component)}'
-            safe_component_name = self._sanitize_filename(component_name)
-            safe_custom_name = self._sanitize_filename(custom_name)
-            
-            filename = f'{safe_component_name}-{safe_custom_name}.stl'
-            filepath = os.path.normpath(os.path.join(export_path, filename))
-            
-            # 如果文件已存在，先删除
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except Exception as e:
-                    return False
-            
             # 检查组件是否有实体
-            if component.bRepBodies.count == 0:
+            if self._target_component(geometry).bRepBodies.count == 0:
                 return False
             
-            # STL导出选项直接指定组件，这应该只导出该组件
-            stl_options = export_mgr.createSTLExportOptions(component)
+            filepath = self._prepare_filepath(export_path, custom_name, comp_name, 'stl')
+            if not filepath:
+                return False
+            
+            stl_options = export_mgr.createSTLExportOptions(geometry)
             stl_options.filename = filepath
             stl_options.sendToPrintUtility = False
-            stl_options.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementMedium
+            self._apply_mesh_refinement(stl_options, mesh_settings)
             stl_options.isBinaryFormat = True
             
-            result = export_mgr.execute(stl_options)
+            result = self._execute_export(export_mgr, stl_options)
             return result and os.path.exists(filepath)
             
         except Exception as e:
             return False
     
-    def _export_obj(self, export_mgr, export_path, custom_name, component):
-        """导出 OBJ 格式 - 只导出指定组件"""
+    def _export_obj(self, export_mgr, export_path, custom_name, comp_name, geometry, mesh_settings=None):
+        """导出 OBJ 格式 - 只导出指定实例或组件"""
         try:
-            # 获取和清理文件名
-            component_name = component.name or f'Component_{id(component)}'
-            safe_component_name = self._sanitize_filename(component_name)
-            safe_custom_name = self._sanitize_filename(custom_name)
-            
-            filename = f'{safe_component_name}-{safe_custom_name}.obj'
-            filepath = os.path.normpath(os.path.join(export_path, filename))
-            
-            # 如果文件已存在，先删除
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except Exception as e:
-                    return False
-            
             # 检查组件是否有实体
-            if component.bRepBodies.count == 0:
+            if self._target_component(geometry).bRepBodies.count == 0:
                 return False
             
-            # OBJ导出选项直接指定组件，这应该只导出该组件
-            obj_options = export_mgr.createOBJExportOptions(component)
+            filepath = self._prepare_filepath(export_path, custom_name, comp_name, 'obj')
+            if not filepath:
+                return False
+            
+            obj_options = export_mgr.createOBJExportOptions(geometry)
             obj_options.filename = filepath
             obj_options.sendToPrintUtility = False
-            obj_options.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementMedium
+            self._apply_mesh_refinement(obj_options, mesh_settings)
             
-            result = export_mgr.execute(obj_options)
+            result = self._execute_export(export_mgr, obj_options)
             return result and os.path.exists(filepath)
             
         except Exception as e:
             return False
     
-    def _export_3mf(self, export_mgr, export_path, custom_name, component):
-        """导出 3MF 格式 - 只导出指定组件"""
+    def _export_3mf(self, export_mgr, export_path, custom_name, comp_name, geometry, mesh_settings=None):
+        """导出 3MF 格式 - 只导出指定实例或组件"""
         try:
-            # 获取和清理文件名
-            component_name = component.name or f'Component_{id(component)}'
-            safe_component_name = self._sanitize_filename(component_name)
-            safe_custom_name = self._sanitize_filename(custom_name)
-            
-            filename = f'{safe_component_name}-{safe_custom_name}.3mf'
-            filepath = os.path.normpath(os.path.join(export_path, filename))
-            
-            # 如果文件已存在，先删除
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except Exception as e:
-                    return False
-            
             # 检查组件是否有实体
-            if component.bRepBodies.count == 0:
+            if self._target_component(geometry).bRepBodies.count == 0:
                 return False
             
-            # 3MF导出选项直接指定组件，这应该只导出该组件
-            threemf_options = export_mgr.create3MFExportOptions(component)
+            filepath = self._prepare_filepath(export_path, custom_name, comp_name, '3mf')
+            if not filepath:
+                return False
+            
+            threemf_options = self._create_3mf_options(export_mgr, geometry)
             threemf_options.filename = filepath
             threemf_options.sendToPrintUtility = False
-            threemf_options.meshRefinement = adsk.fusion.MeshRefinementSettings.MeshRefinementMedium
+            self._apply_mesh_refinement(threemf_options, mesh_settings)
             
-            result = export_mgr.execute(threemf_options)
+            result = self._execute_export(export_mgr, threemf_options)
             return result and os.path.exists(filepath)
             
         except Exception as e:
             return False
 
+class ParametricTextAckHandler(adsk.core.CustomEventHandler):
+    """握手事件处理器
+
+    自定义事件按触发顺序在主线程中依次处理，
+    因此收到握手事件时，先触发的ParametricText更新事件必然已经处理完毕。
+    """
+
+    def __init__(self, parameter_manager):
+        super().__init__()
+        self.parameter_manager = parameter_manager
+
+    def notify(self, args):
+        try:
+            self.parameter_manager._on_parametric_text_ack(args.additionalInfo)
+        except:
+            pass
+
+
 class ParameterManager:
     """参数管理器"""
     
-    def __init__(self):
+    def __init__(self, parametric_text_timeout=5.0):
         self.app = adsk.core.Application.get()
         self.ui = self.app.userInterface
+        # 等待ParametricText更新完成的最长时间（秒）
+        self.parametric_text_timeout = parametric_text_timeout
+        # 本批次中实际等待ParametricText的累计时间（秒）
+        self.parametric_text_wait_total = 0.0
+        self._ack_event = None
+        self._ack_handler = None
+        self._ack_sequence = 0
+        self._acked_sequence = -1
+        # 参数名称索引（批次内复用）和构建时设计的参数数量
+        self._param_index = None
+        self._param_index_count = -1
+    
+    def _register_ack_event(self):
+        """注册握手事件（只注册一次）"""
+        if self._ack_event:
+            return True
+        try:
+            # 插件重新加载时事件可能仍然存在，先注销
+            try:
+                self.app.unregisterCustomEvent(PARAMETRIC_TEXT_ACK_EVENT)
+            except:
+                pass
+            self._ack_event = self.app.registerCustomEvent(PARAMETRIC_TEXT_ACK_EVENT)
+            self._ack_handler = ParametricTextAckHandler(self)
+            self._ack_event.add(self._ack_handler)
+            return True
+        except Exception as e:
+            self._ack_event = None
+            self._ack_handler = None
+            LogUtils.warn(f'注册ParametricText握手事件失败: {str(e)}')
+            return False
+    
+    def dispose(self):
+        """注销握手事件"""
+        try:
+            if self._ack_event and self._ack_handler:
+                self._ack_event.remove(self._ack_handler)
+            if self._ack_event:
+                self.app.unregisterCustomEvent(PARAMETRIC_TEXT_ACK_EVENT)
+        except:
+            pass
+        self._ack_event = None
+        self._ack_handler = None
+    
+    def _on_parametric_text_ack(self, additional_info):
+        try:
+            self._acked_sequence = max(self._acked_sequence, int(additional_info))
+        except (TypeError, ValueError):
+            pass
+    
+    def begin_batch(self, parametric_text_timeout=None):
+        """批次开始时清零等待时间统计并重建参数索引，parametric_text_timeout 不为None时更新ParametricText等待上限"""
+        if parametric_text_timeout is not None:
+            self.parametric_text_timeout = max(0.0, float(parametric_text_timeout))
+        self.parametric_text_wait_total = 0.0
+        self.invalidate_parameter_index()
+    
+    def invalidate_parameter_index(self):
+        """使参数名称索引失效"""
+        self._param_index = None
+        self._param_index_count = -1
+    
+    def get_parameter_index(self, design, check_count=True):
+        """获取参数名称到参数对象的索引
+
+        索引在批次内复用，只有当设计的参数数量变化时才重新构建。
+        check_count为False时不查询参数数量，直接使用已有索引（同一配置内的逐个查找）。
+        """
+        if self._param_index is not None and not check_count:
+            return self._param_index
+        try:
+            count = design.allParameters.count
+        except:
+            count = -1
+        if self._param_index is not None and count == self._param_index_count:
+            return self._param_index
+        
+        index = {}
+        try:
+            with TraceUtils.span('parameters.index'):
+                # 用户参数优先
+                for param in design.userParameters:
+                    index[param.name] = param
+                for param in design.allParameters:
+                    if param.name not in index:
+                        index[param.name] = param
+        except Exception as e:
+            LogUtils.warn(f'构建参数索引失败: {str(e)}')
+        self._param_index = index
+        self._param_index_count = count
+        LogUtils.info(f'已构建参数索引，共 {len(index)} 个参数')
+        return index
+    
+    def find_parameter(self, design, param_name):
+        """按名称查找参数（用户参数或模型参数），使用已有索引，不重新检查参数数量"""
+        return self.get_parameter_index(design, check_count=False).get(param_name)
+    
+    def _sync_parametric_text(self, stage=''):
+        """触发ParametricText更新并等待其完成，返回实际等待时间（秒）"""
+        # 触发ParametricText插件更新事件
+        try:
+            fired = self.app.fireCustomEvent(PARAMETRIC_TEXT_UPDATE_EVENT)
+        except Exception as e:
+            fired = False
+            LogUtils.warn(f'触发ParametricText更新事件失败{stage}: {str(e)}')
+        if not fired:
+            # 未安装ParametricText插件，无需等待
+            LogUtils.info(f'未检测到ParametricText插件，跳过等待{stage}')
+            return 0.0
+        LogUtils.info(f'已触发ParametricText更新事件{stage}')
+        
+        start = time.perf_counter()
+        if not self._register_ack_event():
+            # 无法握手时退回到固定等待
+            time.sleep(min(2.0, self.parametric_text_timeout))
+            waited = time.perf_counter() - start
+            self.parametric_text_wait_total += waited
+            LogUtils.info(f'等待ParametricText更新完成（固定等待）{stage}: {waited:.2f}s')
+            return waited
+        
+        self._ack_sequence += 1
+        sequence = self._ack_sequence
+        acked = False
+        try:
+            if self.app.fireCustomEvent(PARAMETRIC_TEXT_ACK_EVENT, str(sequence)):
+                deadline = start + self.parametric_text_timeout
+                while time.perf_counter() < deadline:
+                    adsk.doEvents()
+                    if self._acked_sequence >= sequence:
+                        acked = True
+                        break
+                    time.sleep(0.005)
+        except Exception as e:
+            LogUtils.warn(f'等待ParametricText更新时发生错误{stage}: {str(e)}')
+        
+        waited = time.perf_counter() - start
+        self.parametric_text_wait_total += waited
+        if acked:
+            LogUtils.info(f'ParametricText更新完成{stage}，等待 {waited:.2f}s')
+        else:
+            LogUtils.warn(f'等待ParametricText更新超时{stage}，已等待 {waited:.2f}s')
+        return waited
+    
+    def _recompute_with_parametric_text(self, design, stage=''):
+        """重新计算设计，同步ParametricText后再次重新计算"""
+        # 强制重新计算设计
+        try:
+            with TraceUtils.span('design.computeAll'):
+                design.computeAll()
+            LogUtils.info(f'设计重新计算完成{stage}')
+        except Exception as e:
+            LogUtils.warn(f'设计重新计算失败{stage}: {str(e)}')
+        
+        # 等待ParametricText插件处理完成
+        with TraceUtils.span('parametric_text.wait'):
+            self._sync_parametric_text(stage)
+        
+        # 再次强制重新计算设计
+        try:
+            with TraceUtils.span('design.computeAll'):
+                design.computeAll()
+            LogUtils.info(f'最终设计重新计算完成{stage}')
+        except Exception as e:
+            LogUtils.warn(f'最终设计重新计算失败{stage}: {str(e)}')
     
     def get_starred_parameters(self, design):
         """获取标星参数"""
@@ -772,81 +1312,62 @@ class ParameterManager:
             # 忽略单个组件的错误，继续处理其他组件
             pass
     
-    def apply_parameters(self, design, parameters):
-        """应用参数值"""
+    def apply_parameters(self, design, parameters, diff_only=False):
+        """应用参数值，返回 (是否应用成功, 写入的参数数)
+
+        diff_only为True时只写入与当前表达式不同的参数，
+        没有任何参数变化时跳过重新计算和ParametricText更新（写入的参数数为0）。
+        """
         try:
             success_count = 0
             total_count = len(parameters)
+            changed_count = 0
+            skipped_count = 0
             
             # 记录原始参数值用于验证
             original_values = {}
             
-            for param_name, param_value in parameters.items():
-                # 首先尝试用户参数
-                user_param = design.userParameters.itemByName(param_name)
-                if user_param:
-                    # 记录原始值
-                    original_values[param_name] = user_param.expression
-                    # 应用新值
-                    user_param.expression = str(param_value)
-                    success_count += 1
-                    LogUtils.info(f'应用参数: {param_name} = {param_value} (原值: {original_values[param_name]})')
-                    continue
-                
-                # 如果不是用户参数，尝试在所有参数中查找
-                try:
-                    all_params = design.allParameters
-                    for param in all_params:
-                        if param.name == param_name:
-                            # 记录原始值
-                            original_values[param_name] = param.expression
-                            # 应用新值
-                            param.expression = str(param_value)
+            # 按名称索引查找参数（包括用户参数和模型参数）
+            param_index = self.get_parameter_index(design)
+            
+            with TraceUtils.span('parameters.write'):
+                for param_name, param_value in parameters.items():
+                    param = param_index.get(param_name)
+                    if not param:
+                        continue
+                    try:
+                        # 记录原始值
+                        original_values[param_name] = param.expression
+                        if diff_only and self._same_expression(original_values[param_name], param_value):
+                            skipped_count += 1
                             success_count += 1
-                            LogUtils.info(f'应用参数: {param_name} = {param_value} (原值: {original_values[param_name]})')
-                            break
-                except:
-                    pass
-            
-            # 强制重新计算设计
-            try:
-                design.computeAll()
-                LogUtils.info('设计重新计算完成')
-            except Exception as e:
-                LogUtils.warn(f'设计重新计算失败: {str(e)}')
-            
-            # 触发ParametricText插件更新事件
-            try:
-                app = adsk.core.Application.get()
-                app.fireCustomEvent('thomasa88_ParametricText_Ext_Update')
-                LogUtils.info('已触发ParametricText更新事件')
-            except Exception as e:
-                LogUtils.warn(f'触发ParametricText更新事件失败: {str(e)}')
-            
-            # 等待ParametricText插件处理完成
-            try:
-                import time
-                time.sleep(2)  # 增加等待时间到2秒
-                LogUtils.info('等待ParametricText更新完成')
-            except Exception as e:
-                LogUtils.warn(f'等待ParametricText更新时发生错误: {str(e)}')
-            
-            # 再次强制重新计算设计
-            try:
-                design.computeAll()
-                LogUtils.info('最终设计重新计算完成')
-            except Exception as e:
-                LogUtils.warn(f'最终设计重新计算失败: {str(e)}')
+                            continue
+                        # 应用新值
+                        param.expression = str(param_value)
+                        changed_count += 1
+                        success_count += 1
+                        LogUtils.debug(f'应用参数: {param_name} = {param_value} (原值: {original_values[param_name]})')
+                    except Exception as e:
+                        LogUtils.warn(f'应用参数失败: {param_name} = {param_value}, {str(e)}')
+            
+            if diff_only:
+                LogUtils.info(f'参数变化统计: 变化 {changed_count} 个, 跳过 {skipped_count} 个')
+                if changed_count == 0:
+                    LogUtils.info('参数无变化，跳过重新计算和ParametricText更新')
+                    return success_count > 0, 0
+            
+            # 重新计算设计并同步ParametricText
+            self._recompute_with_parametric_text(design)
             
             # 验证参数是否真的被应用
             verification_count = 0
             for param_name, expected_value in parameters.items():
                 try:
-                    user_param = design.userParameters.itemByName(param_name)
-                    if user_param and str(user_param.expression).strip() == str(expected_value).strip():
+                    param = param_index.get(param_name)
+                    if param and str(param.expression).strip() == str(expected_value).strip():
                         verification_count += 1
                     else:
-                        LogUtils.warn(f'参数验证失败: {param_name}, 期望: {expected_value}, 实际: {user_param.expression if user_param else "未找到"}')
+                        LogUtils.warn(f'参数验证失败: {param_name}, 期望: {expected_value}, 实际: {param.expression if param else "未找到"}')
                 except:
                     pass
             
@@ -856,11 +1377,16 @@ class ParameterManager:
             if verification_count < success_count:
                 LogUtils.warn(f'警告: 只有 {verification_count}/{success_count} 个参数被正确验证')
             
-            return success_count > 0
+            return success_count > 0, changed_count
             
         except Exception as e:
             LogUtils.error(f'应用参数时发生错误: {str(e)}')
-            return False
+            return False, 0
+    
+    @staticmethod
+    def _same_expression(current, target):
+        """比较两个参数表达式是否相同（忽略多余空白）"""
+        return ' '.join(str(current).split()) == ' '.join(str(target).split())
     
     def backup_parameters(self, design):
         """备份当前参数值"""
@@ -881,43 +1407,16 @@ class ParameterManager:
     def restore_parameters(self, design, backup):
         """恢复参数值"""
         try:
-            user_params = design.userParameters
+            param_index = self.get_parameter_index(design)
             
             for param_name, param_value in backup.items():
-                param = user_params.itemByName(param_name)
+                param = param_index.get(param_name)
                 if param:
                     param.expression = param_value
-                    LogUtils.info(f'恢复参数: {param_name} = {param_value}')
-            
-            # 强制重新计算设计
-            try:
-                design.computeAll()
-                LogUtils.info('参数恢复后设计重新计算完成')
-            except Exception as e:
-                LogUtils.warn(f'参数恢复后设计重新计算失败: {str(e)}')
+                    LogUtils.debug(f'恢复参数: {param_name} = {param_value}')
             
-            # 触发ParametricText插件更新事件
-            try:
-                app = adsk.core.Application.get()
-                app.fireCustomEvent('thomasa88_ParametricText_Ext_Update')
-                LogUtils.info('已触发ParametricText更新事件（参数恢复）')
-            except Exception as e:
-                LogUtils.warn(f'触发ParametricText更新事件失败（参数恢复）: {str(e)}')
-            
-            # 等待ParametricText插件处理完成
-            try:
-                import time
-                time.sleep(2)  # 增加等待时间到2秒
-                LogUtils.info('等待ParametricText更新完成（参数恢复）')
-            except Exception as e:
-                LogUtils.warn(f'等待ParametricText更新时发生错误（参数恢复）: {str(e)}')
-            
-            # 再次强制重新计算设计
-            try:
-                design.computeAll()
-                LogUtils.info('参数恢复后最终设计重新计算完成')
-            except Exception as e:
-                LogUtils.warn(f'参数恢复后最终设计重新计算失败: {str(e)}')
+            # 重新计算设计并同步ParametricText
+            self._recompute_with_parametric_text(design, '（参数恢复）')
             
             return True
             
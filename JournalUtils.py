@@ -0,0 +1,222 @@
+"""
+导出日志模块
+批量导出过程中向 导出路径/文档名/.export_journal.jsonl 逐行追加已完成的文件和配置，
+Fusion 崩溃或用户取消后可以据此继续上次的导出，并恢复批次开始前的参数和可见性
+"""
+
+import json
+import os
+import threading
+import time
+from .LogUtils import LogUtils
+
+
+class ExportJournal:
+    """只追加的批量导出日志
+
+    每行一条JSON记录：
+      begin    批次开始：文档标识、配置数、批次开始前的参数和可见性，resume 表示继续上次的导出
+      file     一个文件完成后处理：配置、零件、格式、文件（相对文档目录）、大小、SHA-256 和缓存键
+      config   一个配置的所有文件都处理完成：配置缓存键和其中各文件的缓存键
+      restored 参数和可见性已恢复
+      end      批次结束：completed / incomplete（有配置失败）/ cancelled / failed
+    每次完整导出从新文件开始，继续导出时在原文件后追加。最后一行写了一半（崩溃）时读取会忽略该行。
+    """
+
+    FILENAME = '.export_journal.jsonl'
+    VERSION = 1
+
+    def __init__(self, doc_dir, path=None):
+        """:param path: 日志文件路径，默认为 doc_dir/.export_journal.jsonl（共享队列中各实例使用自己的日志）"""
+        self.doc_dir = doc_dir
+        self.path = path or ExportJournal.journal_path(doc_dir)
+        self._file = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def journal_path(doc_dir):
+        return os.path.join(doc_dir, ExportJournal.FILENAME)
+
+    def begin(self, document_key, config_count, parameters, visibility, resume=False):
+        """开始记录批次；继续导出时追加到原日志，否则覆盖旧日志"""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        except Exception as e:
+            LogUtils.warn(f'无法创建导出日志，崩溃后将无法继续导出: {str(e)}')
+            self._file = None
+            return
+        self._append({
+            'type': 'begin',
+            'version': ExportJournal.VERSION,
+            'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'document': document_key,
+            'configs': config_count,
+            'resume': bool(resume),
+            'parameters': parameters,
+            'visibility': visibility,
+        }, sync=True)
+
+    def _append(self, record, sync=False):
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self._file.flush()
+                if sync:
+                    os.fsync(self._file.fileno())
+            except Exception as e:
+                LogUtils.warn(f'写入导出日志失败: {str(e)}')
+
+    def stage(self, result):
+        """后处理阶段：记录已完成哈希的文件（放在 hash 阶段之后）"""
+        if self._file is None or not result.get('sha256'):
+            return
+        self._append({
+            'type': 'file',
+            'config': result.get('config'),
+            'component': result.get('component'),
+            'format': result.get('format'),
+            'file': os.path.relpath(os.path.normpath(result['file']), self.doc_dir),
+            'size': result.get('size') or os.path.getsize(result['file']),
+            'sha256': result['sha256'],
+            'cache_key': result.get('cache_key'),
+        })
+
+    def config_done(self, index, name, config_key, units, futures=None):
+        """配置导出完成；有后处理任务时等这些任务全部结束后再记录"""
+        if self._file is None or not units:
+            return
+        record = {'type': 'config', 'index': index, 'config': name, 'key': config_key, 'units': units}
+        pending = [future for future in futures or () if future is not None]
+        if not pending:
+            self._append(record, sync=True)
+            return
+        remaining = [len(pending)]
+
+        def on_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._append(record, sync=True)
+
+        for future in pending:
+            future.add_done_callback(on_done)
+
+    def restored(self):
+        self._append({'type': 'restored', 'time': time.strftime('%Y-%m-%d %H:%M:%S')}, sync=True)
+
+    @staticmethod
+    def mark_restored(doc_dir):
+        """在已有日志后追加恢复记录（从日志手动恢复参数后调用）"""
+        journal = ExportJournal(doc_dir)
+        try:
+            journal._file = open(journal.path, 'a', encoding='utf-8')
+        except Exception as e:
+            LogUtils.warn(f'写入导出日志失败: {str(e)}')
+            return
+        journal.restored()
+        journal._file.close()
+
+    def end(self, status):
+        """记录批次结束并关闭日志（应在后处理全部完成后调用）"""
+        self._append({'type': 'end', 'status': status, 'time': time.strftime('%Y-%m-%d %H:%M:%S')}, sync=True)
+        with self._lock:
+            if self._file is not None:
+                try:
+                    self._file.close()
+                except Exception:
+                    pass
+                self._file = None
+
+    @staticmethod
+    def read(doc_dir):
+        """读取日志中的所有记录，忽略无法解析的行"""
+        records = []
+        path = ExportJournal.journal_path(doc_dir)
+        if not os.path.exists(path):
+            return records
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    LogUtils.warn('导出日志中有不完整的记录（可能是崩溃时写入的），已忽略')
+        return records
+
+    @staticmethod
+    def load_state(doc_dir):
+        """
+        汇总日志：最近一次完整导出及其后所有继续导出的记录
+        :return: 状态字典，没有日志时返回None
+            document    文档标识
+            parameters  批次开始前的参数
+            visibility  批次开始前的可见性 {实例entityToken: 是否显示}
+            entries     已完成文件 {缓存键: {'file', 'size', 'hash'}}
+            configs     已完成配置 {配置缓存键: [缓存键]}
+            completed   已完成配置的序号
+            finished    最后一次批次是否完整结束
+            restored    最后一次批次后参数是否已恢复
+        """
+        state = None
+        for record in ExportJournal.read(doc_dir):
+            record_type = record.get('type')
+            if record_type == 'begin':
+                if state is None or not record.get('resume'):
+                    state = {
+                        'document': record.get('document'),
+                        'parameters': record.get('parameters') or {},
+                        'visibility': record.get('visibility') or {},
+                        'entries': {},
+                        'configs': {},
+                        'completed': set(),
+                    }
+                state['finished'] = False
+                state['restored'] = False
+            elif state is None:
+                continue
+            elif record_type == 'file' and record.get('cache_key'):
+                state['entries'][record['cache_key']] = {
+                    'file': record['file'],
+                    'size': record.get('size'),
+                    'hash': record.get('sha256'),
+                }
+            elif record_type == 'config':
+                state['configs'][record['key']] = record.get('units') or []
+                state['completed'].add(record.get('index'))
+            elif record_type == 'restored':
+                state['restored'] = True
+            elif record_type == 'end':
+                state['finished'] = record.get('status') == 'completed'
+        return state
+
+    @staticmethod
+    def config_intact(state, doc_dir, config_key):
+        """日志中已完成的配置（按配置缓存键，不依赖配置序号）的文件是否都还在且大小未变
+
+        继续导出时用来跳过已完成的配置，只比较文件大小，不重新计算哈希。
+        """
+        units = state['configs'].get(config_key) if state else None
+        if not units:
+            return False
+        for key in units:
+            entry = state['entries'].get(key)
+            if not entry:
+                return False
+            path = os.path.join(doc_dir, entry['file'])
+            try:
+                if os.path.getsize(path) != entry.get('size'):
+                    return False
+            except OSError:
+                return False
+        return True
+
+    @staticmethod
+    def needs_restore(state):
+        """上次批次没有完整结束，且参数和可见性尚未恢复（如Fusion崩溃）"""
+        return bool(state) and not state['finished'] and not state['restored']
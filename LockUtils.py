@@ -0,0 +1,185 @@
+"""
+锁文件模块
+提供基于独占创建锁文件的进程间锁，供设置缓存（临时目录）和共享导出队列（网络共享目录）共用
+"""
+
+import os
+import socket
+import threading
+import time
+import uuid
+from .LogUtils import LogUtils
+
+
+class FileLock:
+    """基于独占创建锁文件的进程间锁，可用于网络共享目录
+
+    锁文件内容为持有者的唯一标识（主机名:进程号:随机串），获得锁后读回确认是自己的锁。
+    持有期间后台线程每隔 STALE_SECONDS / 4 刷新锁文件的修改时间。
+    同一实例可在多个线程中使用（如队列租约的续约线程），进程内先用线程锁互斥，再获取锁文件。
+
+    判断遗留的锁不比较本机时间和文件服务器上的修改时间（两台电脑的时钟可能不同步），
+    而是在本机观察锁文件：同一个锁文件（修改时间、大小和文件标识都不变）持续 STALE_SECONDS 没有刷新，
+    说明持有者已异常退出。删除遗留的锁时先把它重命名为本实例唯一的文件名（只有一个等待者能成功），
+    再核对其中的持有者标识与观察到的一致，不一致（其他实例刚获得的新锁）时放回原处。
+    """
+
+    TIMEOUT = 30.0
+    STALE_SECONDS = 20.0
+
+    def __init__(self, path, timeout=None, stale_seconds=None):
+        self.path = path
+        self.timeout = FileLock.TIMEOUT if timeout is None else timeout
+        self.stale_seconds = FileLock.STALE_SECONDS if stale_seconds is None else stale_seconds
+        self.token = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}'
+        # 正在观察的他人的锁：(文件状态, 持有者标识, 开始观察的本机时间)，跨多次 acquire 保留
+        self._observed = None
+        self._stop_refresh = None
+        self._thread_lock = threading.Lock()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            return False
+        try:
+            if self._acquire_file(deadline):
+                return True
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._thread_lock.release()
+        return False
+
+    def _acquire_file(self, deadline):
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._break_if_stale():
+                    continue
+                if time.monotonic() > deadline:
+                    return False
+                time.sleep(0.1)
+                continue
+            except PermissionError:
+                # Windows 上锁文件正在被删除时无法创建
+                if time.monotonic() > deadline:
+                    return False
+                time.sleep(0.1)
+                continue
+            try:
+                os.write(fd, self.token.encode('utf-8'))
+            finally:
+                os.close(fd)
+            # 网络文件系统上独占创建不一定可靠，读回确认锁文件确实是自己的
+            if FileLock._read_owner(self.path) == self.token:
+                self._observed = None
+                self._start_refresh()
+                return True
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.1)
+
+    def release(self):
+        self._stop_refreshing()
+        # 只删除自己的锁，锁已被当作遗留的锁删除时不影响其他实例新建的锁
+        try:
+            if FileLock._read_owner(self.path) == self.token:
+                try:
+                    os.remove(self.path)
+                except OSError:
+                    pass
+        finally:
+            self._thread_lock.release()
+
+    @staticmethod
+    def _read_owner(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _break_if_stale(self):
+        """锁文件持续 stale_seconds 没有变化时删除，返回是否应立即重试获取锁"""
+        try:
+            signature = FileLock._signature(self.path)
+        except OSError:
+            # 锁刚被释放
+            return True
+        now = time.monotonic()
+        if self._observed is None or self._observed[0] != signature:
+            self._observed = (signature, FileLock._read_owner(self.path), now)
+            return False
+        _, owner, first_seen = self._observed
+        if now - first_seen < self.stale_seconds:
+            return False
+        self._observed = None
+        stale_path = f'{self.path}.stale.{uuid.uuid4().hex}'
+        try:
+            os.rename(self.path, stale_path)
+        except OSError:
+            # 其他等待者已经处理了这个锁
+            return True
+        if FileLock._read_owner(stale_path) == owner:
+            LogUtils.warn(f'删除遗留的锁文件: {self.path}（持有者 {owner}）')
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+        else:
+            FileLock._put_back(stale_path, self.path)
+        return True
+
+    @staticmethod
+    def _put_back(stale_path, path):
+        """把误移走的锁放回原处；原处已有新锁时不覆盖（该锁的持有者刷新时会发现锁已丢失）"""
+        try:
+            try:
+                # 硬链接不会覆盖已存在的文件
+                os.link(stale_path, path)
+            except FileExistsError:
+                pass
+            except OSError:
+                if not os.path.exists(path):
+                    os.rename(stale_path, path)
+                    return
+            os.remove(stale_path)
+        except OSError:
+            pass
+
+    def _start_refresh(self):
+        stop = threading.Event()
+        self._stop_refresh = stop
+        interval = max(0.05, self.stale_seconds / 4)
+
+        def refresh_loop():
+            while not stop.wait(interval):
+                if FileLock._read_owner(self.path) != self.token:
+                    LogUtils.warn(f'锁文件已被其他实例当作遗留的锁删除: {self.path}')
+                    return
+                try:
+                    os.utime(self.path, None)
+                except OSError:
+                    pass
+
+        thread = threading.Thread(target=refresh_loop, name='FileLockRefresh', daemon=True)
+        thread.start()
+
+    def _stop_refreshing(self):
+        if self._stop_refresh is not None:
+            self._stop_refresh.set()
+            self._stop_refresh = None
+
+    def __enter__(self):
+        if not self.acquire():
+            raise TimeoutError(f'等待锁文件超时: {self.path}')
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.release()
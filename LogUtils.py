@@ -1,23 +1,209 @@
 import datetime
+import json
 import os
+import queue
+import threading
 
 class LogUtils:
+    """日志工具
+
+    日志先放入队列，由后台线程批量写入控制台和日志文件（文件保持打开，按大小轮转）。
+    低于最小级别的日志在调用处直接丢弃。批次结束和插件停止时调用 flush / shutdown 确保写完。
+    """
     LOG_DIR = os.path.join(os.path.dirname(__file__), 'logs')
     LOG_FILE = os.path.join(LOG_DIR, 'Fusion360BatchExport.log')
+    JSONL_FILE = os.path.join(LOG_DIR, 'Fusion360BatchExport.jsonl')
+
+    LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARN': 30, 'ERROR': 40}
+    min_level = 'INFO'
+    # 为True时在文本日志之外同时写入每行一个JSON对象的 .jsonl
+    jsonl = False
+    console = True
+    # 单个日志文件超过该大小时轮转，保留 BACKUP_COUNT 个旧文件
+    max_bytes = 5 * 1024 * 1024
+    backup_count = 3
+
+    _min_level_value = 20
+    _queue = queue.Queue()
+    _thread = None
+    _thread_lock = threading.Lock()
+    # 队列中的标记
+    _STOP = object()
+
+    @staticmethod
+    def configure(min_level=None, jsonl=None, max_bytes=None, backup_count=None, console=None):
+        """修改日志设置，未指定的保持不变"""
+        if min_level is not None and str(min_level).upper() in LogUtils.LEVELS:
+            LogUtils.min_level = str(min_level).upper()
+            LogUtils._min_level_value = LogUtils.LEVELS[LogUtils.min_level]
+        if jsonl is not None:
+            # 切换文件格式前先写完已有日志
+            if bool(jsonl) != LogUtils.jsonl:
+                LogUtils.flush()
+            LogUtils.jsonl = bool(jsonl)
+        if max_bytes is not None:
+            LogUtils.max_bytes = int(max_bytes)
+        if backup_count is not None:
+            LogUtils.backup_count = int(backup_count)
+        if console is not None:
+            LogUtils.console = bool(console)
+
+    @staticmethod
+    def enabled(level):
+        """该级别的日志是否会被记录（用于跳过只为调试日志准备数据的代码）"""
+        return LogUtils.LEVELS.get(level, 20) >= LogUtils._min_level_value
 
     @staticmethod
     def log(msg, level='INFO'):
-        log_str = f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] [{level}] {msg}"
-        print(log_str, flush=True)
+        if not LogUtils.enabled(level):
+            return
+        record = (datetime.datetime.now(), level, msg, threading.current_thread().name)
+        if not LogUtils._ensure_writer():
+            # 后台线程不可用时直接写入，写完关闭文件（避免句柄泄漏，Windows 上打开的文件无法轮转）
+            files = {}
+            try:
+                LogUtils._write_records([record], files)
+            finally:
+                LogUtils._close_files(files)
+            return
+        LogUtils._queue.put(record)
+
+    @staticmethod
+    def _ensure_writer():
+        if LogUtils._thread is not None and LogUtils._thread.is_alive():
+            return True
+        with LogUtils._thread_lock:
+            if LogUtils._thread is not None and LogUtils._thread.is_alive():
+                return True
+            try:
+                LogUtils._thread = threading.Thread(target=LogUtils._writer_loop, name='BatchExportLog', daemon=True)
+                LogUtils._thread.start()
+                return True
+            except Exception:
+                LogUtils._thread = None
+                return False
+
+    @staticmethod
+    def _writer_loop():
+        files = {}
+        try:
+            while True:
+                item = LogUtils._queue.get()
+                batch = [item]
+                # 一次取出队列中已有的所有日志，合并写入
+                while len(batch) < 1000:
+                    try:
+                        batch.append(LogUtils._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                records = []
+                stop = False
+                for entry in batch:
+                    if entry is LogUtils._STOP:
+                        stop = True
+                    elif isinstance(entry, threading.Event):
+                        # flush 标记：写完之前的日志后通知等待方
+                        LogUtils._write_records(records, files)
+                        records = []
+                        entry.set()
+                    else:
+                        records.append(entry)
+                LogUtils._write_records(records, files)
+                for _ in batch:
+                    LogUtils._queue.task_done()
+                if stop:
+                    break
+        finally:
+            LogUtils._close_files(files)
+
+    @staticmethod
+    def _format_text(record):
+        timestamp, level, msg, _ = record
+        return f"[{timestamp.strftime('%Y-%m-%d %H:%M:%S')}] [{level}] {msg}"
+
+    @staticmethod
+    def _format_json(record):
+        timestamp, level, msg, thread_name = record
+        return json.dumps({
+            'time': timestamp.isoformat(timespec='milliseconds'),
+            'level': level,
+            'thread': thread_name,
+            'message': str(msg),
+        }, ensure_ascii=False)
+
+    @staticmethod
+    def _write_records(records, files):
+        """写入一批日志，files 缓存已打开的日志文件"""
+        if not records:
+            return
+        text_lines = [LogUtils._format_text(record) for record in records]
+        if LogUtils.console:
+            print('\n'.join(text_lines), flush=True)
+        LogUtils._append_lines(LogUtils.LOG_FILE, text_lines, files)
+        if LogUtils.jsonl:
+            # JSONL 日志与文本日志同时写入
+            LogUtils._append_lines(LogUtils.JSONL_FILE, [LogUtils._format_json(record) for record in records], files)
+
+    @staticmethod
+    def _append_lines(path, lines, files):
+        """向日志文件追加多行，超过大小上限时轮转"""
         try:
-            if not os.path.exists(LogUtils.LOG_DIR):
-                os.makedirs(LogUtils.LOG_DIR)
-            with open(LogUtils.LOG_FILE, 'a', encoding='utf-8') as f:
-                f.write(log_str + '\n')
+            f = files.get(path)
+            if f is None:
+                os.makedirs(LogUtils.LOG_DIR, exist_ok=True)
+                f = open(path, 'a', encoding='utf-8')
+                files[path] = f
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            if LogUtils.max_bytes > 0 and f.tell() >= LogUtils.max_bytes:
+                f.close()
+                del files[path]
+                LogUtils._rotate(path)
         except Exception as e:
             # 如果写文件失败，也输出到控制台
             print(f"[LogUtils ERROR] 写日志文件失败: {e}", flush=True)
 
+    @staticmethod
+    def _rotate(path):
+        """轮转日志文件: xxx.log -> xxx.log.1 -> xxx.log.2 ..."""
+        if LogUtils.backup_count <= 0:
+            os.remove(path)
+            return
+        for index in range(LogUtils.backup_count - 1, 0, -1):
+            source = f'{path}.{index}'
+            if os.path.exists(source):
+                os.replace(source, f'{path}.{index + 1}')
+        os.replace(path, f'{path}.1')
+
+    @staticmethod
+    def _close_files(files):
+        for f in files.values():
+            try:
+                f.close()
+            except Exception:
+                pass
+        files.clear()
+
+    @staticmethod
+    def flush(timeout=5.0):
+        """等待队列中已有的日志写完"""
+        thread = LogUtils._thread
+        if thread is None or not thread.is_alive():
+            return
+        done = threading.Event()
+        LogUtils._queue.put(done)
+        done.wait(timeout)
+
+    @staticmethod
+    def shutdown(timeout=5.0):
+        """写完所有日志并停止后台线程（插件停止时调用）"""
+        thread = LogUtils._thread
+        if thread is None or not thread.is_alive():
+            return
+        LogUtils._queue.put(LogUtils._STOP)
+        thread.join(timeout)
+        LogUtils._thread = None
+
     @staticmethod
     def error(msg):
         LogUtils.log(msg, level='ERROR')
@@ -28,4 +214,8 @@ class LogUtils:
 
     @staticmethod
     def info(msg):
-        LogUtils.log(msg, level='INFO') 
\ No newline at end of file
+        LogUtils.log(msg, level='INFO')
+
+    @staticmethod
+    def debug(msg):
+        LogUtils.log(msg, level='DEBUG')
@@ -0,0 +1,166 @@
+"""
+网格转换模块
+读取 Fusion 导出的二进制STL，生成 OBJ 和 3MF 文件，使每个零件只需由 Fusion 网格化一次。
+纯 Python 实现，不调用 Fusion API，可以在后处理线程中执行
+"""
+
+import os
+import sys
+import zipfile
+from array import array
+from xml.sax.saxutils import quoteattr
+from .LogUtils import LogUtils
+
+
+class MeshConverter:
+    """由二进制STL转换出的网格格式"""
+
+    DERIVED_FORMATS = ('obj', '3mf')
+
+    # 每次写入文件的行数
+    _CHUNK_SIZE = 4096
+
+    _3MF_CONTENT_TYPES = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="model" ContentType="application/vnd.ms-package.3dmanufacturing-3dmodel+xml"/>'
+        '</Types>'
+    )
+    _3MF_RELS = (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Target="/3D/3dmodel.model" Id="rel0" '
+        'Type="http://schemas.microsoft.com/3dmanufacturing/2013/01/3dmodel"/>'
+        '</Relationships>'
+    )
+
+    @staticmethod
+    def read_binary_stl(filepath):
+        """读取二进制STL并合并重复顶点
+
+        :return: (vertices, triangles)，vertices 为 array('f') 的 x,y,z 序列，
+                 triangles 为 array('I') 的顶点索引序列（每3个一组），退化三角形会被丢弃
+        """
+        with open(filepath, 'rb') as f:
+            data = f.read()
+        if len(data) < 84:
+            raise ValueError('STL 文件长度不足')
+        count = int.from_bytes(data[80:84], 'little')
+        end = 84 + count * 50
+        if len(data) < end:
+            raise ValueError('STL 文件不完整或不是二进制格式')
+
+        # 以顶点的原始12字节作为键去重，避免逐个解包浮点数
+        index_of = {}
+        vertex_bytes = []
+        triangles = array('I')
+        for offset in range(84 + 12, end, 50):
+            a = data[offset:offset + 12]
+            b = data[offset + 12:offset + 24]
+            c = data[offset + 24:offset + 36]
+            if a == b or b == c or a == c:
+                continue
+            for key in (a, b, c):
+                index = index_of.get(key)
+                if index is None:
+                    index = len(vertex_bytes)
+                    index_of[key] = index
+                    vertex_bytes.append(key)
+                triangles.append(index)
+
+        vertices = array('f')
+        vertices.frombytes(b''.join(vertex_bytes))
+        if sys.byteorder == 'big':
+            vertices.byteswap()
+        return vertices, triangles
+
+    @staticmethod
+    def _vertex_lines(vertices, line_format):
+        for start in range(0, len(vertices), 3 * MeshConverter._CHUNK_SIZE):
+            chunk = vertices[start:start + 3 * MeshConverter._CHUNK_SIZE]
+            yield ''.join(line_format % (chunk[i], chunk[i + 1], chunk[i + 2]) for i in range(0, len(chunk), 3))
+
+    @staticmethod
+    def _triangle_lines(triangles, line_format, base=0):
+        for start in range(0, len(triangles), 3 * MeshConverter._CHUNK_SIZE):
+            chunk = triangles[start:start + 3 * MeshConverter._CHUNK_SIZE]
+            yield ''.join(line_format % (chunk[i] + base, chunk[i + 1] + base, chunk[i + 2] + base)
+                          for i in range(0, len(chunk), 3))
+
+    @staticmethod
+    def write_obj(filepath, vertices, triangles, name):
+        """写入OBJ文件（先写临时文件再重命名）"""
+        temp_path = filepath + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(f'# Fusion360BatchParametricExport\no {name}\n')
+            for text in MeshConverter._vertex_lines(vertices, 'v %.6g %.6g %.6g\n'):
+                f.write(text)
+            for text in MeshConverter._triangle_lines(triangles, 'f %d %d %d\n', base=1):
+                f.write(text)
+        os.replace(temp_path, filepath)
+
+    @staticmethod
+    def write_3mf(filepath, vertices, triangles, name, unit='millimeter'):
+        """写入3MF文件（先写临时文件再重命名）"""
+        temp_path = filepath + '.tmp'
+        with zipfile.ZipFile(temp_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr('[Content_Types].xml', MeshConverter._3MF_CONTENT_TYPES)
+            archive.writestr('_rels/.rels', MeshConverter._3MF_RELS)
+            with archive.open('3D/3dmodel.model', 'w') as model:
+                model.write((
+                    '<?xml version="1.0" encoding="UTF-8"?>\n'
+                    f'<model unit="{unit}" xml:lang="en-US" '
+                    'xmlns="http://schemas.microsoft.com/3dmanufacturing/core/2015/02">\n'
+                    '<resources>\n'
+                    f'<object id="1" name={quoteattr(name)} type="model">\n'
+                    '<mesh>\n<vertices>\n'
+                ).encode('utf-8'))
+                for text in MeshConverter._vertex_lines(vertices, '<vertex x="%.6g" y="%.6g" z="%.6g"/>\n'):
+                    model.write(text.encode('utf-8'))
+                model.write(b'</vertices>\n<triangles>\n')
+                for text in MeshConverter._triangle_lines(triangles, '<triangle v1="%d" v2="%d" v3="%d"/>\n'):
+                    model.write(text.encode('utf-8'))
+                model.write(b'</triangles>\n</mesh>\n</object>\n</resources>\n'
+                            b'<build>\n<item objectid="1"/>\n</build>\n</model>\n')
+        os.replace(temp_path, filepath)
+
+    @staticmethod
+    def convert(stl_path, targets, name):
+        """由一个STL生成多个格式，targets 为 {格式: 文件路径}"""
+        vertices, triangles = MeshConverter.read_binary_stl(stl_path)
+        for export_format, filepath in targets.items():
+            if export_format == 'obj':
+                MeshConverter.write_obj(filepath, vertices, triangles, name)
+            elif export_format == '3mf':
+                MeshConverter.write_3mf(filepath, vertices, triangles, name)
+            else:
+                raise ValueError(f'不支持由STL转换的格式: {export_format}')
+
+    @staticmethod
+    def derive_stage(result):
+        """后处理阶段：处理 ExportManager 提交的网格转换任务
+
+        普通导出结果原样继续；转换任务转换完成后由生成的 OBJ/3MF 结果代替，进入后续阶段。
+        任务中有 on_derived 回调时，以是否转换成功调用。
+        """
+        targets = result.get('derive')
+        if not targets:
+            return None
+        on_derived = result.get('on_derived')
+        try:
+            MeshConverter.convert(result['file'], {t['format']: t['file'] for t in targets}, result.get('component', ''))
+        except Exception:
+            if on_derived:
+                on_derived(False)
+            raise
+        finally:
+            if result.get('delete_source'):
+                try:
+                    os.remove(result['file'])
+                except OSError:
+                    pass
+        if on_derived:
+            on_derived(True)
+        LogUtils.info(f'零件 {result.get("component", "")} 由STL生成 {"/".join(t["format"].upper() for t in targets)}')
+        return list(targets)
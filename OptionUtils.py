@@ -0,0 +1,267 @@
+"""
+导出选项工具模块
+集中定义批量导出的高级选项：创建界面控件、读取控件值并记忆用户设置
+"""
+
+import adsk.core
+from .CacheUtils import CacheUtils
+
+
+class OptionUtils:
+    GROUP_ID = 'optionsGroup'
+
+    # 高级选项定义
+    # id: 控件ID（同时作为缓存键）; key: 传给批量导出的选项名
+    # type: bool / int / float / str / choice
+    OPTIONS = [
+        {
+            'id': 'diffApply',
+            'key': 'diff_apply',
+            'label': '仅应用有变化的参数',
+            'type': 'bool',
+            'default': True,
+            'tooltip': '只写入与当前设计不同的参数；参数完全相同时跳过重新计算和ParametricText更新',
+        },
+        {
+            'id': 'parametricTextTimeout',
+            'key': 'parametric_text_timeout',
+            'label': 'ParametricText等待上限（秒）',
+            'type': 'float',
+            'default': 5.0,
+            'tooltip': '每次重新计算后等待ParametricText插件更新文字的最长时间；插件提前确认完成时立即继续',
+        },
+        {
+            'id': 'reorderConfigs',
+            'key': 'reorder_configs',
+            'label': '优化配置执行顺序',
+            'type': 'bool',
+            'default': False,
+            'tooltip': '重新排列Excel中的配置，使相邻配置之间修改的参数最少；导出目录不变',
+        },
+        {
+            'id': 'exportStrategy',
+            'key': 'export_strategy',
+            'label': '零件导出方式',
+            'type': 'choice',
+            'choices': ['visibility', 'geometry', 'auto'],
+            'default': 'visibility',
+            'tooltip': 'visibility: 控制可见性导出; geometry: 直接导出零件几何体，不修改可见性; auto: 优先几何体，失败的格式自动改用可见性控制',
+        },
+        {
+            'id': 'reuseIdenticalParts',
+            'key': 'reuse_identical_parts',
+            'label': '复用几何相同的零件',
+            'type': 'bool',
+            'default': False,
+            'tooltip': '按体积、面积、包围盒、实体数和面数识别同一零件在本批次中已导出过的相同几何，直接硬链接或复制文件而不再调用导出',
+        },
+        {
+            'id': 'meshRefinement',
+            'key': 'mesh_refinement',
+            'label': '默认网格精度',
+            'type': 'choice',
+            'choices': ['medium', 'coarse', 'fine', 'adaptive'],
+            'default': 'medium',
+            'tooltip': 'STL/OBJ/3MF 的网格精度，Excel中"网格精度"列有值时以该列为准; adaptive: 按零件包围盒大小自动选择精度',
+        },
+        {
+            'id': 'meshTriangleBudget',
+            'key': 'mesh_triangle_budget',
+            'label': '自适应网格三角形数量',
+            'type': 'int',
+            'default': 20000,
+            'tooltip': '自适应网格精度下每个零件的目标三角形数量上限（估算值）',
+        },
+        {
+            'id': 'singleTessellation',
+            'key': 'single_tessellation',
+            'label': '单次网格化（由STL生成OBJ/3MF）',
+            'type': 'bool',
+            'default': False,
+            'tooltip': '每个零件只让Fusion导出一次二进制STL，OBJ和3MF在后台线程中由该STL转换生成，减少重复网格化的时间',
+        },
+        {
+            'id': 'postProcessWorkers',
+            'key': 'post_process_workers',
+            'label': '后处理线程数',
+            'type': 'int',
+            'default': 2,
+            'tooltip': '导出文件的校验、哈希、复制和清单写入在后台线程中执行；0 表示在主线程中同步执行',
+        },
+        {
+            'id': 'sharePath',
+            'key': 'share_path',
+            'label': '同步复制到目录',
+            'type': 'str',
+            'default': '',
+            'tooltip': '导出后在后台把文件按相同目录结构复制到此目录（如网络共享），留空则不复制',
+        },
+        {
+            'id': 'zipPerConfig',
+            'key': 'zip_per_config',
+            'label': '按配置打包ZIP',
+            'type': 'bool',
+            'default': False,
+            'tooltip': '导出过程中在后台把每个配置的文件流式写入 文档目录/配置名.zip，无需导出后再手动压缩',
+        },
+        {
+            'id': 'zipCompressLevel',
+            'key': 'zip_compress_level',
+            'label': 'ZIP压缩级别',
+            'type': 'int',
+            'default': 6,
+            'tooltip': '0-9，0 表示只存储不压缩（最快），9 压缩率最高；3MF 本身已压缩，始终直接存储',
+        },
+        {
+            'id': 'zipDeleteLoose',
+            'key': 'zip_delete_loose',
+            'label': '打包后删除原文件',
+            'type': 'bool',
+            'default': False,
+            'tooltip': '文件写入ZIP后删除配置目录中的原文件；删除后导出缓存无法复用这些文件，下次会重新导出',
+        },
+        {
+            'id': 'logLevel',
+            'key': 'log_level',
+            'label': '日志级别',
+            'type': 'choice',
+            'choices': ['INFO', 'DEBUG', 'WARN', 'ERROR'],
+            'default': 'INFO',
+            'tooltip': '低于该级别的日志不输出; DEBUG 会记录每个参数的读取、应用和恢复',
+        },
+        {
+            'id': 'logJsonl',
+            'key': 'log_jsonl',
+            'label': 'JSONL格式日志',
+            'type': 'bool',
+            'default': False,
+            'tooltip': '在文本日志之外同时写入每行一个JSON对象的日志（Fusion360BatchExport.jsonl），便于用脚本分析',
+        },
+        {
+            'id': 'enableTrace',
+            'key': 'enable_trace',
+            'label': '记录性能追踪',
+            'type': 'bool',
+            'default': False,
+            'tooltip': '记录各阶段耗时，批次结束后在日志目录的 traces 下生成可用 chrome://tracing 或 Perfetto 打开的 trace 文件和耗时汇总表',
+        },
+        {
+            'id': 'progressIntervalMs',
+            'key': 'progress_interval_ms',
+            'label': '进度刷新间隔（毫秒）',
+            'type': 'int',
+            'default': 250,
+            'tooltip': '进度框和剩余时间的最短刷新间隔；零件很多且导出很快时减少界面刷新的开销，0 表示每个零件都刷新',
+        },
+        {
+            'id': 'persistConfigCache',
+            'key': 'persist_config_cache',
+            'label': '保存Excel解析缓存到磁盘',
+            'type': 'bool',
+            'default': False,
+            'tooltip': 'Excel未变化时始终直接使用上次解析的配置；勾选后解析结果同时保存到临时目录，重启Fusion后仍可复用',
+        },
+        {
+            'id': 'queueUnitSize',
+            'key': 'queue_unit_size',
+            'label': '共享队列单元配置数',
+            'type': 'int',
+            'default': 10,
+            'tooltip': '创建共享导出队列时每个工作单元包含的配置数；越小各实例分配越均匀，越大协调开销越少',
+        },
+        {
+            'id': 'queueLeaseMinutes',
+            'key': 'queue_lease_minutes',
+            'label': '共享队列租约（分钟）',
+            'type': 'int',
+            'default': 30,
+            'tooltip': '领取的工作单元在该时间内没有续约（实例崩溃或断开）时重新排队，由其他实例处理；导出过程中会自动续约',
+        },
+        {
+            'id': 'forceRefresh',
+            'key': 'force_refresh',
+            'label': '强制重新导出（忽略缓存）',
+            'type': 'bool',
+            'default': False,
+            'tooltip': '忽略导出缓存，重新导出所有零件；修改了模型但未保存新版本时请勾选',
+        },
+    ]
+
+    @staticmethod
+    def defaults():
+        """获取所有选项的默认值"""
+        return {option['key']: option['default'] for option in OptionUtils.OPTIONS}
+
+    @staticmethod
+    def is_option_input(input_id):
+        return any(option['id'] == input_id for option in OptionUtils.OPTIONS)
+
+    @staticmethod
+    def add_option_inputs(inputs):
+        """在对话框中添加高级选项分组"""
+        try:
+            option_group = inputs.addGroupCommandInput(OptionUtils.GROUP_ID, '⚙️ 高级选项')
+            option_group.isExpanded = False
+            option_inputs = option_group.children
+        except Exception:
+            option_inputs = inputs
+
+        for option in OptionUtils.OPTIONS:
+            value = CacheUtils.load_cached_option(option['id'], option['default'])
+            if option['type'] == 'bool':
+                control = option_inputs.addBoolValueInput(option['id'], option['label'], True, '', bool(value))
+                control.value = bool(value)
+            elif option['type'] == 'choice':
+                control = option_inputs.addDropDownCommandInput(option['id'], option['label'], adsk.core.DropDownStyles.TextListDropDownStyle)
+                choices = option['choices']
+                selected = value if value in choices else option['default']
+                for choice in choices:
+                    control.listItems.add(choice, choice == selected, '')
+            else:
+                control = option_inputs.addStringValueInput(option['id'], option['label'], str(value))
+            control.tooltip = option.get('tooltip', '')
+
+    @staticmethod
+    def _find_input(inputs, input_id):
+        option_group = inputs.itemById(OptionUtils.GROUP_ID)
+        if option_group:
+            control = option_group.children.itemById(input_id)
+            if control:
+                return control
+        return inputs.itemById(input_id)
+
+    @staticmethod
+    def _read_value(option, control):
+        """读取控件值并转换为选项类型，无效值返回默认值"""
+        try:
+            if option['type'] == 'bool':
+                return bool(control.value)
+            if option['type'] == 'choice':
+                item = control.selectedItem
+                return item.name if item else option['default']
+            text = str(control.value).strip()
+            if option['type'] == 'int':
+                return int(text)
+            if option['type'] == 'float':
+                return float(text)
+            return text
+        except Exception:
+            return option['default']
+
+    @staticmethod
+    def collect_options(inputs):
+        """从对话框读取所有高级选项"""
+        options = OptionUtils.defaults()
+        for option in OptionUtils.OPTIONS:
+            control = OptionUtils._find_input(inputs, option['id'])
+            if control:
+                options[option['key']] = OptionUtils._read_value(option, control)
+        return options
+
+    @staticmethod
+    def save_option(control):
+        """记忆单个选项的值"""
+        for option in OptionUtils.OPTIONS:
+            if option['id'] == control.id:
+                CacheUtils.save_cached_option(option['id'], OptionUtils._read_value(option, control))
+                return
@@ -0,0 +1,361 @@
+"""
+导出后处理模块
+文件导出后的哈希、校验、复制到共享目录、清单写入和按配置打包等工作在后台线程中执行，
+与下一个配置的参数应用和重新计算重叠进行
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from .ExportCacheUtils import ExportCache
+from .LogUtils import LogUtils
+from .TraceUtils import TraceUtils
+
+
+class PostExportPipeline:
+    """有界的后台后处理流水线
+
+    Fusion API 只能在主线程调用，因此这里的任务只处理已经写到磁盘的文件。
+    等待处理的文件数达到上限时 submit 会阻塞（期间调用 wait_callback 保持界面响应），
+    从而限制内存占用并避免后台积压。max_workers 为 0 时在主线程同步执行。
+    """
+
+    def __init__(self, max_workers=2, max_pending=None, wait_callback=None):
+        self.max_workers = max(0, int(max_workers))
+        self.wait_callback = wait_callback
+        self._stages = []
+        self._lock = threading.Lock()
+        self._futures = []
+        self.failures = []
+        self.processed_count = 0
+        self._executor = None
+        self._slots = None
+        if self.max_workers > 0:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='BatchExportPost')
+            self._slots = threading.BoundedSemaphore(max_pending or self.max_workers * 4)
+
+    def add_stage(self, name, func):
+        """添加处理阶段，func(result) 按添加顺序执行，抛出异常时记录失败并跳过后续阶段
+
+        阶段返回结果列表时（如由STL转换出的OBJ/3MF），列表中的结果代替当前结果进入后续阶段。
+        """
+        self._stages.append((name, func))
+
+    def submit(self, result):
+        """提交一个已导出的文件，result 至少包含 'file'
+
+        返回对应的 Future，同步执行时返回 None
+        """
+        if not self._executor:
+            self._process(result)
+            return None
+        # 背压：等待空闲槽位
+        while not self._slots.acquire(timeout=0.05):
+            if self.wait_callback:
+                self.wait_callback()
+        try:
+            future = self._executor.submit(self._process_and_release, result)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._futures.append(future)
+            # 丢弃已完成的任务，避免列表无限增长
+            if len(self._futures) > 256:
+                self._futures = [f for f in self._futures if not f.done()]
+        return future
+
+    def _process_and_release(self, result):
+        try:
+            self._process(result)
+        finally:
+            self._slots.release()
+
+    def _process(self, result, start=0):
+        for index in range(start, len(self._stages)):
+            name, func = self._stages[index]
+            try:
+                with TraceUtils.span(f'post.{name}'):
+                    output = func(result)
+            except Exception as e:
+                with self._lock:
+                    self.failures.append({'file': result.get('file'), 'stage': name, 'error': str(e)})
+                LogUtils.warn(f'后处理失败 [{name}]: {result.get("file")} {str(e)}')
+                return
+            if isinstance(output, list):
+                for item in output:
+                    self._process(item, index + 1)
+                return
+        with self._lock:
+            self.processed_count += 1
+
+    def drain(self):
+        """等待所有后处理任务完成并关闭线程池"""
+        if not self._executor:
+            return
+        while True:
+            with self._lock:
+                pending = [f for f in self._futures if not f.done()]
+                self._futures = pending
+            if not pending:
+                break
+            if self.wait_callback:
+                self.wait_callback()
+            time.sleep(0.02)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def format_failures(self, max_lines=5):
+        """生成失败摘要文本"""
+        lines = [f'- [{f["stage"]}] {os.path.basename(f["file"] or "")}: {f["error"]}' for f in self.failures[:max_lines]]
+        if len(self.failures) > max_lines:
+            lines.append(f'- ... 共 {len(self.failures)} 个')
+        return '\n'.join(lines)
+
+
+class PostProcessStages:
+    """常用的后处理阶段"""
+
+    # 各格式文件的起始标记
+    _FILE_SIGNATURES = {
+        'step': b'ISO-10303-21',
+        '3mf': b'PK',
+    }
+
+    @staticmethod
+    def validate(result):
+        """校验导出文件存在、非空且格式标记正确"""
+        filepath = result['file']
+        size = os.path.getsize(filepath)
+        if size == 0:
+            raise ValueError('导出文件为空')
+        result['size'] = size
+        export_format = result.get('format', '')
+        signature = PostProcessStages._FILE_SIGNATURES.get(export_format)
+        if signature:
+            with open(filepath, 'rb') as f:
+                if not f.read(len(signature) + 16).lstrip().startswith(signature):
+                    raise ValueError(f'{export_format.upper()} 文件格式标记不正确')
+        if export_format == 'stl':
+            # 二进制STL: 80字节文件头 + 4字节三角形数 + 每个三角形50字节
+            with open(filepath, 'rb') as f:
+                header = f.read(84)
+            if len(header) == 84 and not header.startswith(b'solid'):
+                triangles = int.from_bytes(header[80:84], 'little')
+                if size != 84 + triangles * 50:
+                    raise ValueError('STL 文件长度与三角形数量不符')
+
+    @staticmethod
+    def hash_file(export_cache=None):
+        """计算文件哈希，并补全导出缓存中的记录"""
+        def stage(result):
+            result['sha256'] = ExportCache.file_hash(result['file'])
+            if export_cache and result.get('cache_key'):
+                export_cache.update_hash(result['cache_key'], result['file'], result['sha256'])
+        return stage
+
+    @staticmethod
+    def copy_to(target_root, source_root):
+        """按相同的目录结构把文件复制到共享目录"""
+        def stage(result):
+            relative = os.path.relpath(result['file'], source_root)
+            target = os.path.join(target_root, relative)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(result['file'], target)
+            result['copied_to'] = target
+        return stage
+
+
+class ConfigArchiver:
+    """把每个配置目录中的导出文件流式写入 导出路径/文档名/配置名.zip
+
+    所有写入都在单独的一个后台线程中按顺序执行（zipfile 不支持多线程同时写入同一个压缩包）。
+    文件在后处理流水线中通过 add 逐个加入；配置导出结束后调用 close_config，
+    等该配置的所有后处理任务完成后再关闭压缩包。压缩包先写入临时文件，关闭时再重命名，
+    中途取消时不会留下不完整的 zip。
+    """
+
+    # 本身已压缩的格式直接存储，不再压缩
+    _STORED_EXTENSIONS = ('.3mf', '.zip')
+
+    def __init__(self, compress_level=6, delete_loose=False, wait_callback=None):
+        self.compress_level = min(9, max(0, int(compress_level)))
+        self.delete_loose = delete_loose
+        self.wait_callback = wait_callback
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='BatchExportZip')
+        self._lock = threading.Lock()
+        self._open_configs = 0
+        # 仅在打包线程中访问：配置目录 -> (ZipFile, 已写入的文件名集合)
+        self._archives = {}
+        self.archive_count = 0
+        self.failures = []
+
+    @staticmethod
+    def archive_path(config_dir):
+        return os.path.normpath(config_dir) + '.zip'
+
+    def add(self, result):
+        """后处理阶段：把文件加入所在配置目录的压缩包（异步执行）"""
+        self._executor.submit(self._write, result['file'])
+
+    def close_config(self, config_dir, futures=None):
+        """该配置的后处理任务全部完成后，补充目录中的其他文件并关闭压缩包
+
+        futures 为该配置提交到后处理流水线的任务，同步执行的流水线传入空列表即可。
+        """
+        pending = [f for f in (futures or []) if f is not None]
+        with self._lock:
+            self._open_configs += 1
+        if not pending:
+            self._executor.submit(self._close, config_dir)
+            return
+        remaining = [len(pending)]
+
+        def on_done(_):
+            with self._lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._executor.submit(self._close, config_dir)
+
+        for future in pending:
+            future.add_done_callback(on_done)
+
+    def _open(self, config_dir):
+        if config_dir not in self._archives:
+            compression = zipfile.ZIP_DEFLATED if self.compress_level > 0 else zipfile.ZIP_STORED
+            archive = zipfile.ZipFile(self.archive_path(config_dir) + '.tmp', 'w', compression=compression,
+                                      compresslevel=self.compress_level if self.compress_level > 0 else None,
+                                      allowZip64=True)
+            self._archives[config_dir] = (archive, set())
+        return self._archives[config_dir]
+
+    def _write_entry(self, config_dir, filepath):
+        archive, written = self._open(config_dir)
+        arcname = os.path.relpath(filepath, config_dir).replace(os.sep, '/')
+        if arcname in written:
+            return
+        compress_type = zipfile.ZIP_STORED if filepath.lower().endswith(self._STORED_EXTENSIONS) else None
+        archive.write(filepath, arcname, compress_type=compress_type)
+        written.add(arcname)
+
+    def _write(self, filepath):
+        config_dir = os.path.dirname(filepath)
+        try:
+            with TraceUtils.span('zip.write'):
+                self._write_entry(config_dir, filepath)
+        except Exception as e:
+            self._record_failure(filepath, e)
+
+    def _close(self, config_dir):
+        try:
+            with TraceUtils.span('zip.close'):
+                self._close_archive(config_dir)
+        except Exception as e:
+            self._record_failure(config_dir, e)
+        finally:
+            with self._lock:
+                self._open_configs -= 1
+
+    def _close_archive(self, config_dir):
+        # 补充未经过流水线的文件（命中缓存的文件、instances.json 等）
+        if os.path.isdir(config_dir):
+            for dirpath, _, filenames in os.walk(config_dir):
+                for filename in sorted(filenames):
+                    try:
+                        self._write_entry(config_dir, os.path.join(dirpath, filename))
+                    except Exception as e:
+                        self._record_failure(os.path.join(dirpath, filename), e)
+        if config_dir in self._archives:
+            archive, written = self._archives.pop(config_dir)
+            archive.close()
+            os.replace(self.archive_path(config_dir) + '.tmp', self.archive_path(config_dir))
+            self.archive_count += 1
+            if self.delete_loose:
+                # 压缩包完成后才删除散落文件：同一配置中由STL转换OBJ/3MF的任务可能仍在读取已打包的STL
+                for arcname in written:
+                    try:
+                        os.remove(os.path.join(config_dir, arcname))
+                    except OSError:
+                        pass
+                self._remove_empty_dirs(config_dir)
+
+    @staticmethod
+    def _remove_empty_dirs(config_dir):
+        for dirpath, _, _ in sorted(os.walk(config_dir), key=lambda item: len(item[0]), reverse=True):
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+
+    def _record_failure(self, path, error):
+        with self._lock:
+            self.failures.append({'file': path, 'stage': 'zip', 'error': str(error)})
+        LogUtils.warn(f'打包失败: {path} {str(error)}')
+
+    def finish(self):
+        """等待所有压缩包关闭后结束打包线程，需在后处理流水线 drain 之后调用"""
+        while True:
+            with self._lock:
+                if self._open_configs <= 0:
+                    break
+            if self.wait_callback:
+                self.wait_callback()
+            time.sleep(0.02)
+        self._executor.shutdown(wait=True)
+        # 未关闭的压缩包（如 close_config 未被调用）直接丢弃临时文件
+        for config_dir, (archive, _) in list(self._archives.items()):
+            try:
+                archive.close()
+                os.remove(self.archive_path(config_dir) + '.tmp')
+            except Exception:
+                pass
+        self._archives = {}
+
+
+class ExportManifest:
+    """导出清单，记录每个导出文件的配置、零件、格式、大小和哈希"""
+
+    FILENAME = 'manifest.json'
+
+    def __init__(self, root_dir, path=None):
+        """:param path: 清单文件路径，默认为 root_dir/manifest.json（共享队列中每个工作单元单独保存）"""
+        self.root_dir = root_dir
+        self.path = path or os.path.join(root_dir, ExportManifest.FILENAME)
+        self._lock = threading.Lock()
+        self._files = {}
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    for item in json.load(f).get('files', []):
+                        self._files[item['file']] = item
+        except Exception as e:
+            LogUtils.warn(f'读取导出清单失败，将重新生成: {str(e)}')
+
+    def add(self, result):
+        """后处理阶段：把文件信息加入清单"""
+        item = {
+            'file': os.path.relpath(result['file'], self.root_dir).replace(os.sep, '/'),
+            'config': result.get('config'),
+            'component': result.get('component'),
+            'format': result.get('format'),
+            'size': result.get('size'),
+            'sha256': result.get('sha256'),
+        }
+        with self._lock:
+            self._files[item['file']] = item
+
+    def save(self):
+        try:
+            with self._lock:
+                files = sorted(self._files.values(), key=lambda item: item['file'])
+            temp_path = self.path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'files': files}, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            LogUtils.warn(f'保存导出清单失败: {str(e)}')
@@ -0,0 +1,308 @@
+"""
+共享导出队列模块
+把一个批次的配置拆分为工作单元保存到共享目录（导出路径/文档名/.export_queue），
+多台电脑或多个 Fusion 实例上的插件各自领取、导出并确认工作单元，只通过锁文件协调，不需要服务器
+"""
+
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+from itertools import islice
+from .LockUtils import FileLock
+from .LogUtils import LogUtils
+
+
+class ExportQueue:
+    """共享目录中的导出队列
+
+    目录结构（导出路径/文档名/.export_queue）：
+      plan.json           批次信息：文档标识、导出选项、配置数、单元大小、租约时长
+      state.json          各工作单元的状态：pending / leased / done / failed，领取者和租约到期时间
+      queue.lock          修改 state.json 时持有的锁文件
+      units/00001.json    工作单元的导出配置
+      results/00001.json  工作单元的导出清单，队列结束时合并到 文档目录/manifest.json
+      workers/            各实例的导出缓存索引和导出日志
+    领取工作单元时租约到期（领取者崩溃或断开）的单元重新排队；租约按本机时钟判断，各电脑的时钟应大致同步。
+    """
+
+    DIRNAME = '.export_queue'
+    VERSION = 1
+    # 一个工作单元失败（导出出错或租约过期）超过该次数后不再重试
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, doc_dir):
+        self.doc_dir = doc_dir
+        self.queue_dir = os.path.join(doc_dir, ExportQueue.DIRNAME)
+        self.plan_path = os.path.join(self.queue_dir, 'plan.json')
+        self.state_path = os.path.join(self.queue_dir, 'state.json')
+        self.units_dir = os.path.join(self.queue_dir, 'units')
+        self.results_dir = os.path.join(self.queue_dir, 'results')
+        self.workers_dir = os.path.join(self.queue_dir, 'workers')
+        self._lock = FileLock(os.path.join(self.queue_dir, 'queue.lock'))
+
+    @staticmethod
+    def worker_id():
+        """当前实例的标识：主机名-进程号"""
+        return f'{socket.gethostname()}-{os.getpid()}'
+
+    @staticmethod
+    def _read_json(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path, data):
+        """先写临时文件再替换，其他实例不会读到写了一半的文件"""
+        temp_path = f'{path}.{ExportQueue.worker_id()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def _unit_path(self, unit_id):
+        return os.path.join(self.units_dir, f'{unit_id}.json')
+
+    def result_path(self, unit_id):
+        return os.path.join(self.results_dir, f'{unit_id}.json')
+
+    def worker_cache_path(self, worker):
+        return os.path.join(self.workers_dir, f'{worker}.export_cache.json')
+
+    def worker_journal_path(self, worker):
+        return os.path.join(self.workers_dir, f'{worker}.export_journal.jsonl')
+
+    def load_plan(self):
+        try:
+            plan = ExportQueue._read_json(self.plan_path)
+            return plan if plan.get('version') == ExportQueue.VERSION else None
+        except Exception:
+            return None
+
+    def load_state(self):
+        """读取队列状态，队列不存在或无法读取时返回None"""
+        try:
+            return ExportQueue._read_json(self.state_path)
+        except Exception:
+            return None
+
+    def is_active(self):
+        """队列存在且尚未结束（可以加入）"""
+        state = self.load_state()
+        return bool(state) and not state.get('finished') and self.load_plan() is not None
+
+    def create(self, document_key, export_configs, options, unit_size=10, lease_seconds=1800):
+        """
+        把配置按顺序拆分为工作单元并创建队列，覆盖同一文档目录下已结束的旧队列
+        :return: 工作单元数；已有未结束的队列时返回None
+        """
+        os.makedirs(self.queue_dir, exist_ok=True)
+        unit_size = max(1, int(unit_size))
+        with self._lock:
+            state = self.load_state()
+            if state and not state.get('finished'):
+                return None
+            for directory in (self.units_dir, self.results_dir, self.workers_dir):
+                shutil.rmtree(directory, ignore_errors=True)
+                os.makedirs(directory)
+            units = {}
+            config_count = 0
+            iterator = iter(export_configs)
+            while True:
+                configs = list(islice(iterator, unit_size))
+                if not configs:
+                    break
+                unit_id = f'{len(units) + 1:05d}'
+                ExportQueue._write_json(self._unit_path(unit_id), {'id': unit_id, 'first': config_count, 'configs': configs})
+                units[unit_id] = {'status': 'pending', 'configs': len(configs), 'attempts': 0}
+                config_count += len(configs)
+            ExportQueue._write_json(self.plan_path, {
+                'version': ExportQueue.VERSION,
+                'document': document_key,
+                'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+                'planner': ExportQueue.worker_id(),
+                'options': options,
+                'configs': config_count,
+                'unit_size': unit_size,
+                'lease_seconds': lease_seconds,
+            })
+            ExportQueue._write_json(self.state_path, {'finished': False, 'units': units})
+        LogUtils.info(f'已创建共享导出队列: {len(units)} 个工作单元，共 {config_count} 个配置 ({self.queue_dir})')
+        return len(units)
+
+    def _requeue_expired(self, state, now):
+        for unit_id, unit in state['units'].items():
+            if unit['status'] == 'leased' and unit.get('lease_until', 0) < now:
+                status = 'failed' if unit['attempts'] >= ExportQueue.MAX_ATTEMPTS else 'pending'
+                LogUtils.warn(f'工作单元 {unit_id} 的租约已过期（领取者 {unit.get("worker")}），'
+                              f'{"已达到重试上限" if status == "failed" else "重新排队"}')
+                unit['status'] = status
+
+    def claim(self, worker):
+        """
+        领取一个待处理的工作单元（租约过期的单元会先重新排队）
+        :return: (单元标识, 导出配置列表)，没有可领取的单元时返回None
+        """
+        lease_seconds = (self.load_plan() or {}).get('lease_seconds', 1800)
+        with self._lock:
+            state = self.load_state()
+            if not state or state.get('finished'):
+                return None
+            now = time.time()
+            self._requeue_expired(state, now)
+            unit_id = next((key for key, unit in sorted(state['units'].items()) if unit['status'] == 'pending'), None)
+            if unit_id is None:
+                ExportQueue._write_json(self.state_path, state)
+                return None
+            unit = state['units'][unit_id]
+            unit.update({'status': 'leased', 'worker': worker, 'lease_until': now + lease_seconds})
+            unit['attempts'] += 1
+            ExportQueue._write_json(self.state_path, state)
+        configs = ExportQueue._read_json(self._unit_path(unit_id))['configs']
+        LogUtils.info(f'领取工作单元 {unit_id}（{len(configs)} 个配置，第 {unit["attempts"]} 次）')
+        return unit_id, configs
+
+    def _update(self, unit_id, worker, changes, require_lease=True):
+        """修改本实例持有的工作单元状态，单元已被重新分配时返回False"""
+        with self._lock:
+            state = self.load_state()
+            unit = state['units'].get(unit_id) if state else None
+            if not unit:
+                return False
+            if require_lease and (unit['status'] != 'leased' or unit.get('worker') != worker):
+                return False
+            unit.update(changes)
+            ExportQueue._write_json(self.state_path, state)
+            return True
+
+    def renew(self, unit_id, worker):
+        """延长租约"""
+        lease_seconds = (self.load_plan() or {}).get('lease_seconds', 1800)
+        return self._update(unit_id, worker, {'lease_until': time.time() + lease_seconds})
+
+    def ack(self, unit_id, worker, result):
+        """确认工作单元已完成；租约过期后已被其他实例重新领取的单元同样记为完成"""
+        changes = {
+            'status': 'done',
+            'worker': worker,
+            'finished': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'exported': result.get('exported', 0),
+            'failed': result.get('failed', 0),
+        }
+        self._update(unit_id, worker, changes, require_lease=False)
+
+    def release(self, unit_id, worker, count_attempt=True):
+        """放弃工作单元使其重新排队（导出出错时计入重试次数，用户取消时不计入）"""
+        with self._lock:
+            state = self.load_state()
+            unit = state['units'].get(unit_id) if state else None
+            if not unit or unit['status'] != 'leased' or unit.get('worker') != worker:
+                return
+            if not count_attempt:
+                unit['attempts'] -= 1
+            unit['status'] = 'failed' if unit['attempts'] >= ExportQueue.MAX_ATTEMPTS else 'pending'
+            ExportQueue._write_json(self.state_path, state)
+
+    def summary(self):
+        """各状态的工作单元数和已导出/失败的配置数"""
+        state = self.load_state() or {'units': {}}
+        summary = {'units': len(state['units']), 'pending': 0, 'leased': 0, 'done': 0, 'failed': 0,
+                   'exported': 0, 'failed_configs': 0, 'finished': bool(state.get('finished'))}
+        for unit in state['units'].values():
+            summary[unit['status']] += 1
+            summary['exported'] += unit.get('exported', 0)
+            if unit['status'] == 'done':
+                summary['failed_configs'] += unit.get('failed', 0)
+            elif unit['status'] == 'failed':
+                summary['failed_configs'] += unit['configs']
+        return summary
+
+    def finalize(self, merge_cache):
+        """
+        所有工作单元都已完成或失败时结束队列：合并各单元的导出清单和各实例的导出缓存
+        :param merge_cache: 回调 merge_cache([缓存索引路径])，把各实例的缓存索引合并到文档目录的缓存中
+        :return: 本次是否结束了队列（其他实例已结束或仍有未完成的单元时返回False）
+        """
+        with self._lock:
+            state = self.load_state()
+            if not state or state.get('finished'):
+                return False
+            if any(unit['status'] in ('pending', 'leased') for unit in state['units'].values()):
+                return False
+            files = {}
+            manifest_path = os.path.join(self.doc_dir, 'manifest.json')
+            sources = [manifest_path] + [self.result_path(unit_id) for unit_id in sorted(state['units'])]
+            for path in sources:
+                try:
+                    if os.path.exists(path):
+                        for item in ExportQueue._read_json(path).get('files', []):
+                            files[item['file']] = item
+                except Exception as e:
+                    LogUtils.warn(f'读取导出清单失败 {path}: {str(e)}')
+            ExportQueue._write_json(manifest_path, {'files': sorted(files.values(), key=lambda item: item['file'])})
+            cache_paths = sorted(os.path.join(self.workers_dir, name) for name in os.listdir(self.workers_dir)
+                                 if name.endswith('.export_cache.json'))
+            try:
+                merge_cache(cache_paths)
+            except Exception as e:
+                LogUtils.warn(f'合并导出缓存失败: {str(e)}')
+            state['finished'] = True
+            state['finished_time'] = time.strftime('%Y-%m-%d %H:%M:%S')
+            ExportQueue._write_json(self.state_path, state)
+        LogUtils.info(f'共享导出队列已结束，合并了 {len(files)} 个文件的导出清单: {manifest_path}')
+        return True
+
+
+class QueueLease:
+    """一个已领取的工作单元：提供本实例的缓存和日志路径，start() 到 stop() 之间由后台线程定期续约"""
+
+    def __init__(self, queue, unit_id, worker):
+        self.queue = queue
+        self.unit_id = unit_id
+        self.worker = worker
+        lease_seconds = (queue.load_plan() or {}).get('lease_seconds', 1800)
+        # 每过租约时长的四分之一续约一次
+        self.renew_interval = max(1.0, lease_seconds / 4.0)
+        self.lost = False
+        self._stop_renew = None
+
+    @property
+    def cache_path(self):
+        return self.queue.worker_cache_path(self.worker)
+
+    @property
+    def journal_path(self):
+        return self.queue.worker_journal_path(self.worker)
+
+    @property
+    def manifest_path(self):
+        return self.queue.result_path(self.unit_id)
+
+    def start(self):
+        """启动后台续约线程（不依赖导出循环，单个配置导出很久时同样续约）"""
+        if self._stop_renew is not None:
+            return
+        stop = threading.Event()
+        self._stop_renew = stop
+
+        def renew_loop():
+            while not stop.wait(self.renew_interval):
+                self.heartbeat()
+
+        thread = threading.Thread(target=renew_loop, name='QueueLeaseRenew', daemon=True)
+        thread.start()
+
+    def stop(self):
+        if self._stop_renew is not None:
+            self._stop_renew.set()
+            self._stop_renew = None
+
+    def heartbeat(self):
+        """续约；租约已被其他实例接管时记录警告（导出结果相同，继续完成本单元）"""
+        try:
+            if not self.queue.renew(self.unit_id, self.worker) and not self.lost:
+                self.lost = True
+                LogUtils.warn(f'工作单元 {self.unit_id} 的租约已过期并被重新分配，继续完成本单元')
+        except Exception as e:
+            LogUtils.warn(f'续约工作单元 {self.unit_id} 失败: {str(e)}')
@@ -0,0 +1,148 @@
+"""
+调度工具模块
+对导出配置重新排序，使相邻配置之间需要修改的参数尽可能少
+"""
+
+from .LogUtils import LogUtils
+
+
+class ScheduleUtils:
+    # 超过该数量的配置不进行调度（最近邻算法为O(n²)）
+    MAX_SCHEDULE_CONFIGS = 5000
+
+    @staticmethod
+    def _normalize(expression):
+        """规范化参数表达式（忽略多余空白）"""
+        if expression is None:
+            return None
+        return ' '.join(str(expression).split())
+
+    @staticmethod
+    def _normalize_parameters(parameters):
+        return {name: ScheduleUtils._normalize(value) for name, value in parameters.items()}
+
+    @staticmethod
+    def _count_changes(state, normalized_parameters):
+        """计算从当前状态应用一组（已规范化的）参数需要修改的参数个数"""
+        changes = 0
+        for name, value in normalized_parameters.items():
+            if state.get(name) != value:
+                changes += 1
+        return changes
+
+    @staticmethod
+    def count_total_changes(configs, initial_state):
+        """按给定顺序执行时参数修改的总次数"""
+        state = ScheduleUtils._normalize_parameters(initial_state)
+        total = 0
+        for config in configs:
+            parameters = ScheduleUtils._normalize_parameters(config['parameters'])
+            total += ScheduleUtils._count_changes(state, parameters)
+            state.update(parameters)
+        return total
+
+    @staticmethod
+    def plan_order(configs, initial_state):
+        """使用最近邻算法规划配置顺序
+
+        从与当前设计状态最接近的配置开始，每一步选择参数变化最少的下一个配置。
+        :param configs: 导出配置列表
+        :param initial_state: 当前设计中的参数表达式 {参数名: 表达式}
+        :return: (排序后的配置列表, 原顺序修改次数, 调度后修改次数)
+        """
+        original_changes = ScheduleUtils.count_total_changes(configs, initial_state)
+        if len(configs) > ScheduleUtils.MAX_SCHEDULE_CONFIGS:
+            LogUtils.warn(f'配置数量 {len(configs)} 超过调度上限 {ScheduleUtils.MAX_SCHEDULE_CONFIGS}，保持原顺序')
+            # 保持原序列，参数扫描展开的配置不会被一次性生成
+            return configs, original_changes, original_changes
+        if len(configs) <= 1:
+            return list(configs), original_changes, original_changes
+
+        state = ScheduleUtils._normalize_parameters(initial_state)
+        normalized = [ScheduleUtils._normalize_parameters(config['parameters']) for config in configs]
+        remaining = list(range(len(configs)))
+        ordered = []
+        planned_changes = 0
+        while remaining:
+            best_pos = 0
+            best_changes = None
+            for pos, index in enumerate(remaining):
+                changes = ScheduleUtils._count_changes(state, normalized[index])
+                # 变化数相同时保持原表格顺序
+                if best_changes is None or changes < best_changes:
+                    best_pos = pos
+                    best_changes = changes
+                    if changes == 0:
+                        break
+            index = remaining.pop(best_pos)
+            ordered.append(configs[index])
+            planned_changes += best_changes
+            state.update(normalized[index])
+        return ordered, original_changes, planned_changes
+
+    @staticmethod
+    def format_plan(ordered, original_changes, planned_changes, max_lines=15):
+        """生成调度计划说明文本"""
+        saved = original_changes - planned_changes
+        ratio = (saved / original_changes * 100) if original_changes else 0.0
+        lines = [
+            f'配置数量: {len(ordered)}',
+            f'原顺序参数修改次数: {original_changes}',
+            f'调度后参数修改次数: {planned_changes}',
+            f'预计减少: {saved} 次 ({ratio:.1f}%)',
+            '',
+            '执行顺序:',
+        ]
+        for position, config in enumerate(ordered[:max_lines], 1):
+            lines.append(f'{position}. {config["custom_name"]}')
+        if len(ordered) > max_lines:
+            lines.append(f'... 共 {len(ordered)} 项')
+        return '\n'.join(lines)
+
+
+class BatchPlan:
+    """批次执行计划：导出前一次性统计 配置 × 零件 × 格式
+
+    零件列表只枚举一次（每个配置的零件相同），配置只遍历一次；
+    按格式组合汇总，参数扫描展开的大量配置也只占用与格式组合数成正比的内存。
+    """
+
+    def __init__(self, part_names):
+        self.part_names = list(part_names)
+        self.config_count = 0
+        self.total_files = 0
+        self.estimated_seconds = 0.0
+        self.estimated_bytes = 0
+        # 没有历史耗时记录的零件格式数
+        self.unknown_units = 0
+        # {格式组合: 配置数}
+        self.format_counts = {}
+
+    @property
+    def parts_per_config(self):
+        return len(self.part_names)
+
+    @property
+    def total_parts(self):
+        return self.parts_per_config * self.config_count
+
+    @staticmethod
+    def build(configs, part_names, estimator=None):
+        """
+        遍历一次配置生成执行计划
+        :param estimator: TimingUtils.BatchEstimator，不为空时同时汇总估算耗时和输出大小
+        """
+        plan = BatchPlan(part_names)
+        format_counts = plan.format_counts
+        for config in configs:
+            key = tuple(f.lower() for f in config['formats'])
+            format_counts[key] = format_counts.get(key, 0) + 1
+        for key, count in format_counts.items():
+            plan.config_count += count
+            plan.total_files += count * len(key) * plan.parts_per_config
+            if estimator:
+                seconds, size, unknown = estimator.config_estimate(key)
+                plan.estimated_seconds += seconds * count
+                plan.estimated_bytes += size * count
+                plan.unknown_units += unknown * count
+        return plan
@@ -0,0 +1,236 @@
+"""
+参数扫描模块
+解析参数单元格中的范围和列表写法，把一行Excel配置按需展开为多组配置。
+展开结果不会一次性生成，按序号即时计算，数百万种组合也不占用额外内存
+"""
+
+import re
+from itertools import islice
+from .LogUtils import LogUtils
+
+
+class _RangeValues:
+    """范围写法 起始:结束:步长 的取值（包含结束值），按序号计算"""
+
+    __slots__ = ('start', 'step', 'count', 'unit')
+
+    def __init__(self, start, step, count, unit):
+        self.start = start
+        self.step = step
+        self.count = count
+        self.unit = unit
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return SweepUtils.format_value(self.start + index * self.step, self.unit)
+
+
+class SweepUtils:
+    # 展开方式：cartesian 为所有扫描参数的全部组合，zip 为各扫描参数按位置一一对应
+    MODES = {
+        'cartesian': 'cartesian', 'product': 'cartesian', '组合': 'cartesian', '笛卡尔积': 'cartesian',
+        'zip': 'zip', '对应': 'zip', '配对': 'zip',
+    }
+    DEFAULT_MODE = 'cartesian'
+    # 单行最多展开的配置数，防止写错步长时生成天文数字的组合
+    MAX_ROW_CONFIGS = 10 ** 7
+
+    _NUMBER = r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?'
+    _RANGE_PATTERN = re.compile(rf'^\s*({_NUMBER})\s*:\s*({_NUMBER})\s*:\s*({_NUMBER})\s*([A-Za-z_]*)\s*$')
+    _LIST_PATTERN = re.compile(r'^\s*[{｛](.*)[}｝]\s*([A-Za-z_]*)\s*$')
+    _PLACEHOLDER_PATTERN = re.compile(r'\{([^{}]+)\}')
+    _UNSAFE_NAME_CHARS = re.compile(r'[\\/:*?"<>|\s]+')
+
+    @staticmethod
+    def format_value(value, unit=''):
+        """格式化扫描生成的数值（去掉浮点误差和多余的0），带单位时以空格分隔"""
+        text = f'{round(value, 10):.10f}'.rstrip('0').rstrip('.')
+        if text in ('-0', ''):
+            text = '0'
+        return f'{text} {unit}' if unit else text
+
+    @staticmethod
+    def parse_mode(mode_value):
+        """解析展开方式单元格，为空或无效时使用 cartesian"""
+        text = str(mode_value or '').strip().lower()
+        if not text:
+            return SweepUtils.DEFAULT_MODE
+        if text in SweepUtils.MODES:
+            return SweepUtils.MODES[text]
+        LogUtils.warn(f'无效的展开方式: {mode_value}，使用 {SweepUtils.DEFAULT_MODE}')
+        return SweepUtils.DEFAULT_MODE
+
+    @staticmethod
+    def parse_values(cell_value):
+        """
+        解析参数单元格中的扫描写法
+        支持范围 "10:50:5 mm"（包含结束值）和列表 "{4,6,8}"、"{4,6,8} mm"、"{4 mm, 0.5 in}"
+        :return: 取值序列（支持 len 和下标），不是扫描写法时返回None
+        """
+        text = str(cell_value).strip()
+        match = SweepUtils._RANGE_PATTERN.match(text)
+        if match:
+            start, stop, step = (float(item) for item in match.group(1, 2, 3))
+            unit = match.group(4)
+            if step == 0 or (stop - start) * step < 0:
+                raise ValueError(f'范围 "{text}" 的步长无效')
+            count = int((stop - start) / step + 1e-9) + 1
+            return _RangeValues(start, step, count, unit)
+        match = SweepUtils._LIST_PATTERN.match(text)
+        if match:
+            unit = match.group(2)
+            items = [item.strip() for item in re.split(r'[,，;；]', match.group(1)) if item.strip()]
+            if not items:
+                raise ValueError(f'列表 "{text}" 为空')
+            return [f'{item} {unit}' if unit else item for item in items]
+        return None
+
+    @staticmethod
+    def safe_name(value):
+        """把参数值转换为可用于目录名的文本"""
+        return SweepUtils._UNSAFE_NAME_CHARS.sub('', str(value)) or '_'
+
+
+class RowSweep:
+    """一行配置展开后的配置序列，按序号即时生成配置"""
+
+    def __init__(self, config, swept, mode):
+        """
+        :param config: 导出配置（parameters 中扫描参数的值会被替换）
+        :param swept: [(参数名, 取值序列)]，按Excel列顺序
+        :param mode: cartesian / zip
+        """
+        self.config = config
+        self.swept = swept
+        self.mode = mode
+        if not swept:
+            self.count = 1
+        elif mode == 'zip':
+            lengths = [len(values) for _, values in swept]
+            self.count = min(lengths)
+            if len(set(lengths)) > 1:
+                LogUtils.warn(f'配置 {config["custom_name"]} 按位置对应展开时各参数取值个数不同 {lengths}，按最少的 {self.count} 个展开')
+        else:
+            self.count = 1
+            for _, values in swept:
+                self.count *= len(values)
+        self._index_width = len(str(self.count))
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        if not self.swept:
+            return self.config
+        values = {}
+        if self.mode == 'zip':
+            for name, choices in self.swept:
+                values[name] = choices[index]
+        else:
+            # 混合进制分解序号，最后一个扫描参数变化最快
+            remainder = index
+            for name, choices in reversed(self.swept):
+                remainder, position = divmod(remainder, len(choices))
+                values[name] = choices[position]
+        config = dict(self.config)
+        config['parameters'] = dict(self.config['parameters'], **values)
+        config['custom_name'] = self._name(index, values)
+        return config
+
+    def _name(self, index, values):
+        """
+        生成配置名：自定义名称中的 {参数名} 替换为该参数的值，{index} / {序号} 替换为行内序号（从1开始）；
+        没有占位符时在名称后追加 _参数名值
+        """
+        base = self.config['custom_name']
+        fields = {name: SweepUtils.safe_name(value) for name, value in values.items()}
+        fields['index'] = fields['序号'] = str(index + 1).zfill(self._index_width)
+        if SweepUtils._PLACEHOLDER_PATTERN.search(base):
+            return SweepUtils._PLACEHOLDER_PATTERN.sub(lambda m: fields.get(m.group(1).strip(), m.group(0)), base)
+        return base + ''.join(f'_{name}{fields[name]}' for name, _ in self.swept)
+
+
+class ConfigSweep:
+    """所有行展开后的配置序列
+
+    支持 len、迭代和下标访问，配置在迭代时才生成，可以直接代替配置列表传给批量导出。
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self._offsets = []
+        total = 0
+        for row in rows:
+            self._offsets.append(total)
+            total += len(row)
+        self.count = total
+
+    @staticmethod
+    def from_configs(configs):
+        """由导出配置创建：解析参数中的扫描写法，无效的写法会导致该行被跳过"""
+        rows = []
+        for config in configs:
+            mode = SweepUtils.parse_mode(config.pop('sweep_mode', None))
+            swept = []
+            try:
+                for name, value in config['parameters'].items():
+                    values = SweepUtils.parse_values(value)
+                    if values is not None:
+                        swept.append((name, values))
+            except ValueError as e:
+                LogUtils.error(f'配置 {config["custom_name"]} 参数扫描写法错误: {str(e)}')
+                continue
+            row = RowSweep(config, swept, mode)
+            if len(row) > SweepUtils.MAX_ROW_CONFIGS:
+                LogUtils.error(f'配置 {config["custom_name"]} 展开为 {len(row)} 个配置，超过上限 {SweepUtils.MAX_ROW_CONFIGS}，已跳过')
+                continue
+            if swept:
+                LogUtils.info(f'配置 {config["custom_name"]} 按 {mode} 展开为 {len(row)} 个配置')
+            rows.append(row)
+        return ConfigSweep(rows)
+
+    @property
+    def row_count(self):
+        return len(self.rows)
+
+    @property
+    def is_expanded(self):
+        """是否有行展开为多个配置"""
+        return self.count != len(self.rows)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for row in self.rows:
+            yield from row
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(islice(self, *index.indices(self.count)))
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        # 二分查找所在的行
+        low, high = 0, len(self._offsets) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._offsets[middle] <= index:
+                low = middle
+            else:
+                high = middle - 1
+        return self.rows[low][index - self._offsets[low]]
+
+    def preview_names(self, limit=10):
+        return [config['custom_name'] for config in islice(self, limit)]
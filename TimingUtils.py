@@ -0,0 +1,268 @@
+"""
+耗时统计模块
+把每个零件各格式的导出耗时、文件大小和每个配置的参数应用（重新计算）耗时保存到本地 SQLite 数据库，
+用于导出过程中的剩余时间估算，以及导出前按Excel配置预估总耗时和输出大小
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+from .LogUtils import LogUtils
+
+
+class TimingDatabase:
+    """历史耗时数据库
+
+    按 (文档, 零件, 格式) 记录导出耗时和文件大小，按文档记录配置的参数应用耗时。
+    只保存指数滑动平均值，数据库大小与零件数量成正比，不随导出次数增长。
+    数据库不可用时所有方法静默失败，不影响导出。
+    """
+
+    FILENAME = 'Fusion360BatchParametricExport_timing.sqlite'
+    # 滑动平均中新样本的权重
+    SMOOTHING = 0.3
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(tempfile.gettempdir(), TimingDatabase.FILENAME)
+        self._conn = None
+        try:
+            self._conn = sqlite3.connect(self.db_path, timeout=2.0)
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS part_timing (
+                    document TEXT NOT NULL,
+                    component TEXT NOT NULL,
+                    format TEXT NOT NULL,
+                    samples INTEGER NOT NULL,
+                    seconds REAL NOT NULL,
+                    bytes REAL,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (document, component, format)
+                );
+                CREATE TABLE IF NOT EXISTS config_timing (
+                    document TEXT PRIMARY KEY,
+                    samples INTEGER NOT NULL,
+                    seconds REAL NOT NULL,
+                    updated REAL NOT NULL
+                );
+            ''')
+        except Exception as e:
+            LogUtils.warn(f'无法打开耗时数据库，剩余时间将按平均速度估算: {str(e)}')
+            self._conn = None
+
+    @staticmethod
+    def document_key(document_key):
+        """耗时与文档版本无关，去掉缓存键中的版本号"""
+        return str(document_key).split('@v')[0]
+
+    def _smooth(self, old, new):
+        if old is None:
+            return new
+        if new is None:
+            return old
+        return old + (new - old) * TimingDatabase.SMOOTHING
+
+    def record_part(self, document, component, export_format, seconds, size=None):
+        if self._conn is None:
+            return
+        try:
+            row = self._conn.execute(
+                'SELECT samples, seconds, bytes FROM part_timing WHERE document=? AND component=? AND format=?',
+                (document, component, export_format)
+            ).fetchone()
+            if row:
+                samples, mean_seconds, mean_bytes = row
+                self._conn.execute(
+                    'UPDATE part_timing SET samples=?, seconds=?, bytes=?, updated=? WHERE document=? AND component=? AND format=?',
+                    (samples + 1, self._smooth(mean_seconds, seconds), self._smooth(mean_bytes, size), time.time(),
+                     document, component, export_format)
+                )
+            else:
+                self._conn.execute(
+                    'INSERT INTO part_timing VALUES (?, ?, ?, 1, ?, ?, ?)',
+                    (document, component, export_format, seconds, size, time.time())
+                )
+        except Exception as e:
+            LogUtils.warn(f'记录导出耗时失败: {str(e)}')
+
+    def record_config(self, document, seconds):
+        if self._conn is None:
+            return
+        try:
+            row = self._conn.execute('SELECT samples, seconds FROM config_timing WHERE document=?', (document,)).fetchone()
+            if row:
+                self._conn.execute('UPDATE config_timing SET samples=?, seconds=?, updated=? WHERE document=?',
+                                   (row[0] + 1, self._smooth(row[1], seconds), time.time(), document))
+            else:
+                self._conn.execute('INSERT INTO config_timing VALUES (?, 1, ?, ?)', (document, seconds, time.time()))
+        except Exception as e:
+            LogUtils.warn(f'记录配置耗时失败: {str(e)}')
+
+    def commit(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.commit()
+        except Exception as e:
+            LogUtils.warn(f'保存耗时数据库失败: {str(e)}')
+
+    def part_estimates(self, document):
+        """获取文档中各零件的历史耗时 {(零件, 格式): (秒, 字节)}"""
+        if self._conn is None:
+            return {}
+        try:
+            rows = self._conn.execute('SELECT component, format, seconds, bytes FROM part_timing WHERE document=?', (document,))
+            return {(component, export_format): (seconds, size) for component, export_format, seconds, size in rows}
+        except Exception:
+            return {}
+
+    def config_estimate(self, document):
+        """获取文档配置的历史参数应用耗时（秒），没有记录时返回None"""
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute('SELECT seconds FROM config_timing WHERE document=?', (document,)).fetchone()
+            return row[0] if row else None
+        except Exception:
+            return None
+
+    def close(self):
+        if self._conn is None:
+            return
+        try:
+            self._conn.commit()
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+
+class BatchEstimator:
+    """按历史耗时估算批次耗时和输出大小，并在导出过程中计算剩余时间和速度"""
+
+    # 没有任何历史记录时的默认估算值
+    DEFAULT_PART_SECONDS = 1.0
+    DEFAULT_CONFIG_SECONDS = 2.0
+
+    def __init__(self, database, document, components):
+        self.document = document
+        self.components = list(components)
+        self.parts = database.part_estimates(document)
+        self.config_seconds = database.config_estimate(document)
+        # 没有记录的零件/格式按同格式（或全部）已有记录的平均值估算
+        self._format_means = {}
+        by_format = {}
+        for (_, export_format), (seconds, size) in self.parts.items():
+            by_format.setdefault(export_format, []).append((seconds, size))
+        for export_format, values in by_format.items():
+            sizes = [size for _, size in values if size]
+            self._format_means[export_format] = (
+                sum(seconds for seconds, _ in values) / len(values),
+                sum(sizes) / len(sizes) if sizes else None,
+            )
+        all_values = list(self.parts.values())
+        self._overall_seconds = (sum(seconds for seconds, _ in all_values) / len(all_values)
+                                 if all_values else BatchEstimator.DEFAULT_PART_SECONDS)
+        self._config_cache = {}
+        self._started = None
+        self._estimated_done = 0.0
+        self._parts_done = 0
+
+    @property
+    def has_history(self):
+        return bool(self.parts)
+
+    @property
+    def recompute_estimate(self):
+        """每个配置参数应用和重新计算的估算耗时"""
+        return self.config_seconds if self.config_seconds is not None else BatchEstimator.DEFAULT_CONFIG_SECONDS
+
+    def part_estimate(self, component, export_format):
+        """(秒, 字节, 是否有该零件的历史记录)"""
+        export_format = export_format.lower()
+        known = self.parts.get((component, export_format))
+        if known:
+            return known[0], known[1] or 0, True
+        seconds, size = self._format_means.get(export_format, (self._overall_seconds, None))
+        return seconds, size or 0, False
+
+    def config_estimate(self, formats):
+        """一个配置的估算 (秒, 字节, 无历史记录的零件格式数)，相同格式组合只计算一次"""
+        key = tuple(f.lower() for f in formats)
+        if key not in self._config_cache:
+            seconds = self.recompute_estimate
+            size = 0
+            unknown = 0
+            for component in self.components:
+                for export_format in key:
+                    part_seconds, part_size, known = self.part_estimate(component, export_format)
+                    seconds += part_seconds
+                    size += part_size
+                    if not known:
+                        unknown += 1
+            self._config_cache[key] = (seconds, size, unknown)
+        return self._config_cache[key]
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._estimated_done = 0.0
+        self._parts_done = 0
+
+    def advance(self, estimated_seconds, parts=0):
+        """记录已完成工作的估算耗时和零件数"""
+        self._estimated_done += estimated_seconds
+        self._parts_done += parts
+
+    def progress(self, estimated_total, total_parts):
+        """
+        计算 (已用秒数, 剩余秒数, 每分钟零件数)
+        按历史估算的剩余工作量乘以本次实际速度与估算的比值，没有历史记录时按已完成零件的平均速度估算
+        """
+        elapsed = time.perf_counter() - self._started if self._started is not None else 0.0
+        rate = self._parts_done / elapsed * 60 if elapsed > 0 else 0.0
+        remaining = None
+        if self._estimated_done > 0 and elapsed > 0:
+            remaining = max(0.0, estimated_total - self._estimated_done) * elapsed / self._estimated_done
+        elif self._parts_done and elapsed > 0:
+            remaining = (total_parts - self._parts_done) * elapsed / self._parts_done
+        return elapsed, remaining, rate
+
+    @staticmethod
+    def format_duration(seconds):
+        if seconds is None:
+            return '估算中'
+        seconds = int(round(seconds))
+        hours, rest = divmod(seconds, 3600)
+        minutes, seconds = divmod(rest, 60)
+        if hours:
+            return f'{hours}小时{minutes}分'
+        if minutes:
+            return f'{minutes}分{seconds}秒'
+        return f'{seconds}秒'
+
+    @staticmethod
+    def format_size(size):
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if size < 1024 or unit == 'GB':
+                return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+            size /= 1024.0
+
+
+class ProgressThrottle:
+    """限制进度框的刷新频率
+
+    每个零件都写入进度框并调用 adsk.doEvents 时，零件很多且导出很快的批次大部分时间都花在界面刷新上；
+    距上次刷新超过 interval 秒时才刷新，interval 为0时每次都刷新。
+    """
+
+    def __init__(self, interval=0.25):
+        self.interval = max(0.0, float(interval))
+        self._last = None
+
+    def ready(self, force=False):
+        """是否应该刷新界面；返回True时视为已刷新"""
+        now = time.perf_counter()
+        if force or self._last is None or now - self._last >= self.interval:
+            self._last = now
+            return True
+        return False
@@ -0,0 +1,153 @@
+"""
+性能追踪模块
+记录批量导出各阶段的嵌套耗时，批次结束后输出 Chrome/Perfetto 可打开的 trace JSON 和按阶段汇总的耗时表。
+未启用时 span 返回共享的空对象，几乎没有额外开销
+"""
+
+import json
+import os
+import threading
+import time
+from .LogUtils import LogUtils
+
+
+class _Span:
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        TraceUtils._record(self.name, self.start, time.perf_counter(), self.args)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class TraceUtils:
+    enabled = False
+    # (名称, 开始, 结束, 线程ID, 参数)，list.append 是线程安全的
+    _events = []
+    _thread_names = {}
+    _origin = 0.0
+
+    @staticmethod
+    def begin_batch(enabled):
+        """开始一个批次的追踪，enabled 为False时所有 span 都是空操作"""
+        TraceUtils.enabled = bool(enabled)
+        TraceUtils._events = []
+        TraceUtils._thread_names = {}
+        TraceUtils._origin = time.perf_counter()
+
+    @staticmethod
+    def span(name, **args):
+        """计时区间，用法: with TraceUtils.span('export', format='stl'): ..."""
+        if not TraceUtils.enabled:
+            return _NULL_SPAN
+        return _Span(name, args)
+
+    @staticmethod
+    def _record(name, start, end, args):
+        thread = threading.current_thread()
+        if thread.ident not in TraceUtils._thread_names:
+            TraceUtils._thread_names[thread.ident] = thread.name
+        TraceUtils._events.append((name, start, end, thread.ident, args))
+
+    @staticmethod
+    def end_batch(trace_dir, name='batch'):
+        """结束追踪并写出 trace JSON 和汇总表，返回 (trace文件路径, 汇总表文本)，未启用时返回 (None, '')"""
+        if not TraceUtils.enabled:
+            return None, ''
+        TraceUtils.enabled = False
+        # 整个批次作为最外层区间
+        TraceUtils._record('batch', TraceUtils._origin, time.perf_counter(), {})
+        events = list(TraceUtils._events)
+        try:
+            os.makedirs(trace_dir, exist_ok=True)
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            trace_path = os.path.join(trace_dir, f'trace_{name}_{stamp}.json')
+            with open(trace_path, 'w', encoding='utf-8') as f:
+                json.dump(TraceUtils._chrome_trace(events), f, ensure_ascii=False)
+            table = TraceUtils.format_summary(events)
+            with open(os.path.splitext(trace_path)[0] + '.txt', 'w', encoding='utf-8') as f:
+                f.write(table + '\n')
+            return trace_path, table
+        except Exception as e:
+            LogUtils.warn(f'写入性能追踪文件失败: {str(e)}')
+            return None, ''
+
+    @staticmethod
+    def _chrome_trace(events):
+        """转换为 Chrome Trace Event 格式（完整事件 ph=X，时间单位微秒）"""
+        origin = TraceUtils._origin
+        trace_events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': thread_name}}
+            for tid, thread_name in TraceUtils._thread_names.items()
+        ]
+        for name, start, end, tid, args in events:
+            event = {
+                'name': name,
+                'cat': name.split('.')[0],
+                'ph': 'X',
+                'ts': round((start - origin) * 1e6, 1),
+                'dur': round((end - start) * 1e6, 1),
+                'pid': 1,
+                'tid': tid,
+            }
+            if args:
+                event['args'] = {key: str(value) for key, value in args.items()}
+            trace_events.append(event)
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    @staticmethod
+    def summarize(events=None):
+        """按阶段名称汇总：次数、总耗时、自身耗时（扣除嵌套子阶段）和最大耗时，单位秒"""
+        events = TraceUtils._events if events is None else events
+        stats = {}
+        by_thread = {}
+        for event in events:
+            by_thread.setdefault(event[3], []).append(event)
+        for thread_events in by_thread.values():
+            # 按开始时间排序，结束较晚的父区间排在前面
+            thread_events.sort(key=lambda e: (e[1], -e[2]))
+            stack = []
+            for name, start, end, _, _ in thread_events:
+                while stack and stack[-1][1] <= start:
+                    stack.pop()
+                duration = end - start
+                item = stats.setdefault(name, {'count': 0, 'total': 0.0, 'self': 0.0, 'max': 0.0})
+                item['count'] += 1
+                item['total'] += duration
+                item['self'] += duration
+                item['max'] = max(item['max'], duration)
+                if stack:
+                    stats[stack[-1][0]]['self'] -= duration
+                stack.append((name, end))
+        return stats
+
+    @staticmethod
+    def format_summary(events=None):
+        """生成按总耗时排序的阶段汇总表"""
+        stats = TraceUtils.summarize(events)
+        lines = [f'{"阶段":<32}{"次数":>8}{"总耗时(s)":>12}{"自身(s)":>12}{"平均(ms)":>12}{"最大(ms)":>12}']
+        for name, item in sorted(stats.items(), key=lambda kv: kv[1]['total'], reverse=True):
+            lines.append(f'{name:<32}{item["count"]:>8}{item["total"]:>12.3f}{item["self"]:>12.3f}'
+                         f'{item["total"] / item["count"] * 1000:>12.2f}{item["max"] * 1000:>12.2f}')
+        return '\n'.join(lines)
@@ -0,0 +1,5 @@
+"""
+本地性能基准测试
+在不安装 Fusion 360 的机器（如 Linux CI）上用 benchmarks/adsk 中的模拟 API 驱动批量导出，
+测量调度、缓存、日志等改动对导出耗时和 Fusion API 调用次数的影响
+"""
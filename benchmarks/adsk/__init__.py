@@ -0,0 +1,16 @@
+"""
+Fusion 360 API（adsk）的本地模拟实现，仅供基准测试使用
+
+覆盖插件用到的接口：设计参数（userParameters / modelParameters / allParameters）、组件和实例
+（occurrences / allOccurrences / isLightBulbOn）、design.computeAll、exportManager 的
+create*ExportOptions / execute、自定义事件、进度框和消息框。
+各操作的模拟耗时见 core.LATENCY，合成装配体见 fusion.build_design，API调用次数见 core.ApiCounter。
+"""
+
+from . import core, fusion, cam  # noqa: F401
+
+
+def doEvents():
+    """处理排队的自定义事件（模拟 Fusion 的消息循环）"""
+    core.Application.get()._process_events()
+    return True
@@ -0,0 +1 @@
+"""adsk.cam 的占位模块（插件只导入不使用）"""
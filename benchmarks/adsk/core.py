@@ -0,0 +1,257 @@
+"""
+adsk.core 的本地模拟：应用程序、界面、自定义事件和模拟耗时
+"""
+
+import time
+
+# 各操作的模拟耗时（秒）
+#   compute          design.computeAll
+#   parameter_write  写入一个参数表达式
+#   visibility       切换一个实例的可见性
+#   export           一次 exportManager.execute；也可以是按格式的字典 {'step': 0.2, 'default': 0.05}
+#   parametric_text  ParametricText 插件处理一次更新
+#   do_events        一次 adsk.doEvents（界面刷新）
+LATENCY = {
+    'compute': 0.0,
+    'parameter_write': 0.0,
+    'visibility': 0.0,
+    'export': 0.0,
+    'parametric_text': 0.0,
+    'do_events': 0.0,
+}
+DEFAULT_LATENCY = dict(LATENCY)
+
+
+def configure_latency(**latency):
+    """修改模拟耗时，未指定的恢复为0"""
+    unknown = set(latency) - set(DEFAULT_LATENCY)
+    if unknown:
+        raise KeyError(f'未知的耗时项: {", ".join(sorted(unknown))}')
+    LATENCY.clear()
+    LATENCY.update(DEFAULT_LATENCY)
+    LATENCY.update(latency)
+
+
+def simulate(name, key=None):
+    """按 LATENCY 等待并计数一次API调用"""
+    ApiCounter.count(name)
+    seconds = LATENCY.get(name, 0.0)
+    if isinstance(seconds, dict):
+        seconds = seconds.get(key, seconds.get('default', 0.0))
+    if seconds:
+        time.sleep(seconds)
+
+
+class ApiCounter:
+    """模拟API的调用次数 {名称: 次数}"""
+
+    calls = {}
+
+    @staticmethod
+    def count(name):
+        ApiCounter.calls[name] = ApiCounter.calls.get(name, 0) + 1
+
+    @staticmethod
+    def reset():
+        ApiCounter.calls = {}
+
+
+class _Collection:
+    def __init__(self, items=None):
+        self._items = list(items or [])
+
+    @property
+    def count(self):
+        return len(self._items)
+
+    def item(self, index):
+        return self._items[index]
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ObjectCollection(_Collection):
+    @staticmethod
+    def create():
+        return ObjectCollection()
+
+    def add(self, item):
+        self._items.append(item)
+        return True
+
+
+class CustomEventHandler:
+    pass
+
+
+class CommandCreatedEventHandler:
+    pass
+
+
+class CommandEventHandler:
+    pass
+
+
+class InputChangedEventHandler:
+    pass
+
+
+class DialogResults:
+    DialogOK = 0
+    DialogCancel = 1
+    DialogYes = 2
+    DialogNo = 3
+
+
+class MessageBoxButtonTypes:
+    OKButtonType = 0
+    OKCancelButtonType = 1
+    YesNoButtonType = 3
+
+
+class MessageBoxIconTypes:
+    NoIconIconType = 0
+    InformationIconType = 1
+    WarningIconType = 2
+    QuestionIconType = 3
+    CriticalIconType = 4
+
+
+class DropDownStyles:
+    TextListDropDownStyle = 1
+
+
+class _Event:
+    def __init__(self):
+        self.handlers = []
+
+    def add(self, handler):
+        self.handlers.append(handler)
+        return True
+
+    def remove(self, handler):
+        self.handlers.remove(handler)
+        return True
+
+
+class CustomEventArgs:
+    def __init__(self, additional_info):
+        self.additionalInfo = additional_info
+
+
+class ProgressDialog:
+    """进度框：记录 message 被修改的次数（即界面刷新次数）"""
+
+    def __init__(self):
+        self.wasCancelled = False
+        self.progressValue = 0
+        self.message = ''
+        self.updates = 0
+
+    def __setattr__(self, name, value):
+        if name == 'message':
+            object.__setattr__(self, 'updates', getattr(self, 'updates', 0) + 1)
+        object.__setattr__(self, name, value)
+
+    def show(self, title, message, minimum, maximum):
+        self.message = message
+        return True
+
+    def hide(self):
+        return True
+
+
+class UserInterface:
+    """界面：消息框不弹出，记录内容并返回预设的结果"""
+
+    def __init__(self):
+        self.messages = []
+        self.answer = DialogResults.DialogOK
+        self.progress = None
+
+    def messageBox(self, text, title='', buttons=0, icon=0):
+        self.messages.append((title, text))
+        return self.answer
+
+    def createProgressDialog(self):
+        self.progress = ProgressDialog()
+        return self.progress
+
+
+class DataFile:
+    def __init__(self, file_id, version_number):
+        self.id = file_id
+        self.versionNumber = version_number
+
+
+class Document:
+    def __init__(self, name, data_file=None):
+        self.name = name
+        self.dataFile = data_file
+        self.isModified = False
+
+
+class Application:
+    """应用程序单例；reset 后重新创建，用于隔离每次基准测试"""
+
+    _instance = None
+
+    @staticmethod
+    def get():
+        if Application._instance is None:
+            Application._instance = Application()
+        return Application._instance
+
+    @staticmethod
+    def reset():
+        Application._instance = None
+
+    def __init__(self):
+        self.userInterface = UserInterface()
+        self.activeProduct = None
+        self.activeDocument = Document('Demo v1')
+        # 为False时模拟未安装 ParametricText 插件
+        self.parametric_text_installed = True
+        self._events = {}
+        self._queue = []
+
+    def registerCustomEvent(self, event_id):
+        if event_id in self._events:
+            raise RuntimeError(f'自定义事件已注册: {event_id}')
+        event = _Event()
+        self._events[event_id] = event
+        return event
+
+    def unregisterCustomEvent(self, event_id):
+        if event_id not in self._events:
+            raise RuntimeError(f'自定义事件未注册: {event_id}')
+        del self._events[event_id]
+        return True
+
+    def fireCustomEvent(self, event_id, additional_info=''):
+        """事件在下一次 adsk.doEvents 时处理；ParametricText 的更新事件由模拟的插件处理"""
+        if event_id == 'thomasa88_ParametricText_Ext_Update':
+            if not self.parametric_text_installed:
+                return False
+            self._queue.append((None, lambda: simulate('parametric_text')))
+            return True
+        if event_id not in self._events:
+            return False
+        self._queue.append((event_id, additional_info))
+        return True
+
+    def _process_events(self):
+        simulate('do_events')
+        queue, self._queue = self._queue, []
+        for event_id, payload in queue:
+            if event_id is None:
+                payload()
+                continue
+            event = self._events.get(event_id)
+            if event:
+                for handler in list(event.handlers):
+                    handler.notify(CustomEventArgs(payload))
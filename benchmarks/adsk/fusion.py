@@ -0,0 +1,276 @@
+"""
+adsk.fusion 的本地模拟：参数、组件、实例、重新计算和导出
+
+导出的文件内容包含可见（或指定几何体）的零件和当前参数，便于检查导出结果是否正确；
+STL 为合法的二进制STL，3MF 为 ZIP 文件。
+"""
+
+import struct
+import zipfile
+from .core import Application, DataFile, Document, _Collection, simulate
+
+
+class MeshRefinementSettings:
+    MeshRefinementHigh = 0
+    MeshRefinementMedium = 1
+    MeshRefinementLow = 2
+    MeshRefinementCustom = 3
+
+
+class CalculationAccuracy:
+    LowCalculationAccuracy = 0
+    MediumCalculationAccuracy = 1
+
+
+class Parameter:
+    def __init__(self, name, expression, is_favorite=False, unit='mm'):
+        self.name = name
+        self.unit = unit
+        self.comment = ''
+        self.isFavorite = is_favorite
+        self._expression = expression
+
+    @property
+    def expression(self):
+        simulate('parameter_read')
+        return self._expression
+
+    @expression.setter
+    def expression(self, value):
+        simulate('parameter_write')
+        self._expression = value
+
+    @property
+    def value(self):
+        """内部单位（厘米）的数值，只支持 "数值 mm" 形式的表达式"""
+        try:
+            return float(str(self._expression).split()[0]) / 10
+        except (ValueError, IndexError):
+            return 0.0
+
+
+class ParameterList(_Collection):
+    def itemByName(self, name):
+        simulate('parameter_lookup')
+        for parameter in self._items:
+            if parameter.name == name:
+                return parameter
+        return None
+
+
+class Point3D:
+    def __init__(self, x, y, z):
+        self.x = x
+        self.y = y
+        self.z = z
+
+
+class BoundingBox3D:
+    def __init__(self, min_point, max_point):
+        self.minPoint = min_point
+        self.maxPoint = max_point
+
+
+class BRepFace:
+    pass
+
+
+class BRepBody:
+    def __init__(self, name='Body1', face_count=6):
+        self.name = name
+        self.faces = _Collection([BRepFace() for _ in range(face_count)])
+
+
+class PhysicalProperties:
+    def __init__(self, volume, area):
+        self.volume = volume
+        self.area = area
+
+
+class Component:
+    """零件组件：尺寸跟随 size_parameter 参数变化，参数不影响尺寸时几何体保持不变"""
+
+    def __init__(self, name, design, size_parameter=None, body_count=1):
+        self.name = name
+        self.id = name
+        self.entityToken = f'component:{name}'
+        self.design = design
+        self.size_parameter = size_parameter
+        self.bRepBodies = _Collection([BRepBody(f'Body{i + 1}') for i in range(body_count)])
+        self.occurrences = _Collection()
+        self.features = _Collection()
+        self.sketches = _Collection()
+
+    def _size(self):
+        if self.size_parameter:
+            parameter = self.design.userParameters.itemByName(self.size_parameter)
+            if parameter and parameter.value:
+                return parameter.value
+        return 1.0
+
+    @property
+    def boundingBox(self):
+        size = self._size()
+        return BoundingBox3D(Point3D(0, 0, 0), Point3D(size, size, size))
+
+    def getPhysicalProperties(self, accuracy=CalculationAccuracy.LowCalculationAccuracy):
+        size = self._size()
+        return PhysicalProperties(size ** 3, 6 * size * size)
+
+    @property
+    def allOccurrences(self):
+        occurrences = []
+
+        def walk(component):
+            for occurrence in component.occurrences:
+                occurrences.append(occurrence)
+                walk(occurrence.component)
+
+        walk(self)
+        return _Collection(occurrences)
+
+
+class Occurrence:
+    def __init__(self, component, number):
+        self.component = component
+        self.name = f'{component.name}:{number}'
+        self.entityToken = f'occurrence:{number}'
+        self.isVisible = True
+        self._light_bulb = True
+
+    @property
+    def boundingBox(self):
+        return self.component.boundingBox
+
+    @property
+    def isLightBulbOn(self):
+        return self._light_bulb
+
+    @isLightBulbOn.setter
+    def isLightBulbOn(self, value):
+        simulate('visibility')
+        self._light_bulb = bool(value)
+
+
+class ExportOptions:
+    def __init__(self, kind, filename='', geometry=None):
+        self.kind = kind
+        self.filename = filename
+        self.geometry = geometry
+        self.sendToPrintUtility = False
+        self.meshRefinement = MeshRefinementSettings.MeshRefinementMedium
+        self.isBinaryFormat = True
+
+
+class ExportManager:
+    # 最小的合法二进制STL：一个四面体
+    _TETRAHEDRON = ((0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1))
+    _TETRAHEDRON_FACES = ((0, 2, 1), (0, 1, 3), (0, 3, 2), (1, 2, 3))
+
+    def __init__(self, design):
+        self.design = design
+
+    @staticmethod
+    def _check_filename(filename):
+        if not isinstance(filename, str):
+            raise TypeError('filename 必须是字符串')
+
+    def createSTEPExportOptions(self, filename, geometry=None):
+        self._check_filename(filename)
+        return ExportOptions('step', filename, geometry)
+
+    def createIGESExportOptions(self, filename, geometry=None):
+        self._check_filename(filename)
+        return ExportOptions('iges', filename, geometry)
+
+    def createSTLExportOptions(self, geometry, filename=''):
+        return ExportOptions('stl', filename, geometry)
+
+    def createOBJExportOptions(self, geometry, filename=''):
+        return ExportOptions('obj', filename, geometry)
+
+    def createC3MFExportOptions(self, geometry, filename=''):
+        return ExportOptions('3mf', filename, geometry)
+
+    def _describe(self, geometry):
+        if geometry is None:
+            visible = [occurrence.component.name for occurrence in self.design.rootComponent.allOccurrences
+                       if occurrence.isLightBulbOn]
+            return 'visible:' + ','.join(visible)
+        return 'geometry:' + getattr(getattr(geometry, 'component', geometry), 'name', '?')
+
+    def execute(self, options):
+        simulate('export', options.kind)
+        if options.kind == 'stl':
+            points = ExportManager._TETRAHEDRON
+            body = b''.join(struct.pack('<12fH', 0, 0, 0, *points[a], *points[b], *points[c], 0)
+                            for a, b, c in ExportManager._TETRAHEDRON_FACES)
+            data = b'\0' * 80 + struct.pack('<I', len(ExportManager._TETRAHEDRON_FACES)) + body
+        else:
+            header = 'ISO-10303-21;' if options.kind == 'step' else ''
+            parameters = [parameter._expression for parameter in self.design.userParameters]
+            data = f'{header}{options.kind} {self._describe(options.geometry)} {parameters}'.encode('utf-8')
+        if options.kind == '3mf':
+            with zipfile.ZipFile(options.filename, 'w') as archive:
+                archive.writestr('3D/3dmodel.model', data)
+            return True
+        with open(options.filename, 'wb') as f:
+            f.write(data)
+        return True
+
+
+class Attributes(_Collection):
+    def itemsByGroup(self, group_name):
+        return _Collection()
+
+
+class Design:
+    def __init__(self):
+        self.userParameters = ParameterList()
+        self.modelParameters = ParameterList()
+        self.rootComponent = Component('Root', self, body_count=0)
+        self.exportManager = ExportManager(self)
+        self.attributes = Attributes()
+
+    @property
+    def allParameters(self):
+        return ParameterList(self.userParameters._items + self.modelParameters._items)
+
+    def computeAll(self):
+        simulate('compute')
+        return True
+
+    def findEntityByToken(self, entity_token):
+        return [occurrence for occurrence in self.rootComponent.allOccurrences
+                if occurrence.entityToken == entity_token]
+
+    @staticmethod
+    def cast(product):
+        return product if isinstance(product, Design) else None
+
+
+def build_design(parts=5, duplicates=0, model_parameters=50, bodies_per_part=1, document_name='Demo v1'):
+    """
+    创建合成装配体并设为当前设计
+    :param parts: 零件（组件）数量；偶数序号的零件尺寸随参数 L 变化，其余零件几何体不随参数变化
+    :param duplicates: 第一个零件额外的实例数
+    :param model_parameters: 模型参数数量（其中 d3 标星）
+    :return: Design
+    """
+    design = Design()
+    for name in ('L', 'W', 'H'):
+        design.userParameters._items.append(Parameter(name, '10 mm', is_favorite=True))
+    for index in range(model_parameters):
+        design.modelParameters._items.append(Parameter(f'd{index}', f'{index} mm', is_favorite=index == 3))
+    root = design.rootComponent
+    components = [Component(f'Part{index}', design, 'L' if index % 2 == 0 else None, bodies_per_part)
+                  for index in range(parts)]
+    for component in components:
+        root.occurrences._items.append(Occurrence(component, root.occurrences.count + 1))
+    if components:
+        for _ in range(duplicates):
+            root.occurrences._items.append(Occurrence(components[0], root.occurrences.count + 1))
+    app = Application.get()
+    app.activeProduct = design
+    app.activeDocument = Document(document_name, DataFile(f'urn:benchmark:{document_name.split(" v")[0]}', 1))
+    return design
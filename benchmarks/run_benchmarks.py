@@ -0,0 +1,243 @@
+"""
+批量导出基准测试
+
+用 benchmarks/adsk 中的模拟 Fusion API 端到端运行 execute_batch_export，输出各场景的耗时和 Fusion API 调用次数。
+不需要安装 Fusion 360，可以在 Linux CI 上运行：
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --scenario baseline --scenario cached_rerun --repeat 5 --json result.json
+    python benchmarks/run_benchmarks.py --latency-scale 0     # 不模拟 Fusion 耗时，只测插件自身的开销
+
+每次运行使用独立的临时目录（导出目录、日志、设置缓存和耗时数据库都不会写到插件目录和系统临时目录）。
+"""
+
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDIN_DIR = os.path.dirname(BENCHMARK_DIR)
+PACKAGE_NAME = 'BatchParametricExport'
+
+# 接近真实 Fusion 的默认模拟耗时（秒），--latency-scale 按比例缩放
+LATENCY_PROFILE = {
+    'compute': 0.02,
+    'parameter_write': 0.0005,
+    'visibility': 0.0002,
+    'export': {'step': 0.01, 'iges': 0.01, 'stl': 0.005, 'obj': 0.006, '3mf': 0.006, 'default': 0.01},
+    'parametric_text': 0.005,
+    'do_events': 0.001,
+}
+
+# 场景：零件数、配置数、格式、导出选项；runs 大于1时在同一导出目录连续运行，只统计最后一次（测缓存命中）
+SCENARIOS = {
+    'baseline': {'parts': 10, 'configs': 20, 'formats': ['step'], 'options': {}},
+    'cached_rerun': {'parts': 10, 'configs': 20, 'formats': ['step'], 'options': {}, 'runs': 2},
+    'geometry': {'parts': 10, 'configs': 20, 'formats': ['step'], 'options': {'export_strategy': 'geometry'}},
+    'reorder': {'parts': 10, 'configs': 20, 'formats': ['step'], 'options': {'reorder_configs': True}, 'random': True},
+    'reuse': {'parts': 10, 'configs': 20, 'formats': ['step', 'stl'], 'options': {'reuse_identical_parts': True}},
+    'mesh': {'parts': 10, 'configs': 10, 'formats': ['stl', 'obj', '3mf'], 'options': {'single_tessellation': True}},
+    'zip': {'parts': 10, 'configs': 10, 'formats': ['step', 'stl'], 'options': {'zip_per_config': True}},
+    'mesh_zip': {'parts': 6, 'configs': 4, 'formats': ['stl', 'obj', '3mf'],
+                 'options': {'single_tessellation': True, 'zip_per_config': True, 'zip_delete_loose': True}},
+    'sweep': {'parts': 5, 'configs': 1, 'formats': ['step'], 'options': {}, 'sweep': '10:49:1 mm'},
+}
+
+
+def load_addin():
+    """用模拟的 adsk 加载插件包，返回 (BatchParametricExportCommand 模块, 插件包)"""
+    if BENCHMARK_DIR not in sys.path:
+        sys.path.insert(0, BENCHMARK_DIR)
+    import adsk
+    if not hasattr(adsk.core, 'LATENCY'):
+        raise RuntimeError('已加载真实的 Fusion API，基准测试只能在 Fusion 之外运行')
+    if PACKAGE_NAME not in sys.modules:
+        spec = importlib.util.spec_from_file_location(PACKAGE_NAME, os.path.join(ADDIN_DIR, '__init__.py'),
+                                                      submodule_search_locations=[ADDIN_DIR])
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[PACKAGE_NAME] = package
+        spec.loader.exec_module(package)
+    return importlib.import_module(f'{PACKAGE_NAME}.BatchParametricExportCommand'), sys.modules[PACKAGE_NAME]
+
+
+def make_configs(scenario, sweep_utils):
+    """生成场景的导出配置；偶数零件随 L 变化，W 只影响导出内容，不影响几何体"""
+    count = scenario['configs']
+    rng = random.Random(1) if scenario.get('random') else None
+    configs = []
+    for index in range(count):
+        if rng:
+            length, width = rng.choice([10, 20, 30]), rng.choice([1, 2])
+        else:
+            length, width = 10 + index % 5, 10 + index
+        configs.append({
+            'custom_name': f'config{index + 1:04d}',
+            'formats': list(scenario['formats']),
+            'parameters': {'L': f'{length} mm', 'W': f'{width} mm', 'H': '10 mm'},
+        })
+    if scenario.get('sweep'):
+        for config in configs:
+            config['parameters']['L'] = scenario['sweep']
+        return sweep_utils.ConfigSweep.from_configs(configs)
+    return configs
+
+
+def run_scenario(name, scenario, latency_scale=1.0):
+    """运行一次场景，返回测量结果"""
+    command_module, _ = load_addin()
+    import adsk
+    from adsk import core, fusion
+    sweep_utils = importlib.import_module(f'{PACKAGE_NAME}.SweepUtils')
+    log_utils = importlib.import_module(f'{PACKAGE_NAME}.LogUtils').LogUtils
+
+    work_dir = tempfile.mkdtemp(prefix=f'bpe_bench_{name}_')
+    previous_tempdir = tempfile.tempdir
+    try:
+        # 设置缓存、Excel解析缓存和耗时数据库都写到系统临时目录，改为本次运行的目录
+        tempfile.tempdir = os.path.join(work_dir, 'tmp')
+        os.makedirs(tempfile.tempdir)
+        log_utils.LOG_DIR = os.path.join(work_dir, 'logs')
+        log_utils.LOG_FILE = os.path.join(log_utils.LOG_DIR, 'Fusion360BatchExport.log')
+        log_utils.JSONL_FILE = os.path.join(log_utils.LOG_DIR, 'Fusion360BatchExport.jsonl')
+        log_utils.configure(console=False)
+        core.configure_latency(**{key: _scale(value, latency_scale) for key, value in LATENCY_PROFILE.items()})
+        core.Application.reset()
+        fusion.build_design(parts=scenario['parts'])
+        app = core.Application.get()
+        export_configs = make_configs(scenario, sweep_utils)
+        export_path = os.path.join(work_dir, 'export')
+
+        events = [0]
+        process_events = app._process_events
+
+        def counting_process_events():
+            events[0] += 1
+            process_events()
+        app._process_events = counting_process_events
+
+        command = command_module.BatchParametricExportCommand()
+        options = dict(scenario['options'])
+        for _ in range(scenario.get('runs', 1)):
+            core.ApiCounter.reset()
+            events[0] = 0
+            app.userInterface.messages.clear()
+            started = time.perf_counter()
+            result = command.execute_batch_export(export_configs, export_path, True, options) or {}
+            elapsed = time.perf_counter() - started
+        log_utils.flush()
+        # 成功数和后处理失败数取自导出结果，错误数从日志中统计
+        log_text = ''
+        if os.path.exists(log_utils.LOG_FILE):
+            with open(log_utils.LOG_FILE, 'r', encoding='utf-8') as f:
+                log_text = f.read()
+
+        files, size = 0, 0
+        for directory, _, names in os.walk(export_path):
+            for file_name in names:
+                if not file_name.startswith('.'):
+                    files += 1
+                    size += os.path.getsize(os.path.join(directory, file_name))
+        calls = core.ApiCounter.calls
+        return {
+            'scenario': name,
+            'seconds': elapsed,
+            'configs': len(export_configs),
+            'status': result.get('status', 'failed'),
+            'exported': result.get('exported', 0),
+            'post_failures': result.get('post_failures', 0),
+            'errors': log_text.count('[ERROR]'),
+            'files': files,
+            'bytes': size,
+            'exports': calls.get('export', 0),
+            'computes': calls.get('compute', 0),
+            'parameter_writes': calls.get('parameter_write', 0),
+            'visibility_changes': calls.get('visibility', 0),
+            'do_events': events[0],
+            'progress_updates': app.userInterface.progress.updates if app.userInterface.progress else 0,
+        }
+    finally:
+        tempfile.tempdir = previous_tempdir
+        log_utils.flush()
+        shutil.rmtree(work_dir, ignore_errors=True)
+        adsk.core.Application.reset()
+
+
+def _scale(value, factor):
+    if isinstance(value, dict):
+        return {key: item * factor for key, item in value.items()}
+    return value * factor
+
+
+def summarize(results):
+    """同一场景多次运行：耗时取最小值和中位数，其余取最后一次"""
+    summary = dict(results[-1])
+    times = [result['seconds'] for result in results]
+    summary['seconds'] = min(times)
+    summary['median_seconds'] = statistics.median(times)
+    summary['repeat'] = len(results)
+    return summary
+
+
+def print_table(summaries):
+    columns = [
+        ('scenario', '场景', '{}'),
+        ('seconds', '最短(s)', '{:.3f}'),
+        ('median_seconds', '中位(s)', '{:.3f}'),
+        ('configs', '配置', '{}'),
+        ('exported', '成功', '{}'),
+        ('post_failures', '后处理失败', '{}'),
+        ('files', '文件', '{}'),
+        ('exports', '导出调用', '{}'),
+        ('computes', '重新计算', '{}'),
+        ('parameter_writes', '参数写入', '{}'),
+        ('visibility_changes', '可见性', '{}'),
+        ('do_events', 'doEvents', '{}'),
+        ('progress_updates', '进度刷新', '{}'),
+    ]
+    rows = [[fmt.format(summary[key]) for key, _, fmt in columns] for summary in summaries]
+    widths = [max(len(title), *(len(row[i]) for row in rows)) for i, (_, title, _) in enumerate(columns)]
+    print('  '.join(title.ljust(width) for (_, title, _), width in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='批量导出基准测试（模拟 Fusion API）')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help='要运行的场景，可重复，默认全部')
+    parser.add_argument('--repeat', type=int, default=3, help='每个场景运行的次数')
+    parser.add_argument('--latency-scale', type=float, default=1.0, help='模拟耗时的缩放比例，0 表示不模拟耗时')
+    parser.add_argument('--parts', type=int, help='覆盖场景的零件数')
+    parser.add_argument('--configs', type=int, help='覆盖场景的配置数')
+    parser.add_argument('--json', help='把结果写入JSON文件')
+    args = parser.parse_args(argv)
+
+    summaries = []
+    for name in args.scenario or list(SCENARIOS):
+        scenario = dict(SCENARIOS[name])
+        if args.parts:
+            scenario['parts'] = args.parts
+        if args.configs and not scenario.get('sweep'):
+            scenario['configs'] = args.configs
+        results = [run_scenario(name, scenario, args.latency_scale) for _ in range(max(1, args.repeat))]
+        summaries.append(summarize(results))
+        summary = summaries[-1]
+        if summary['exported'] != summary['configs'] or summary['post_failures'] or summary['errors']:
+            print(f'警告: 场景 {name} 成功导出 {summary["exported"]}/{summary["configs"]} 个配置，'
+                  f'{summary["post_failures"]} 个文件后处理失败，日志中有 {summary["errors"]} 条错误', file=sys.stderr)
+    print_table(summaries)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'latency_scale': args.latency_scale, 'results': summaries}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""
+测试公共夹具
+用 benchmarks/adsk 中的模拟 Fusion API 加载插件，无需安装 Fusion 360：
+
+    python -m pytest tests
+"""
+
+import importlib
+import os
+import sys
+import tempfile
+import types
+
+import pytest
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks')
+if BENCHMARK_DIR not in sys.path:
+    sys.path.insert(0, BENCHMARK_DIR)
+
+import run_benchmarks  # noqa: E402
+
+
+@pytest.fixture
+def addin(tmp_path, monkeypatch):
+    """
+    加载插件，日志、设置缓存和耗时数据库都写到本测试的临时目录，不模拟 Fusion 耗时
+    :return: 命名空间：command（BatchParametricExportCommand 模块）、module(名称)、core、fusion、tmp_path
+    """
+    command_module, _ = run_benchmarks.load_addin()
+    from adsk import core, fusion
+
+    def module(name):
+        return importlib.import_module(f'{run_benchmarks.PACKAGE_NAME}.{name}')
+
+    log_utils = module('LogUtils').LogUtils
+    log_dir = str(tmp_path / 'logs')
+    temp_dir = tmp_path / 'tmp'
+    temp_dir.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(temp_dir))
+    monkeypatch.setattr(log_utils, 'LOG_DIR', log_dir)
+    monkeypatch.setattr(log_utils, 'LOG_FILE', os.path.join(log_dir, 'Fusion360BatchExport.log'))
+    monkeypatch.setattr(log_utils, 'JSONL_FILE', os.path.join(log_dir, 'Fusion360BatchExport.jsonl'))
+    log_utils.configure(console=False)
+    core.configure_latency()
+    core.Application.reset()
+    yield types.SimpleNamespace(command=command_module, module=module, core=core, fusion=fusion, tmp_path=tmp_path)
+    log_utils.flush()
+    core.Application.reset()
+
+
+@pytest.fixture
+def run_batch(addin):
+    """在模拟设计上运行一次批量导出，返回 (导出结果, 导出目录)"""
+    def run(configs, options=None, parts=4, export_path=None):
+        if addin.core.Application.get().activeProduct is None:
+            addin.fusion.build_design(parts=parts)
+        export_path = export_path or str(addin.tmp_path / 'export')
+        command = addin.command.BatchParametricExportCommand()
+        return command.execute_batch_export(configs, export_path, True, options or {}), export_path
+    return run
@@ -0,0 +1,36 @@
+"""CacheUtils 的设置缓存写入"""
+
+import time
+
+
+def test_failed_writes_back_off_and_stop(addin, monkeypatch):
+    cache_utils = addin.module('CacheUtils').CacheUtils
+    monkeypatch.setattr(cache_utils, '_data', None)
+    monkeypatch.setattr(cache_utils, '_pending', {})
+    monkeypatch.setattr(cache_utils, 'WRITE_DELAY', 0.005)
+    attempts = []
+    lock_class = addin.module('LockUtils').FileLock
+    monkeypatch.setattr(lock_class, 'acquire', lambda self: attempts.append(time.monotonic()) or False)
+
+    cache_utils.save_cached_option('backoff_check', 1)
+    deadline = time.monotonic() + 5
+    while len(attempts) < cache_utils.MAX_WRITE_ATTEMPTS and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.3)
+    assert len(attempts) == cache_utils.MAX_WRITE_ATTEMPTS
+    intervals = [later - earlier for earlier, later in zip(attempts, attempts[1:])]
+    assert intervals == sorted(intervals)
+    # 修改保留，下一次保存设置时重新尝试写入
+    assert cache_utils._pending == {('options', 'backoff_check'): 1}
+
+
+def test_next_save_writes_pending_changes(addin, monkeypatch):
+    cache_utils = addin.module('CacheUtils').CacheUtils
+    monkeypatch.setattr(cache_utils, '_data', None)
+    monkeypatch.setattr(cache_utils, '_pending', {})
+    cache_utils.save_cached_option('first', 1)
+    cache_utils.save_cached_option('second', 2)
+    cache_utils.flush()
+    monkeypatch.setattr(cache_utils, '_data', None)
+    assert cache_utils.load_cached_option('first') == 1
+    assert cache_utils.load_cached_option('second') == 2
@@ -0,0 +1,19 @@
+"""ConfigUtils 的 Excel 单元格解析"""
+
+
+def test_parse_formats_empty_cell_defaults_to_step(addin):
+    config_utils = addin.module('ConfigUtils').ConfigUtils
+    assert config_utils.parse_formats(None) == ['step']
+    assert config_utils.parse_formats('  ') == ['step']
+
+
+def test_parse_formats_keeps_order_and_drops_duplicates(addin):
+    config_utils = addin.module('ConfigUtils').ConfigUtils
+    assert config_utils.parse_formats('STL, step;stl 3mf') == ['stl', 'step', '3mf']
+
+
+def test_parse_formats_invalid_only_cell_is_rejected(addin):
+    config_utils = addin.module('ConfigUtils').ConfigUtils
+    assert config_utils.parse_formats('xyz') == []
+    assert config_utils.parse_formats('xyz, abc') == []
+    assert config_utils.parse_formats('xyz, stl') == ['stl']
@@ -0,0 +1,35 @@
+"""LogUtils 的日志文件写入"""
+
+import builtins
+
+
+def test_jsonl_is_written_alongside_text_log(addin):
+    log_utils = addin.module('LogUtils').LogUtils
+    log_utils.configure(jsonl=True)
+    try:
+        log_utils.info('jsonl-check')
+        log_utils.flush()
+    finally:
+        log_utils.configure(jsonl=False)
+    for path in (log_utils.LOG_FILE, log_utils.JSONL_FILE):
+        with open(path, encoding='utf-8') as f:
+            assert 'jsonl-check' in f.read()
+
+
+def test_fallback_write_closes_log_file(addin, monkeypatch):
+    log_utils = addin.module('LogUtils').LogUtils
+    log_utils.flush()
+    opened = []
+    real_open = builtins.open
+
+    def tracking_open(*args, **kwargs):
+        f = real_open(*args, **kwargs)
+        opened.append(f)
+        return f
+    with monkeypatch.context() as patch:
+        patch.setattr(log_utils, '_ensure_writer', staticmethod(lambda: False))
+        patch.setattr(builtins, 'open', tracking_open)
+        log_utils.info('fallback-check')
+    assert opened and all(f.closed for f in opened)
+    with open(log_utils.LOG_FILE, encoding='utf-8') as f:
+        assert 'fallback-check' in f.read()
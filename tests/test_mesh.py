@@ -0,0 +1,41 @@
+"""单次网格化（single_tessellation）：由STL转换 OBJ/3MF"""
+
+
+def _configs(formats, count=2):
+    return [{'custom_name': f'c{index}', 'formats': formats, 'parameters': {'L': f'{10 + index} mm'}}
+            for index in range(count)]
+
+
+def test_failed_conversion_marks_config_failed(addin, run_batch, monkeypatch):
+    mesh_converter = addin.module('MeshUtils').MeshConverter
+
+    def fail(*args, **kwargs):
+        raise ValueError('conversion failed')
+    monkeypatch.setattr(mesh_converter, 'convert', staticmethod(fail))
+    result, _ = run_batch(_configs(['stl', 'obj']), {'single_tessellation': True, 'post_process_workers': 2}, parts=2)
+    assert result['status'] == 'incomplete'
+    assert result['exported'] == 0
+    assert result['post_failures'] > 0
+    assert '由STL转换 0 个' in result['message']
+
+
+def test_missing_stl_marks_config_failed(addin, run_batch, monkeypatch):
+    export_manager_class = addin.module('ExportUtils').ExportManager
+    export_with_strategy = export_manager_class._export_with_strategy
+
+    def no_stl(self, export_mgr, export_path, export_format, *args):
+        if export_format == 'stl':
+            return False, 'visibility'
+        return export_with_strategy(self, export_mgr, export_path, export_format, *args)
+    monkeypatch.setattr(export_manager_class, '_export_with_strategy', no_stl)
+    result, _ = run_batch(_configs(['step', 'obj']), {'single_tessellation': True}, parts=2)
+    assert result['status'] == 'incomplete'
+    assert result['exported'] == 0
+    assert '由STL生成网格失败' in result['message']
+
+
+def test_successful_conversion_is_counted(addin, run_batch):
+    result, _ = run_batch(_configs(['stl', 'obj', '3mf']), {'single_tessellation': True, 'post_process_workers': 2}, parts=2)
+    assert result['status'] == 'completed'
+    assert result['exported'] == 2
+    assert result['post_failures'] == 0
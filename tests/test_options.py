@@ -0,0 +1,12 @@
+"""高级选项传递到批量导出"""
+
+
+def test_parametric_text_timeout_option_is_applied(addin):
+    option_utils = addin.module('OptionUtils').OptionUtils
+    assert option_utils.defaults()['parametric_text_timeout'] == 5.0
+    addin.fusion.build_design(parts=1)
+    command = addin.command.BatchParametricExportCommand()
+    configs = [{'custom_name': 'c0', 'formats': ['step'], 'parameters': {'L': '12 mm'}}]
+    result = command.execute_batch_export(configs, str(addin.tmp_path / 'export'), True, {'parametric_text_timeout': 0.5})
+    assert result['status'] == 'completed'
+    assert command.parameter_manager.parametric_text_timeout == 0.5
@@ -0,0 +1,44 @@
+"""共享导出队列（run_queue_worker / QueueLease）"""
+
+import time
+
+
+def _configs(count):
+    return [{'custom_name': f'c{index}', 'formats': ['step'], 'parameters': {'L': f'{10 + index} mm'}}
+            for index in range(count)]
+
+
+def test_worker_restores_parameters_once(addin, monkeypatch):
+    addin.fusion.build_design(parts=2)
+    command = addin.command.BatchParametricExportCommand()
+    restores = []
+    restore_parameters = command.parameter_manager.restore_parameters
+
+    def counting_restore(design, params):
+        restores.append(params)
+        return restore_parameters(design, params)
+    monkeypatch.setattr(command.parameter_manager, 'restore_parameters', counting_restore)
+    summary = command.run_queue_worker(_configs(6), str(addin.tmp_path / 'export'), True, {'queue_unit_size': 2})
+    assert summary['finished']
+    assert summary['done'] == 3
+    assert summary['exported'] == 6
+    assert len(restores) == 1
+
+
+def test_lease_renews_in_background(addin, monkeypatch):
+    queue_utils = addin.module('QueueUtils')
+    queue = queue_utils.ExportQueue(str(addin.tmp_path / 'queue'))
+    queue.create('doc', _configs(2), {}, 2, 60)
+    unit_id, _ = queue.claim('w1')
+    renewals = []
+    monkeypatch.setattr(queue, 'renew', lambda unit, worker: renewals.append(unit) or True)
+    lease = queue_utils.QueueLease(queue, unit_id, 'w1')
+    lease.renew_interval = 0.05
+    lease.start()
+    # 模拟一个很慢的配置：导出循环中没有任何调用，仍然续约
+    time.sleep(0.3)
+    lease.stop()
+    count = len(renewals)
+    assert count >= 2
+    time.sleep(0.15)
+    assert len(renewals) == count
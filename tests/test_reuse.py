@@ -0,0 +1,29 @@
+"""相同零件复用（reuse_identical_parts）"""
+
+import os
+
+
+def _config(name, mode):
+    return {'custom_name': name, 'formats': ['stl'], 'parameters': {'L': '10 mm'}, 'mesh_refinement': {'mode': mode}}
+
+
+def _stl(export_path, config, part):
+    return os.path.join(export_path, 'Demo', config, f'{part}-{config}.stl')
+
+
+def test_reuse_links_identical_mesh_with_same_settings(run_batch):
+    result, export_path = run_batch([_config('a', 'coarse'), _config('b', 'coarse')],
+                                    {'reuse_identical_parts': True}, parts=2)
+    assert result['status'] == 'completed'
+    assert os.path.samefile(_stl(export_path, 'a', 'Part0'), _stl(export_path, 'b', 'Part0'))
+
+
+def test_reuse_does_not_link_mesh_with_different_settings(run_batch):
+    result, export_path = run_batch([_config('coarse', 'coarse'), _config('fine', 'fine')],
+                                    {'reuse_identical_parts': True}, parts=2)
+    assert result['status'] == 'completed'
+    for part in ('Part0', 'Part1'):
+        fine = _stl(export_path, 'fine', part)
+        assert os.path.exists(fine)
+        assert not os.path.samefile(_stl(export_path, 'coarse', part), fine)
+        assert os.stat(fine).st_nlink == 1
@@ -0,0 +1,24 @@
+"""按配置打包ZIP（zip_per_config）"""
+
+import os
+import zipfile
+
+
+def test_delete_loose_keeps_stl_for_single_tessellation(run_batch):
+    configs = [{'custom_name': f'c{index}', 'formats': ['stl', 'obj', '3mf'], 'parameters': {'L': f'{10 + index} mm'}}
+               for index in range(4)]
+    options = {'single_tessellation': True, 'zip_per_config': True, 'zip_delete_loose': True, 'post_process_workers': 4}
+    result, export_path = run_batch(configs, options, parts=6)
+    assert result['status'] == 'completed'
+    assert result['exported'] == 4
+    assert result['post_failures'] == 0
+    doc_dir = os.path.join(export_path, 'Demo')
+    for config in configs:
+        name = config['custom_name']
+        with zipfile.ZipFile(os.path.join(doc_dir, f'{name}.zip')) as archive:
+            names = set(archive.namelist())
+        for part in range(6):
+            for export_format in ('stl', 'obj', '3mf'):
+                assert f'Part{part}-{name}.{export_format}' in names
+        # 散落文件在压缩包完成后删除
+        assert not os.path.exists(os.path.join(doc_dir, name))